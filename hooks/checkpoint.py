@@ -13,7 +13,9 @@ import sys
 import subprocess
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+from utils.prompt_classifier import is_ship_command
 
 CHECKPOINT_DIR = Path('.claude/checkpoints')
 
@@ -83,7 +85,6 @@ class CheckpointManager:
 
         git_sha = checkpoint['phases'][phase]['git_sha']
 
-        print(f"[checkpoint] Rolling back to {phase} (git: {git_sha[:7]})")
         result = subprocess.run(
             ['git', 'reset', '--hard', git_sha],
             capture_output=True
@@ -151,52 +152,66 @@ def get_active_ship_id() -> Optional[str]:
     return latest.stem
 
 
+def run(input_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Run the hook against an already-parsed payload, returning (exit_code, output)."""
+    prompt = input_data.get('prompt', '')
+
+    # Check for /ship with flags
+    if not is_ship_command(prompt):
+        return 0, ""
+
+    prompt = prompt.lower()
+
+    # Get or create ship ID
+    ship_id = get_active_ship_id()
+    if not ship_id:
+        # Generate new ship ID from timestamp
+        ship_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    manager = CheckpointManager(ship_id)
+
+    # Handle --status flag
+    if '--status' in prompt:
+        return 0, format_checkpoint_status(manager)
+
+    # Handle --continue flag
+    if '--continue' in prompt:
+        resume_point = manager.get_resume_point()
+        if resume_point:
+            return 0, (
+                f"\n[checkpoint] Resuming from: {resume_point}\n"
+                f"[checkpoint] Ship ID: {ship_id}\n"
+            )
+        return 0, "\n[checkpoint] No checkpoint found to resume from.\n"
+
+    # Handle --rollback flag
+    if '--rollback' in prompt:
+        # Extract phase name from prompt
+        parts = prompt.split('--rollback')
+        if len(parts) > 1:
+            phase = parts[1].strip().split()[0] if parts[1].strip() else None
+            checkpoint = manager.load() or {}
+            git_sha = checkpoint.get('phases', {}).get(phase, {}).get('git_sha', '')
+            if phase and manager.rollback(phase):
+                return 0, (
+                    f"[checkpoint] Rolling back to {phase} (git: {git_sha[:7]})\n"
+                    f"\n[checkpoint] Rolled back to: {phase}\n"
+                )
+            return 0, f"\n[checkpoint] Failed to rollback to: {phase}\n"
+
+    return 0, ""
+
+
 def main():
     """Hook entry point."""
     try:
         input_data = json.load(sys.stdin)
-        prompt = input_data.get('prompt', '').lower()
-
-        # Check for /ship with flags
-        if '/ship' not in prompt and '/adx:ship' not in prompt:
-            sys.exit(0)
-
-        # Get or create ship ID
-        ship_id = get_active_ship_id()
-        if not ship_id:
-            # Generate new ship ID from timestamp
-            ship_id = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-        manager = CheckpointManager(ship_id)
-
-        # Handle --status flag
-        if '--status' in prompt:
-            print(format_checkpoint_status(manager))
-            sys.exit(0)
-
-        # Handle --continue flag
-        if '--continue' in prompt:
-            resume_point = manager.get_resume_point()
-            if resume_point:
-                print(f"\n[checkpoint] Resuming from: {resume_point}")
-                print(f"[checkpoint] Ship ID: {ship_id}\n")
-            else:
-                print("\n[checkpoint] No checkpoint found to resume from.\n")
-            sys.exit(0)
-
-        # Handle --rollback flag
-        if '--rollback' in prompt:
-            # Extract phase name from prompt
-            parts = prompt.split('--rollback')
-            if len(parts) > 1:
-                phase = parts[1].strip().split()[0] if parts[1].strip() else None
-                if phase and manager.rollback(phase):
-                    print(f"\n[checkpoint] Rolled back to: {phase}\n")
-                else:
-                    print(f"\n[checkpoint] Failed to rollback to: {phase}\n")
-            sys.exit(0)
 
-        sys.exit(0)
+        exit_code, output = run(input_data)
+        if output:
+            print(output)
+
+        sys.exit(exit_code)
 
     except Exception:
         sys.exit(0)
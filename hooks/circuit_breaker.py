@@ -14,6 +14,8 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
+from utils.prompt_classifier import is_ship_command
+
 # Configuration (can be overridden via flags)
 DEFAULT_MAX_ITERATIONS = 50
 DEFAULT_MAX_CALLS_PER_HOUR = 100
@@ -150,38 +152,39 @@ Error Repeats:  {self.state['error_repeat_count']}/{ERROR_REPEAT_THRESHOLD}{trip
 """
 
 
-def main():
-    """Hook entry point."""
-    try:
-        input_data = json.load(sys.stdin)
-        prompt = input_data.get('prompt', '').lower()
+def run(input_data: dict) -> Tuple[int, str]:
+    """
+    Run the circuit breaker check against an already-parsed payload.
 
-        # Apply to /ship
-        is_ship = '/ship' in prompt or '/adx:ship' in prompt
+    Returns (exit_code, output). Exit code 1 means the circuit is open and
+    the prompt should be blocked.
+    """
+    prompt = input_data.get('prompt', '')
 
-        if not is_ship:
-            sys.exit(0)
+    # Apply to /ship
+    if not is_ship_command(prompt):
+        return 0, ""
 
-        # Check for reset flag (applies to both commands)
-        if '--reset' in prompt:
-            cb = CircuitBreaker()
-            cb.reset()
-            print("[circuit-breaker] Reset complete")
-            sys.exit(0)
+    prompt = prompt.lower()
 
-        # Check for status flag (circuit breaker status)
-        if '--cb-status' in prompt:
-            cb = CircuitBreaker()
-            print(cb.get_status())
-            sys.exit(0)
+    # Check for reset flag (applies to both commands)
+    if '--reset' in prompt:
+        cb = CircuitBreaker()
+        cb.reset()
+        return 0, "[circuit-breaker] Reset complete"
 
-        # Normal check
+    # Check for status flag (circuit breaker status)
+    if '--cb-status' in prompt:
         cb = CircuitBreaker()
-        can_continue, reason = cb.should_continue()
+        return 0, cb.get_status()
 
-        if not can_continue:
-            cmd = "ship"
-            print(f"""
+    # Normal check
+    cb = CircuitBreaker()
+    can_continue, reason = cb.should_continue()
+
+    if not can_continue:
+        cmd = "ship"
+        return 1, f"""
 ──────────────────────────────────────────────────
 🛑 CIRCUIT BREAKER TRIGGERED
 ──────────────────────────────────────────────────
@@ -192,10 +195,21 @@ Options:
   /{cmd} --reset    Reset circuit breaker
   Fix issues manually, then retry
 ──────────────────────────────────────────────────
-""")
-            sys.exit(1)
+"""
 
-        sys.exit(0)
+    return 0, ""
+
+
+def main():
+    """Hook entry point."""
+    try:
+        input_data = json.load(sys.stdin)
+
+        exit_code, output = run(input_data)
+        if output:
+            print(output)
+
+        sys.exit(exit_code)
 
     except Exception:
         sys.exit(0)
@@ -12,9 +12,24 @@ import json
 import sys
 from pathlib import Path
 from datetime import datetime
+from typing import Tuple
+
+from utils.prompt_classifier import classify, register_rules
 
 CONTEXT_FILE = Path('.claude/context/session_context.json')
 
+# Compiled into the shared prompt classifier
+CLASSIFIER_GROUP = "session_context"
+register_rules(CLASSIFIER_GROUP, [
+    {
+        "name": "relevant",
+        "keywords": [
+            'plan', 'implement', 'create', 'add', 'build', 'feature',
+            '/ship', '/plan', '/implement'
+        ]
+    },
+])
+
 
 def load_context() -> dict:
     """Load session context if exists."""
@@ -88,28 +103,31 @@ def format_context_summary(context: dict) -> str:
     return header + "\n".join(output_parts) + "\n" + "─" * 50 + "\n"
 
 
+def run(input_data: dict) -> Tuple[int, str]:
+    """Run the hook against an already-parsed payload, returning (exit_code, output)."""
+    prompt = input_data.get('prompt', '')
+
+    # Only show context for planning/implementation commands
+    if not classify(prompt).has(CLASSIFIER_GROUP, "relevant"):
+        return 0, ""
+
+    context = load_context()
+    if context:
+        return 0, format_context_summary(context)
+
+    return 0, ""
+
+
 def main():
     """Hook entry point - inject context on UserPromptSubmit."""
     try:
         input_data = json.load(sys.stdin)
-        prompt = input_data.get('prompt', '').lower()
-
-        # Only show context for planning/implementation commands
-        relevant_keywords = [
-            'plan', 'implement', 'create', 'add', 'build', 'feature',
-            '/ship', '/plan', '/implement'
-        ]
 
-        if not any(kw in prompt for kw in relevant_keywords):
-            sys.exit(0)
+        exit_code, output = run(input_data)
+        if output:
+            print(output)
 
-        context = load_context()
-        if context:
-            output = format_context_summary(context)
-            if output:
-                print(output)
-
-        sys.exit(0)
+        sys.exit(exit_code)
 
     except Exception:
         sys.exit(0)
@@ -20,27 +20,41 @@ import json
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from utils.file_cache import load_json_cached
+from utils.prompt_classifier import classify, is_ship_command, register_rules
+
+
+# cwd -> project root, reused while the root marker still exists
+_project_roots: Dict[Path, Path] = {}
+
+
+def _is_project_root(path: Path) -> bool:
+    return (path / 'package.json').exists() or (path / '.git').exists()
 
 
 def find_project_root() -> Path:
     """Find project root by looking for package.json or .git"""
     current = Path.cwd()
+
+    cached = _project_roots.get(current)
+    if cached is not None and _is_project_root(cached):
+        return cached
+
+    root = current
     for parent in [current] + list(current.parents):
-        if (parent / 'package.json').exists() or (parent / '.git').exists():
-            return parent
-    return current
+        if _is_project_root(parent):
+            root = parent
+            break
+
+    _project_roots[current] = root
+    return root
 
 
 def load_json_file(path: Path) -> Optional[Dict[str, Any]]:
-    """Load JSON file if it exists"""
-    if path.exists():
-        try:
-            with open(path, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return None
-    return None
+    """Load JSON file if it exists (cached by mtime, treat as read-only)"""
+    return load_json_cached(path)
 
 
 def detect_stack(package_json: Dict[str, Any]) -> Dict[str, str]:
@@ -184,67 +198,84 @@ def format_config_summary(
     return header + "\n".join(output_parts) + "\n" + "─" * 50 + "\n"
 
 
+# Compiled into the shared prompt classifier
+CLASSIFIER_GROUP = "dev_standards"
+register_rules(CLASSIFIER_GROUP, [
+    {
+        # Show for implementation-related prompts
+        "name": "implementation",
+        "keywords": [
+            'implement', 'create', 'add', 'build', 'make', 'write',
+            'fix', 'update', 'refactor', 'component', 'hook', 'feature',
+            '/plan', '/implement', '/ship', '/refactor', '/review'
+        ]
+    },
+])
+
+
 def is_autonomous_mode(prompt: str) -> bool:
     """Check if running in autonomous mode (ship)"""
-    prompt_lower = prompt.lower()
-    autonomous_commands = ['/ship', '/adx:ship']
-    return any(cmd in prompt_lower for cmd in autonomous_commands)
+    return is_ship_command(prompt)
 
 
 def should_show_config(prompt: str) -> bool:
     """Determine if config should be shown based on prompt content"""
-    # Show for implementation-related prompts
-    implementation_keywords = [
-        'implement', 'create', 'add', 'build', 'make', 'write',
-        'fix', 'update', 'refactor', 'component', 'hook', 'feature',
-        '/plan', '/implement', '/ship', '/refactor', '/review'
-    ]
+    return classify(prompt).has(CLASSIFIER_GROUP, "implementation")
 
-    prompt_lower = prompt.lower()
-    return any(kw in prompt_lower for kw in implementation_keywords)
 
+def run(input_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Run the hook against an already-parsed payload.
 
-def main():
-    try:
-        # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
-        prompt = input_data.get('prompt', '')
+    Returns (exit_code, output) so the prompt dispatcher can call it in-process.
+    """
+    prompt = input_data.get('prompt', '')
 
-        if not prompt or not should_show_config(prompt):
-            sys.exit(0)
+    if not prompt or not should_show_config(prompt):
+        return 0, ""
 
-        # Check if autonomous mode
-        autonomous = is_autonomous_mode(prompt)
+    # Check if autonomous mode
+    autonomous = is_autonomous_mode(prompt)
 
-        # Find project root
-        root = find_project_root()
-        config_dir = root / '.claude' / 'config'
+    # Find project root
+    root = find_project_root()
+    config_dir = root / '.claude' / 'config'
 
-        # Load configurations
-        code_quality = load_json_file(config_dir / 'code-quality.json')
-        project_structure = load_json_file(config_dir / 'project-structure.json')
-        frontend = load_json_file(config_dir / 'frontend-guidelines.json')
+    # Load configurations
+    code_quality = load_json_file(config_dir / 'code-quality.json')
+    project_structure = load_json_file(config_dir / 'project-structure.json')
+    frontend = load_json_file(config_dir / 'frontend-guidelines.json')
 
-        # Detect stack from package.json
-        package_json = load_json_file(root / 'package.json')
-        stack = detect_stack(package_json) if package_json else {}
+    # Detect stack from package.json
+    package_json = load_json_file(root / 'package.json')
+    stack = detect_stack(package_json) if package_json else {}
 
-        # Get stack-specific rules
-        stack_rules = get_stack_rules(stack)
+    # Get stack-specific rules
+    stack_rules = get_stack_rules(stack)
 
-        # Only output if we have something to show
-        has_config = any([code_quality, project_structure, frontend])
-        has_stack = bool(stack)
+    # Only output if we have something to show
+    has_config = any([code_quality, project_structure, frontend])
+    has_stack = bool(stack)
 
-        if has_config or has_stack:
-            output = format_config_summary(
-                code_quality, project_structure, frontend, stack, stack_rules,
-                autonomous=autonomous
-            )
-            if output:
-                print(output)
+    if has_config or has_stack:
+        output = format_config_summary(
+            code_quality, project_structure, frontend, stack, stack_rules,
+            autonomous=autonomous
+        )
+        return 0, output
 
-        sys.exit(0)
+    return 0, ""
+
+
+def main():
+    try:
+        # Read JSON input from stdin
+        input_data = json.load(sys.stdin)
+
+        exit_code, output = run(input_data)
+        if output:
+            print(output)
+
+        sys.exit(exit_code)
 
     except json.JSONDecodeError:
         sys.exit(0)
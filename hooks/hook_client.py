@@ -0,0 +1,140 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# ///
+
+"""
+Hook Client (UserPromptSubmit)
+
+Thin client for the hook daemon. Forwards the raw stdin payload and the hook
+names to the daemon over its Unix domain socket and relays the daemon's
+stdout, stderr and exit code.
+
+If no daemon is listening for this project, the hooks are run in-process
+through prompt_dispatcher.py instead, so the hook never hard-fails.
+
+Usage (settings.json):
+    uv run hooks/hook_client.py dev_standards_loader context_loader ...
+
+Takes the same arguments as prompt_dispatcher.py.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+# Seconds to wait for the daemon once connected
+RESPONSE_TIMEOUT = 30.0
+
+
+def get_socket_path(project_dir: str = "") -> str:
+    """
+    Get the daemon socket path for a project directory.
+
+    One daemon serves one project. The path lives in the temp directory and is
+    keyed by the project path, because Unix socket paths are length-limited.
+    Override with CLAUDE_HOOKS_SOCKET.
+    """
+    override = os.environ.get("CLAUDE_HOOKS_SOCKET")
+    if override:
+        return override
+    project_dir = os.path.realpath(project_dir or os.getcwd())
+    digest = hashlib.sha1(project_dir.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"adx-hooks-{digest}.sock")
+
+
+def recv_all(sock: socket.socket) -> bytes:
+    """Read from a socket until the peer closes it."""
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def request_daemon(argv: list, payload: str) -> dict:
+    """
+    Send a request to the daemon and return its response.
+
+    Raises ConnectionError if the daemon is not running. Any failure after
+    the request was sent is returned as an empty, successful response, since
+    the hooks may already have run.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise ConnectionError("Unix domain sockets are not supported")
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(get_socket_path())
+        except OSError as e:
+            raise ConnectionError(str(e))
+
+        try:
+            sock.settimeout(RESPONSE_TIMEOUT)
+            request = {"argv": argv, "cwd": os.getcwd(), "payload": payload}
+            sock.sendall(json.dumps(request).encode("utf-8"))
+            sock.shutdown(socket.SHUT_WR)
+            return json.loads(recv_all(sock).decode("utf-8"))
+        except (OSError, ValueError):
+            return {"exit_code": 0, "stdout": "", "stderr": ""}
+    finally:
+        sock.close()
+
+
+def run_in_process(argv: list, payload: str) -> int:
+    """Run the hooks in this process when no daemon is available."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import prompt_dispatcher
+
+    try:
+        input_data = json.loads(payload)
+    except json.JSONDecodeError:
+        return 0
+
+    args = prompt_dispatcher.parse_args(argv)
+    exit_code, output = prompt_dispatcher.dispatch_args(args, input_data)
+    if output:
+        sys.stdout.write(output)
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    # Don't wait for hooks that missed their deadline
+    if prompt_dispatcher.has_running_hooks():
+        os._exit(exit_code)
+    return exit_code
+
+
+def main():
+    try:
+        argv = sys.argv[1:]
+        payload = sys.stdin.read()
+
+        try:
+            response = request_daemon(argv, payload)
+        except ConnectionError:
+            sys.exit(run_in_process(argv, payload))
+
+        # The daemon declines requests it cannot serve (e.g. another project)
+        if response.get("fallback"):
+            sys.exit(run_in_process(argv, payload))
+
+        if response.get("stderr"):
+            sys.stderr.write(response["stderr"])
+        if response.get("stdout"):
+            sys.stdout.write(response["stdout"])
+        sys.exit(response.get("exit_code", 0))
+
+    except Exception as e:
+        print(f"Error in hook_client: {e}", file=sys.stderr)
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# ///
+"""Hook daemon - keeps prompt hooks warm between prompts.
+
+Optional long-lived process, one per project, that listens on a Unix domain
+socket and runs the prompt hooks in-process for hook_client.py. Hook modules
+stay imported, so the knowledge indexes, skill-rules.json, package.json and
+the project root are loaded once and only re-read when their mtime changes.
+
+Usage (from the project directory):
+    hook_daemon start    - Start the daemon in the background
+    hook_daemon serve    - Run the daemon in the foreground
+    hook_daemon stop     - Stop the daemon
+    hook_daemon status   - Show whether the daemon is running
+
+Restart the daemon after updating the hook scripts.
+"""
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import prompt_dispatcher
+from hook_client import get_socket_path, recv_all
+
+# Shut down after this many seconds without a request
+IDLE_TIMEOUT = 4 * 3600
+
+
+def get_pid_path() -> Path:
+    """Get the pid file path for this project's daemon."""
+    return Path(get_socket_path() + ".pid")
+
+
+def read_pid() -> Optional[int]:
+    """Read the daemon pid, or None if it is not running."""
+    try:
+        pid = int(get_pid_path().read_text().strip())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def handle_request(request: Dict[str, Any], project_dir: str) -> Dict[str, Any]:
+    """Run the requested hooks and capture their result."""
+    if os.path.realpath(request.get("cwd", "")) != project_dir:
+        return {"fallback": True}
+
+    try:
+        input_data = json.loads(request.get("payload", ""))
+    except json.JSONDecodeError:
+        return {"exit_code": 0, "stdout": "", "stderr": ""}
+
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        try:
+            args = prompt_dispatcher.parse_args(request.get("argv", []))
+        except SystemExit:
+            # argparse already wrote the usage error; keep the daemon alive
+            return {"exit_code": 0, "stdout": "", "stderr": stderr.getvalue()}
+        exit_code, output = prompt_dispatcher.dispatch_args(args, input_data)
+
+    return {"exit_code": exit_code, "stdout": output, "stderr": stderr.getvalue()}
+
+
+class HookRequestHandler(socketserver.BaseRequestHandler):
+    """Handle one hook_client.py request per connection."""
+
+    def handle(self):
+        try:
+            request = json.loads(recv_all(self.request).decode("utf-8"))
+            response = handle_request(request, self.server.project_dir)
+        except Exception as e:
+            response = {"exit_code": 0, "stdout": "", "stderr": f"Error in hook_daemon: {e}\n"}
+        self.request.sendall(json.dumps(response).encode("utf-8"))
+
+
+class HookServer(socketserver.UnixStreamServer):
+    """Serves requests one at a time, like consecutive hook invocations."""
+
+    timeout = IDLE_TIMEOUT
+
+    def __init__(self, socket_path: str, project_dir: str):
+        self.project_dir = project_dir
+        self.idle = False
+        super().__init__(socket_path, HookRequestHandler)
+
+    def handle_timeout(self):
+        self.idle = True
+
+
+def remove_stale_socket(socket_path: str) -> bool:
+    """
+    Remove a socket file left behind by a dead daemon.
+
+    Returns False if a live daemon is still listening on it.
+    """
+    if not os.path.exists(socket_path):
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return False
+    except OSError:
+        os.unlink(socket_path)
+        return True
+    finally:
+        probe.close()
+
+
+def cmd_serve():
+    """Run the daemon in the foreground."""
+    socket_path = get_socket_path()
+    if not remove_stale_socket(socket_path):
+        print(f"Hook daemon already running on {socket_path}")
+        sys.exit(1)
+
+    project_dir = os.path.realpath(os.getcwd())
+    server = HookServer(socket_path, project_dir)
+    os.chmod(socket_path, 0o600)
+    get_pid_path().write_text(str(os.getpid()))
+
+    # Import hooks up front so the first prompt is already warm
+    for name in prompt_dispatcher.PROMPT_HOOKS:
+        try:
+            prompt_dispatcher.load_hook(name)
+        except Exception as e:
+            print(f"Warning: could not preload {name}: {e}", file=sys.stderr)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        while not server.idle:
+            server.handle_request()
+    finally:
+        server.server_close()
+        for path in (socket_path, str(get_pid_path())):
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+
+def cmd_start():
+    """Start the daemon in the background."""
+    pid = read_pid()
+    if pid:
+        print(f"Hook daemon already running (pid {pid})")
+        return
+
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "serve"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    print(f"Hook daemon started (pid {process.pid})")
+    print(f"Socket: {get_socket_path()}")
+
+
+def cmd_stop():
+    """Stop the daemon."""
+    pid = read_pid()
+    if not pid:
+        print("Hook daemon is not running")
+        return
+    os.kill(pid, signal.SIGTERM)
+    print(f"Hook daemon stopped (pid {pid})")
+
+
+def cmd_status():
+    """Show daemon status."""
+    pid = read_pid()
+    if pid:
+        print(f"Hook daemon running (pid {pid})")
+        print(f"Socket: {get_socket_path()}")
+    else:
+        print("Hook daemon is not running")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == "serve":
+        cmd_serve()
+    elif command == "start":
+        cmd_start()
+    elif command == "stop":
+        cmd_stop()
+    elif command == "status":
+        cmd_status()
+    else:
+        print(f"Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
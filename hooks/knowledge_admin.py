@@ -0,0 +1,422 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+"""Knowledge store maintenance CLI.
+
+Usage:
+    knowledge_admin migrate-backend <json|sqlite> [shared|personal|all]
+        - Move fragments to another store backend (default scope: all)
+    knowledge_admin migrate-storage <files|packed> [shared|personal|all]
+        - Move fragments to another storage layout (default scope: all)
+    knowledge_admin migrate-index <json|binary> [shared|personal|all]
+        - Rewrite the index as index.json or memory-mapped index.bin
+    knowledge_admin export-index <path> [shared|personal]
+        - Write the index as JSON (e.g. to inspect a binary index)
+    knowledge_admin sync [shared|personal|all]
+        - Index fragment files added, changed or removed outside the store
+          (e.g. by git pull); only the differences are applied
+    knowledge_admin rebuild [--workers N] [shared|personal|all]
+        - Rebuild the index from every fragment, tokenizing in N worker
+          processes (default: one per CPU); prints fragments per second
+    knowledge_admin compact [shared|personal|all]
+        - Fold the index journal and access log into their snapshots and
+          drop superseded packed records (sqlite: merge FTS segments and vacuum)
+    knowledge_admin compare-scorers "<query>" [shared|personal|all]
+        - Rank the query with the tfidf and bm25 scorers side by side
+    knowledge_admin search-batch <queries-file> [shared|personal] [top_k]
+        - Run one query per line and print JSON lines of results
+          (vectorised when NumPy is installed)
+    knowledge_admin set-analyzer [--stem] [--ngrams] [--positions] [shared|personal|all]
+        - Choose tokenizer stages and whether term positions are kept for
+          phrase/proximity queries (flags not given are turned off), and
+          rebuild the index
+    knowledge_admin rebalance <shards> [id|tag] [shared|personal|all]
+        - Split the index into N shards (1: a single index), assigned by
+          fragment id hash (default) or tag family
+    knowledge_admin cache-stats
+        - Show the retrieval result cache's size and hit/miss counts
+    knowledge_admin cache-clear
+        - Empty the retrieval result cache and reset its counters
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from utils.fragment_storage import STORAGE_TYPES
+from utils.knowledge_store import (
+    BACKEND_JSON,
+    BACKEND_SQLITE,
+    BACKENDS,
+    INDEX_FORMATS,
+    SCORERS,
+    SCOPE_PERSONAL,
+    SCOPE_SHARED,
+    get_store_dir,
+    load_store_config,
+    open_store,
+    save_store_config,
+)
+from utils.knowledge_shards import SHARD_BY_ID, SHARD_STRATEGIES, rebalance_store
+from utils.result_cache import ResultCache
+
+SCOPES = {
+    "shared": [SCOPE_SHARED],
+    "personal": [SCOPE_PERSONAL],
+    "all": [SCOPE_SHARED, SCOPE_PERSONAL],
+}
+
+
+def parse_scopes(args: List[str]) -> List[str]:
+    """Parse the optional scope argument."""
+    name = args[0] if args else "all"
+    if name not in SCOPES:
+        print(f"Unknown scope: {name} (expected shared, personal or all)")
+        sys.exit(1)
+    return SCOPES[name]
+
+
+def parse_scope(args: List[str]) -> str:
+    """Parse an optional single-scope argument (default: shared)."""
+    name = args[0] if args else "shared"
+    if name not in ("shared", "personal"):
+        print(f"Unknown scope: {name} (expected shared or personal)")
+        sys.exit(1)
+    return SCOPES[name][0]
+
+
+def cmd_migrate_backend(backend: str, scopes: List[str]):
+    """Copy every fragment into another backend and switch the store to it."""
+    if backend not in BACKENDS:
+        print(f"Unknown backend: {backend} (expected {' or '.join(BACKENDS)})")
+        sys.exit(1)
+
+    for scope in scopes:
+        base_dir = get_store_dir(scope)
+        config = load_store_config(base_dir)
+        previous = config["backend"]
+        if previous == backend:
+            print(f"{scope}: already using the {backend} backend")
+            continue
+
+        source = open_store(scope)
+        if backend == BACKEND_SQLITE:
+            from utils.knowledge_sqlite import SQLiteKnowledgeStore
+            target = SQLiteKnowledgeStore(scope)
+        else:
+            target = open_store(scope, backend=BACKEND_JSON)
+
+        fragments = source.list_all()
+        # Fold access counters into the fragments; the target starts fresh
+        access = source.access_stats(fragments)
+        for fragment in fragments:
+            fragment.accessed_count, fragment.last_accessed = access[fragment.id]
+        target.clear()
+        count = target.add_many(fragments)
+
+        config["backend"] = backend
+        save_store_config(base_dir, config)
+        source.clear()
+        print(f"{scope}: migrated {count} fragments from the {previous} to the {backend} backend")
+
+
+def cmd_migrate_storage(kind: str, scopes: List[str]):
+    """Move fragments to another storage layout."""
+    if kind not in STORAGE_TYPES:
+        print(f"Unknown storage: {kind} (expected {' or '.join(STORAGE_TYPES)})")
+        sys.exit(1)
+
+    for scope in scopes:
+        if load_store_config(get_store_dir(scope))["backend"] != BACKEND_JSON:
+            print(f"{scope}: storage layouts only apply to the {BACKEND_JSON} backend")
+            continue
+        store = open_store(scope)
+        previous = store.config["storage"]
+        if previous == kind:
+            print(f"{scope}: already using {kind} storage")
+            continue
+        count = store.migrate_storage(kind)
+        print(f"{scope}: migrated {count} fragments from {previous} to {kind} storage")
+
+
+def cmd_migrate_index(kind: str, scopes: List[str]):
+    """Rewrite the index in another on-disk format."""
+    if kind not in INDEX_FORMATS:
+        print(f"Unknown index format: {kind} (expected {' or '.join(INDEX_FORMATS)})")
+        sys.exit(1)
+
+    for scope in scopes:
+        if load_store_config(get_store_dir(scope))["backend"] != BACKEND_JSON:
+            print(f"{scope}: index formats only apply to the {BACKEND_JSON} backend")
+            continue
+        store = open_store(scope)
+        previous = store.index_format
+        if previous == kind:
+            print(f"{scope}: already using the {kind} index format")
+            continue
+        count = store.migrate_index_format(kind)
+        print(f"{scope}: rewrote the index of {count} fragments from {previous} to {kind}")
+
+
+def cmd_export_index(path: str, scope: str):
+    """Export a store's index as JSON."""
+    if load_store_config(get_store_dir(scope))["backend"] != BACKEND_JSON:
+        print(f"{scope}: only the {BACKEND_JSON} backend has an index to export")
+        sys.exit(1)
+    open_store(scope).export_index(Path(path))
+    print(f"{scope}: index written to {path}")
+
+
+def cmd_sync(scopes: List[str]):
+    """Apply fragment changes made outside the store to its index."""
+    for scope in scopes:
+        start = time.perf_counter()
+        counts = open_store(scope).sync()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(
+            f"{scope}: {counts['added']} added, {counts['changed']} changed, "
+            f"{counts['removed']} removed, {counts['unchanged']} unchanged ({elapsed:.0f}ms)"
+        )
+
+
+def progress_printer(scope: str):
+    """rebuild_index() progress callback printing at most one line per second."""
+    last = [0.0]
+
+    def progress(done: int, total: int, elapsed: float) -> None:
+        if done < total and elapsed - last[0] < 1.0:
+            return
+        last[0] = elapsed
+        rate = done / elapsed if elapsed > 0 else 0.0
+        print(f"{scope}: {done}/{total} fragments ({rate:.0f}/s)", flush=True)
+
+    return progress
+
+
+def rebuild(scope: str, workers: int) -> int:
+    """Rebuild a json-backend store's index with progress output; returns the fragment count."""
+    start = time.perf_counter()
+    count = open_store(scope).rebuild_index(workers, progress_printer(scope))
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{scope}: indexed {count} fragments in {elapsed:.1f}s ({rate:.0f}/s)")
+    return count
+
+
+def cmd_rebuild(workers: int, scopes: List[str]):
+    """Rebuild the index from every fragment."""
+    for scope in scopes:
+        if load_store_config(get_store_dir(scope))["backend"] != BACKEND_JSON:
+            open_store(scope).rebuild_index()
+            print(f"{scope}: full-text index rebuilt")
+            continue
+        rebuild(scope, workers)
+
+
+def cmd_compact(scopes: List[str]):
+    """Compact the index journal, packed fragment file and access log."""
+    for scope in scopes:
+        store = open_store(scope)
+        # A sharded store is compacted shard by shard
+        for part in getattr(store, "shards", [store]):
+            part.compact()
+            storage = getattr(part, "storage", None)
+            if hasattr(storage, "compact"):
+                storage.compact()
+            access = getattr(part, "access", None)
+            if access is not None:
+                # Also drops counters of deleted fragments
+                access.compact(set(part.index.doc_lengths))
+        print(f"{scope}: compacted")
+
+
+def cmd_compare_scorers(query: str, scopes: List[str], top_k: int = 5):
+    """Print each scorer's ranking and latency for a query."""
+    for scope in scopes:
+        if load_store_config(get_store_dir(scope))["backend"] != BACKEND_JSON:
+            print(f"{scope}: scorers only apply to the {BACKEND_JSON} backend")
+            continue
+        store = open_store(scope)
+        num_docs = sum(part.index.num_docs for part in getattr(store, "shards", [store]))
+        print(f"{scope} ({num_docs} fragments)")
+        for scorer in SCORERS:
+            # First call warms caches (BM25 term bounds); time the second
+            store.rank(query, top_k, scorer)
+            start = time.perf_counter()
+            results = store.rank(query, top_k, scorer)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"  {scorer} ({elapsed:.2f}ms)")
+            for doc_id, score in results:
+                fragment = store.get(doc_id)
+                preview = fragment.content[:60].replace("\n", " ") if fragment else ""
+                print(f"    {score:.3f}  {doc_id}  {preview}")
+
+
+def cmd_search_batch(path: str, scope: str, top_k: int):
+    """Search every query in a file and print one JSON line per query."""
+    with open(path, 'r') as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    store = open_store(scope)
+    for query, results in zip(queries, store.search_many(queries, top_k)):
+        print(json.dumps({
+            "query": query,
+            "results": [{"id": fragment.id, "score": round(score, 4)} for fragment, score in results],
+        }))
+
+
+def cmd_set_analyzer(options: List[str], scopes: List[str]):
+    """Change the tokenizer settings and rebuild the index."""
+    unknown = [o for o in options if o not in ("--stem", "--ngrams", "--positions")]
+    if unknown:
+        print(f"Unknown option: {unknown[0]} (expected --stem, --ngrams or --positions)")
+        sys.exit(1)
+
+    for scope in scopes:
+        base_dir = get_store_dir(scope)
+        config = load_store_config(base_dir)
+        if config["backend"] != BACKEND_JSON:
+            print(f"{scope}: analyzer settings only apply to the {BACKEND_JSON} backend")
+            continue
+        config["stemming"] = "--stem" in options
+        config["ngrams"] = "--ngrams" in options
+        config["positions"] = "--positions" in options
+        save_store_config(base_dir, config)
+        rebuild(scope, 0)
+        print(f"{scope}: stemming={'on' if config['stemming'] else 'off'}, "
+              f"ngrams={'on' if config['ngrams'] else 'off'}, "
+              f"positions={'on' if config['positions'] else 'off'}")
+
+
+def cmd_rebalance(num_shards: int, strategy: str, scopes: List[str]):
+    """Move fragments to a new shard layout."""
+    if num_shards < 1:
+        print(f"Invalid shard count: {num_shards}")
+        sys.exit(1)
+    if strategy not in SHARD_STRATEGIES:
+        print(f"Unknown shard strategy: {strategy} (expected {' or '.join(SHARD_STRATEGIES)})")
+        sys.exit(1)
+
+    for scope in scopes:
+        config = load_store_config(get_store_dir(scope))
+        if config["backend"] != BACKEND_JSON:
+            print(f"{scope}: sharding only applies to the {BACKEND_JSON} backend")
+            continue
+        if config["shards"] == num_shards and (num_shards == 1 or config["shard_by"] == strategy):
+            print(f"{scope}: already using {num_shards} shard(s)")
+            continue
+        start = time.perf_counter()
+        count = rebalance_store(scope, num_shards, strategy)
+        elapsed = time.perf_counter() - start
+        layout = f"{num_shards} shards by {strategy}" if num_shards > 1 else "a single index"
+        print(f"{scope}: moved {count} fragments to {layout} ({elapsed:.1f}s)")
+
+
+def cmd_cache_stats():
+    """Print the result cache counters."""
+    stats = ResultCache().stats()
+    print(f"entries: {stats['entries']}/{stats['max_entries']}")
+    print(f"hits: {stats['hits']}, misses: {stats['misses']} (hit rate {stats['hit_rate']:.1%})")
+
+
+def cmd_cache_clear():
+    """Empty the result cache."""
+    ResultCache().clear()
+    print("result cache cleared")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == "migrate-backend":
+        if len(sys.argv) < 3:
+            print("Usage: knowledge_admin migrate-backend <json|sqlite> [shared|personal|all]")
+            sys.exit(1)
+        cmd_migrate_backend(sys.argv[2], parse_scopes(sys.argv[3:]))
+
+    elif command == "migrate-storage":
+        if len(sys.argv) < 3:
+            print("Usage: knowledge_admin migrate-storage <files|packed> [shared|personal|all]")
+            sys.exit(1)
+        cmd_migrate_storage(sys.argv[2], parse_scopes(sys.argv[3:]))
+
+    elif command == "migrate-index":
+        if len(sys.argv) < 3:
+            print("Usage: knowledge_admin migrate-index <json|binary> [shared|personal|all]")
+            sys.exit(1)
+        cmd_migrate_index(sys.argv[2], parse_scopes(sys.argv[3:]))
+
+    elif command == "export-index":
+        if len(sys.argv) < 3:
+            print("Usage: knowledge_admin export-index <path> [shared|personal]")
+            sys.exit(1)
+        cmd_export_index(sys.argv[2], parse_scope(sys.argv[3:]))
+
+    elif command == "sync":
+        cmd_sync(parse_scopes(sys.argv[2:]))
+
+    elif command == "rebuild":
+        args = sys.argv[2:]
+        workers = 0
+        if args and args[0] == "--workers":
+            if len(args) < 2 or not args[1].isdigit():
+                print("Usage: knowledge_admin rebuild [--workers N] [shared|personal|all]")
+                sys.exit(1)
+            workers = int(args[1])
+            args = args[2:]
+        cmd_rebuild(workers, parse_scopes(args))
+
+    elif command == "compact":
+        cmd_compact(parse_scopes(sys.argv[2:]))
+
+    elif command == "compare-scorers":
+        if len(sys.argv) < 3:
+            print('Usage: knowledge_admin compare-scorers "<query>" [shared|personal|all]')
+            sys.exit(1)
+        cmd_compare_scorers(sys.argv[2], parse_scopes(sys.argv[3:]))
+
+    elif command == "search-batch":
+        if len(sys.argv) < 3:
+            print("Usage: knowledge_admin search-batch <queries-file> [shared|personal] [top_k]")
+            sys.exit(1)
+        top_k = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+        cmd_search_batch(sys.argv[2], parse_scope(sys.argv[3:]), top_k)
+
+    elif command == "set-analyzer":
+        args = sys.argv[2:]
+        options = [a for a in args if a.startswith("--")]
+        cmd_set_analyzer(options, parse_scopes([a for a in args if not a.startswith("--")]))
+
+    elif command == "rebalance":
+        if len(sys.argv) < 3 or not sys.argv[2].isdigit():
+            print("Usage: knowledge_admin rebalance <shards> [id|tag] [shared|personal|all]")
+            sys.exit(1)
+        args = sys.argv[3:]
+        strategy = SHARD_BY_ID
+        if args and args[0] in SHARD_STRATEGIES:
+            strategy = args.pop(0)
+        cmd_rebalance(int(sys.argv[2]), strategy, parse_scopes(args))
+
+    elif command == "cache-stats":
+        cmd_cache_stats()
+
+    elif command == "cache-clear":
+        cmd_cache_clear()
+
+    else:
+        print(f"Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
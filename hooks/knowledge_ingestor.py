@@ -14,7 +14,7 @@ Runs at session end. Parses the session transcript and extracts learnings:
 
 Creates knowledge fragments from extracted info and stores them in the
 appropriate scope (shared for project decisions, personal for session context).
-Deduplicates against existing fragments via fuzzy matching.
+Deduplicates against existing fragments via MinHash near-duplicate lookup.
 """
 
 import json
@@ -37,6 +37,15 @@ from utils.knowledge_store import (
 )
 from utils.constants import ensure_session_log_dir
 
+# Jaccard similarity of analyzed term sets (content plus tags) at which a new
+# fragment counts as a duplicate. Learnings are a few terms plus shared tags,
+# so one replaced term ("zod" vs "yup" for form validation) still scores
+# 0.7-0.8; 0.85 only merges rewordings that add a term. Summaries share
+# their boilerplate and tags, so different sessions score 0.55-0.75 and
+# ones with most of the same files 0.8 or more.
+LEARNING_DUPLICATE_JACCARD = 0.85
+SUMMARY_DUPLICATE_JACCARD = 0.8
+
 
 # Patterns for extracting learnings from transcripts
 LEARNING_PATTERNS = [
@@ -203,46 +212,51 @@ def create_session_fragments(
     """
     created = []
 
-    for learning in learnings:
-        content = learning["content"]
-        tags = learning["tags"] + ["session-learned"]
-        scope = learning["scope"]
-
-        # Check for duplicates
-        target_store = store.shared if scope == SCOPE_SHARED else store.personal
-        if find_similar(content, target_store, threshold=0.6):
-            continue
-
-        # Create and store fragment
-        fragment = Fragment(
-            content=content,
-            tags=tags,
-            source=f"session:{session_id}",
-            scope=scope
-        )
-
-        store.add(fragment)
-        created.append(fragment)
-
-    # Create a session summary fragment if files were worked on
-    if files and len(created) > 0:
-        summary = f"Session worked on {len(files)} files"
-        if files[:5]:
-            summary += ": " + ", ".join(os.path.basename(f) for f in files[:5])
-            if len(files) > 5:
-                summary += f" (+{len(files) - 5} more)"
-
-        # Store as personal context
-        if not find_similar(summary, store.personal, threshold=0.7):
+    # One transaction per store: a session's fragments cost one journal
+    # write each, and nothing is stored if ingestion fails halfway
+    with store.batch():
+        for learning in learnings:
+            content = learning["content"]
+            tags = learning["tags"] + ["session-learned"]
+            scope = learning["scope"]
+
+            # Check for duplicates
+            target_store = store.shared if scope == SCOPE_SHARED else store.personal
+            if find_similar(content, target_store, threshold=LEARNING_DUPLICATE_JACCARD, tags=tags):
+                continue
+
+            # Create and store fragment
             fragment = Fragment(
-                content=summary,
-                tags=["session-context", "files"],
+                content=content,
+                tags=tags,
                 source=f"session:{session_id}",
-                scope=SCOPE_PERSONAL
+                scope=scope
             )
+
             store.add(fragment)
             created.append(fragment)
 
+        # Create a session summary fragment if files were worked on
+        if files and len(created) > 0:
+            summary = f"Session worked on {len(files)} files"
+            if files[:5]:
+                summary += ": " + ", ".join(os.path.basename(f) for f in files[:5])
+                if len(files) > 5:
+                    summary += f" (+{len(files) - 5} more)"
+
+            # Store as personal context
+            summary_tags = ["session-context", "files"]
+            if not find_similar(summary, store.personal, threshold=SUMMARY_DUPLICATE_JACCARD,
+                                tags=summary_tags):
+                fragment = Fragment(
+                    content=summary,
+                    tags=summary_tags,
+                    source=f"session:{session_id}",
+                    scope=SCOPE_PERSONAL
+                )
+                store.add(fragment)
+                created.append(fragment)
+
     return created
 
 
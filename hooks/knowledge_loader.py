@@ -16,6 +16,7 @@ This hook handles knowledge fragment retrieval.
 import json
 import sys
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
@@ -51,38 +52,55 @@ def should_retrieve(prompt: str) -> bool:
     return True
 
 
+# Retriever kept for the life of the process (warm in the hook daemon)
+_retriever: Optional[KnowledgeRetriever] = None
+
+
+def get_retriever() -> KnowledgeRetriever:
+    """Get the process-wide retriever, reloading indexes changed on disk."""
+    global _retriever
+    if _retriever is None:
+        _retriever = KnowledgeRetriever()
+    else:
+        _retriever.store.refresh()
+    return _retriever
+
+
+def run(input_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Run the hook against an already-parsed payload, returning (exit_code, output)."""
+    prompt = input_data.get("prompt", "")
+
+    if not should_retrieve(prompt):
+        return 0, ""
+
+    # Get the retriever
+    retriever = get_retriever()
+
+    # Retrieve and format relevant fragments
+    results = retriever.retrieve(prompt, top_k=5)
+    output = retriever.format_results(results, format_style="context")
+
+    if output:
+        # Mark fragments as accessed
+        fragments = [f for f, _ in results]
+        try:
+            retriever.mark_retrieved(fragments)
+        except Exception:
+            pass  # Don't fail if tracking update fails
+
+    return 0, output
+
+
 def main():
     """Hook entry point - runs on UserPromptSubmit."""
     try:
         input_data = json.load(sys.stdin)
-        prompt = input_data.get("prompt", "")
-
-        if not should_retrieve(prompt):
-            sys.exit(0)
-
-        # Get the retriever
-        retriever = KnowledgeRetriever()
-
-        # Retrieve and format relevant fragments
-        output = retriever.retrieve_and_format(
-            prompt=prompt,
-            top_k=5,
-            format_style="context"
-        )
 
+        exit_code, output = run(input_data)
         if output:
             print(output)
 
-            # Mark fragments as accessed
-            results = retriever.retrieve(prompt, top_k=5)
-            if results:
-                fragments = [f for f, _ in results]
-                try:
-                    retriever.mark_retrieved(fragments)
-                except Exception:
-                    pass  # Don't fail if tracking update fails
-
-        sys.exit(0)
+        sys.exit(exit_code)
 
     except json.JSONDecodeError:
         sys.exit(0)
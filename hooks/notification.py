@@ -14,7 +14,7 @@ import subprocess
 import random
 from pathlib import Path
 
-from utils.constants import ensure_session_log_dir
+from utils.session_log import append_event
 
 try:
     from dotenv import load_dotenv
@@ -38,26 +38,8 @@ def main():
         # Extract session_id
         session_id = input_data.get('session_id', 'unknown')
 
-        # Ensure session log directory exists
-        log_dir = ensure_session_log_dir(session_id)
-        log_file = log_dir / 'notification.json'
-
-        # Read existing log data or initialize empty list
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-
-        # Append new data
-        log_data.append(input_data)
-
-        # Write back to file with formatting
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        # Append one line to the session's event log
+        append_event(session_id, 'notification', input_data)
 
 
         sys.exit(0)
@@ -3,49 +3,26 @@
 # requires-python = ">=3.8"
 # ///
 
-import json
-import os
+"""
+PostToolUse logging hook (fast path).
+
+Runs on every tool call, so it only imports os/sys and appends the raw stdin
+payload to logs/<session_id>/post_tool_use.jsonl with a single write.
+See utils/fast_log.py for the latency target.
+"""
+
 import sys
-from pathlib import Path
 
-from utils.constants import ensure_session_log_dir
+from utils.fast_log import append_raw_event
 
 def main():
     try:
-        # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
-
-        # Extract session_id
-        session_id = input_data.get('session_id', 'unknown')
-
-        # Ensure session log directory exists
-        log_dir = ensure_session_log_dir(session_id)
-        log_path = log_dir / 'post_tool_use.json'
-
-        # Read existing log data or initialize empty list
-        if log_path.exists():
-            with open(log_path, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-
-        # Append new data
-        log_data.append(input_data)
-
-        # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
-
+        # Append the raw payload without parsing it
+        append_raw_event('post_tool_use', sys.stdin.buffer.read())
         sys.exit(0)
 
-    except json.JSONDecodeError:
-        # Handle JSON decode errors gracefully
-        sys.exit(0)
     except Exception:
-        # Exit cleanly on any other error
+        # Exit cleanly on any error
         sys.exit(0)
 
 if __name__ == '__main__':
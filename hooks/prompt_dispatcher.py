@@ -0,0 +1,320 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.10"
+# ///
+
+"""
+Prompt Dispatcher Hook (UserPromptSubmit)
+
+Runs every UserPromptSubmit hook inside a single interpreter. The stdin payload
+is read and parsed once and each hook module is imported. Hooks with side
+effects (SEQUENTIAL_HOOKS: the checkpoint's `--rollback` resets the working
+tree) run first, one at a time and without a deadline; the read-only loaders
+are then called in parallel on a thread pool, so they never see a tree being
+rewritten under them. Output is merged in the configured order once every
+hook has finished or missed its deadline.
+
+Usage (settings.json):
+    uv run hooks/prompt_dispatcher.py dev_standards_loader context_loader ...
+
+Hook names are the script names without `.py`. When no names are given the
+default order in PROMPT_HOOKS is used.
+
+Hook exit codes are not passed on: the dispatcher always exits 0 with the
+merged output, as each hook did when it was registered with `|| true`. A
+non-zero exit would make Claude Code discard stdout, dropping every hook's
+context (and the circuit breaker's own warning) for the prompt.
+
+Loaders that miss their deadline are skipped, reported on stderr and logged
+to logs/<session>/hook_dispatch.jsonl; the budget and deadlines start once the
+sequential hooks are done.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from datetime import datetime
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+HOOKS_DIR = Path(__file__).resolve().parent
+
+# Make `utils.*` importable for the hook modules
+sys.path.insert(0, str(HOOKS_DIR))
+
+from utils.session_log import append_event
+
+# Latency limits (override with --budget-ms / --deadline-ms / --deadline NAME=MS
+# or CLAUDE_HOOKS_BUDGET_MS / CLAUDE_HOOKS_DEADLINE_MS)
+DEFAULT_BUDGET_MS = 2000
+DEFAULT_DEADLINE_MS = 1500
+
+# Default order, matching the original settings.json registration
+PROMPT_HOOKS: List[str] = [
+    "dev_standards_loader",
+    "context_loader",
+    "state_loader",
+    "smart_context_loader",
+    "skill-activation-prompt",
+    "circuit_breaker",
+    "ship_loader",
+    "checkpoint",
+    "user_prompt_submit",
+    "knowledge_loader",
+]
+
+# Hooks that change state (the working tree, the circuit breaker) and must not
+# overlap other hooks; run in order before the parallel loaders, never skipped
+SEQUENTIAL_HOOKS: Set[str] = {"circuit_breaker", "checkpoint"}
+
+_loaded_hooks: Dict[str, ModuleType] = {}
+
+# Hooks currently executing on a worker thread
+_running: Set[str] = set()
+_running_lock = threading.Lock()
+
+
+def load_hook(name: str) -> ModuleType:
+    """
+    Import a hook script as a module.
+
+    Hook scripts are not a package and some names contain dashes, so they are
+    loaded by path. Modules are cached for the lifetime of the process.
+    """
+    if name in _loaded_hooks:
+        return _loaded_hooks[name]
+
+    path = HOOKS_DIR / f"{name}.py"
+    module_name = "hook_" + name.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load hook: {path}")
+
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    if not callable(getattr(module, "run", None)):
+        raise ImportError(f"Hook {name} has no run() function")
+
+    _loaded_hooks[name] = module
+    return module
+
+
+def get_runner(name: str, validate: bool = False) -> Callable[[Dict[str, Any]], Tuple[int, str]]:
+    """Get the run() callable for a hook, binding hook-specific options."""
+    module = load_hook(name)
+    if name == "user_prompt_submit":
+        return lambda input_data: module.run(input_data, validate=validate)
+    return module.run
+
+
+def run_hook(name: str, input_data: Dict[str, Any], validate: bool = False) -> Tuple[int, str]:
+    """
+    Run a single hook in-process.
+
+    Errors are contained the same way each script's main() contains them:
+    the hook is treated as a silent success.
+    """
+    try:
+        runner = get_runner(name, validate=validate)
+        exit_code, output = runner(input_data)
+        return exit_code or 0, output or ""
+    except Exception as e:
+        print(f"Error in {name}: {e}", file=sys.stderr)
+        return 0, ""
+
+
+def _run_tracked(name: str, input_data: Dict[str, Any], validate: bool) -> Tuple[int, str]:
+    """Run a hook on a worker thread, tracking it as in flight until it returns."""
+    try:
+        return run_hook(name, input_data, validate=validate)
+    finally:
+        with _running_lock:
+            _running.discard(name)
+
+
+def has_running_hooks() -> bool:
+    """True if a hook that missed its deadline is still running."""
+    with _running_lock:
+        return bool(_running)
+
+
+def log_skipped_hooks(session_id: str, skipped: List[Dict[str, Any]]):
+    """Log hooks skipped for missing their deadline to the session directory."""
+    try:
+        append_event(session_id, 'hook_dispatch', {
+            'timestamp': datetime.now().isoformat(),
+            'skipped': skipped
+        })
+    except Exception:
+        pass  # Don't fail the hook if logging fails
+
+
+def dispatch(
+    names: List[str],
+    input_data: Dict[str, Any],
+    validate: bool = False,
+    budget_ms: int = DEFAULT_BUDGET_MS,
+    deadline_ms: int = DEFAULT_DEADLINE_MS,
+    deadlines: Optional[Dict[str, int]] = None
+) -> Tuple[int, str]:
+    """
+    Run hooks and merge their results in the given order.
+
+    SEQUENTIAL_HOOKS run first, one after another and to completion. The
+    other hooks then run in parallel, each with its own deadline
+    (deadlines[name], else deadline_ms) capped by the total budget, both
+    measured from the start of the parallel phase. A hook that misses its
+    deadline is skipped and logged; it keeps running in the background but
+    its output is dropped. A hook still running from an earlier prompt (in
+    the daemon) is skipped rather than run twice concurrently.
+
+    Returns (exit_code, output); exit_code is always 0 (see module docstring).
+    Output is each hook's output followed by a newline, exactly as the
+    standalone scripts would have printed it.
+    """
+    deadlines = deadlines or {}
+    skipped: List[Dict[str, Any]] = []
+
+    # Import every hook up front so module loading never races between threads
+    for name in names:
+        try:
+            load_hook(name)
+        except Exception:
+            pass  # Reported by run_hook()
+
+    def claim(name: str) -> bool:
+        with _running_lock:
+            if name in _running:
+                skipped.append({'hook': name, 'reason': 'still running'})
+                return False
+            _running.add(name)
+            return True
+
+    results: Dict[str, str] = {}
+    for name in names:
+        if name in SEQUENTIAL_HOOKS and claim(name):
+            _, results[name] = _run_tracked(name, input_data, validate)
+
+    parallel = [name for name in names if name not in SEQUENTIAL_HOOKS]
+    start = time.monotonic()
+    futures: Dict[str, Future] = {}
+    executor = ThreadPoolExecutor(max_workers=max(len(parallel), 1),
+                                  thread_name_prefix="prompt-hook")
+    try:
+        for name in parallel:
+            if claim(name):
+                futures[name] = executor.submit(_run_tracked, name, input_data, validate)
+    finally:
+        executor.shutdown(wait=False)
+
+    outputs: List[str] = []
+
+    for name in names:
+        if name in results:
+            output = results[name]
+            if output:
+                outputs.append(output + "\n")
+            continue
+        future = futures.get(name)
+        if future is None:
+            continue
+
+        hook_deadline = start + min(deadlines.get(name, deadline_ms), budget_ms) / 1000
+        try:
+            _, output = future.result(timeout=max(hook_deadline - time.monotonic(), 0))
+        except FuturesTimeout:
+            limit_ms = min(deadlines.get(name, deadline_ms), budget_ms)
+            skipped.append({'hook': name, 'reason': f'missed {limit_ms}ms deadline'})
+            continue
+
+        # The exit code is ignored, like `|| true` did for each script
+        if output:
+            outputs.append(output + "\n")
+
+    if skipped:
+        for entry in skipped:
+            print(f"[prompt_dispatcher] Skipped {entry['hook']}: {entry['reason']}",
+                  file=sys.stderr)
+        log_skipped_hooks(input_data.get('session_id', 'unknown'), skipped)
+
+    return 0, "".join(outputs)
+
+
+def parse_deadline(value: str) -> Tuple[str, int]:
+    """Parse a NAME=MS per-hook deadline override."""
+    name, sep, ms = value.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=MS, got {value!r}")
+    try:
+        return name, int(ms)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid deadline for {name}: {ms!r}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('hooks', nargs='*',
+                        help='Hook names to run; output is merged in this order')
+    parser.add_argument('--validate', action='store_true',
+                        help='Enable prompt validation in user_prompt_submit')
+    parser.add_argument('--budget-ms', type=int,
+                        default=int(os.environ.get('CLAUDE_HOOKS_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='Total latency budget for all hooks')
+    parser.add_argument('--deadline-ms', type=int,
+                        default=int(os.environ.get('CLAUDE_HOOKS_DEADLINE_MS', DEFAULT_DEADLINE_MS)),
+                        help='Default deadline per hook')
+    parser.add_argument('--deadline', type=parse_deadline, action='append', default=[],
+                        metavar='NAME=MS', help='Deadline override for one hook')
+    return parser.parse_args(argv)
+
+
+def dispatch_args(args: argparse.Namespace, input_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Run dispatch() with options from parse_args()."""
+    return dispatch(
+        args.hooks or PROMPT_HOOKS,
+        input_data,
+        validate=args.validate,
+        budget_ms=args.budget_ms,
+        deadline_ms=args.deadline_ms,
+        deadlines=dict(args.deadline)
+    )
+
+
+def main():
+    try:
+        args = parse_args()
+
+        # Read JSON input from stdin once for all hooks
+        input_data = json.load(sys.stdin)
+
+        exit_code, output = dispatch_args(args, input_data)
+        if output:
+            sys.stdout.write(output)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        # Don't wait for hooks that missed their deadline
+        if has_running_hooks():
+            os._exit(exit_code)
+
+        sys.exit(exit_code)
+
+    except json.JSONDecodeError:
+        sys.exit(0)
+    except Exception as e:
+        print(f"Error in prompt_dispatcher: {e}", file=sys.stderr)
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
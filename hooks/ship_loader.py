@@ -98,19 +98,26 @@ IMPORTANT:
 </ship-state>"""
 
 
-def main():
-    """Main entry point."""
+def run(input_data: dict) -> tuple[int, str]:
+    """Run the hook in-process, returning (exit_code, output)."""
     state = load_ship_state()
 
     if not state:
-        return
+        return 0, ""
 
     # Check if ship is still active (not completed)
     if state.get("status") == "completed":
-        return
+        return 0, ""
 
     context = format_ship_context(state)
-    print(json.dumps({"message": context}))
+    return 0, json.dumps({"message": context})
+
+
+def main():
+    """Main entry point."""
+    _, output = run({})
+    if output:
+        print(output)
 
 
 if __name__ == "__main__":
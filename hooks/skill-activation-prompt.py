@@ -5,64 +5,64 @@
 
 import json
 import os
-import re
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-from utils.constants import ensure_session_log_dir
+from utils.session_log import append_event
+from utils.file_cache import load_json_cached
+from utils.prompt_classifier import classify, register_rules
 
 
-def load_skill_rules(project_dir: str) -> Dict[str, Any]:
-    """Load skill rules from .claude/skills/skill-rules.json"""
-    rules_path = Path(project_dir) / '.claude' / 'skills' / 'skill-rules.json'
-
-    if not rules_path.exists():
-        return {'version': '1.0', 'skills': {}}
+CLASSIFIER_GROUP = "skills"
 
-    with open(rules_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
 
+def get_rules_path(project_dir: str) -> Path:
+    """Get the path of .claude/skills/skill-rules.json"""
+    return Path(project_dir) / '.claude' / 'skills' / 'skill-rules.json'
 
-def match_keywords(prompt: str, keywords: List[str]) -> bool:
-    """Check if any keyword matches the prompt (case-insensitive)"""
-    prompt_lower = prompt.lower()
-    return any(kw.lower() in prompt_lower for kw in keywords)
 
+def load_skill_rules(project_dir: str) -> Dict[str, Any]:
+    """
+    Load skill rules from .claude/skills/skill-rules.json (cached by mtime)
+    and register their triggers with the shared prompt classifier.
+    """
+    rules_path = get_rules_path(project_dir)
+
+    rules = load_json_cached(rules_path)
+    if rules is None:
+        rules = {'version': '1.0', 'skills': {}}
+
+    register_rules(
+        CLASSIFIER_GROUP,
+        [
+            {
+                'name': skill_name,
+                'keywords': (config.get('promptTriggers') or {}).get('keywords', []),
+                'patterns': (config.get('promptTriggers') or {}).get('intentPatterns', []),
+            }
+            for skill_name, config in rules.get('skills', {}).items()
+        ],
+        source=rules_path
+    )
 
-def match_intent_patterns(prompt: str, patterns: List[str]) -> bool:
-    """Check if any intent pattern matches the prompt (case-insensitive)"""
-    return any(re.search(pattern, prompt, re.IGNORECASE) for pattern in patterns)
+    return rules
 
 
 def find_matched_skills(prompt: str, skills: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Find all skills that match the prompt"""
     matched = []
 
-    for skill_name, config in skills.items():
-        triggers = config.get('promptTriggers')
-        if not triggers:
-            continue
-
-        # Check keyword matching
-        keywords = triggers.get('keywords', [])
-        if keywords and match_keywords(prompt, keywords):
-            matched.append({
-                'name': skill_name,
-                'matchType': 'keyword',
-                'config': config
-            })
+    for skill_name, match_type in classify(prompt).matched(CLASSIFIER_GROUP):
+        config = skills.get(skill_name)
+        if config is None:
             continue
-
-        # Check intent pattern matching
-        intent_patterns = triggers.get('intentPatterns', [])
-        if intent_patterns and match_intent_patterns(prompt, intent_patterns):
-            matched.append({
-                'name': skill_name,
-                'matchType': 'intent',
-                'config': config
-            })
+        matched.append({
+            'name': skill_name,
+            'matchType': 'keyword' if match_type == 'keyword' else 'intent',
+            'config': config
+        })
 
     return matched
 
@@ -123,20 +123,6 @@ def format_output(groups: Dict[str, List[str]]) -> str:
 def log_skill_activation(session_id: str, prompt: str, matched_skills: List[Dict[str, Any]]):
     """Log skill activation to session directory."""
     try:
-        # Ensure session log directory exists
-        log_dir = ensure_session_log_dir(session_id)
-        log_file = log_dir / 'skill_activation.json'
-
-        # Read existing log data or initialize empty list
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-
         # Create log entry
         log_entry = {
             'timestamp': datetime.now().isoformat(),
@@ -154,52 +140,63 @@ def log_skill_activation(session_id: str, prompt: str, matched_skills: List[Dict
         }
 
         # Append the entry
-        log_data.append(log_entry)
-
-        # Write back to file with formatting
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        append_event(session_id, 'skill_activation', log_entry)
 
     except Exception as e:
         # Don't fail the hook if logging fails
         print(f"Warning: Failed to log skill activation: {e}", file=sys.stderr)
 
 
-def main():
-    try:
-        # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+def run(input_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Run the hook against an already-parsed payload, returning (exit_code, output)."""
+    # Extract session_id and prompt
+    session_id = input_data.get('session_id', 'unknown')
+    prompt = input_data.get('prompt', '')
+
+    if not prompt:
+        return 0, ""
+
+    # Get project directory
+    project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.path.expanduser('~/project'))
+
+    # Load skill rules
+    rules = load_skill_rules(project_dir)
+    skills = rules.get('skills', {})
+
+    if not skills:
+        return 0, ""
 
-        # Extract session_id and prompt
-        session_id = input_data.get('session_id', 'unknown')
-        prompt = input_data.get('prompt', '')
+    # Find matched skills
+    matched_skills = find_matched_skills(prompt, skills)
 
-        if not prompt:
-            sys.exit(0)
+    # Log skill activation (always log, even if no matches)
+    log_skill_activation(session_id, prompt, matched_skills)
 
-        # Get project directory
-        project_dir = os.environ.get('CLAUDE_PROJECT_DIR', os.path.expanduser('~/project'))
+    # Output message if matches found
+    if matched_skills:
+        groups = group_by_priority(matched_skills)
+        return 0, format_output(groups)
 
-        # Load skill rules
-        rules = load_skill_rules(project_dir)
-        skills = rules.get('skills', {})
+    return 0, ""
 
-        if not skills:
-            sys.exit(0)
 
-        # Find matched skills
-        matched_skills = find_matched_skills(prompt, skills)
+# Register skill triggers at import so the dispatcher's single scan covers them
+try:
+    load_skill_rules(os.environ.get('CLAUDE_PROJECT_DIR', os.path.expanduser('~/project')))
+except Exception:
+    pass  # Reported when run() loads the rules again
 
-        # Log skill activation (always log, even if no matches)
-        log_skill_activation(session_id, prompt, matched_skills)
 
-        # Output message if matches found
-        if matched_skills:
-            groups = group_by_priority(matched_skills)
-            output = format_output(groups)
+def main():
+    try:
+        # Read JSON input from stdin
+        input_data = json.load(sys.stdin)
+
+        exit_code, output = run(input_data)
+        if output:
             print(output)
 
-        sys.exit(0)
+        sys.exit(exit_code)
 
     except json.JSONDecodeError:
         # Handle JSON decode errors gracefully
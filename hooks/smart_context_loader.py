@@ -12,13 +12,15 @@ based on detected patterns. Runs on UserPromptSubmit.
 
 import json
 import os
-import re
 import sys
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 
-from utils.constants import ensure_session_log_dir
+from utils.session_log import append_event
+from utils.prompt_classifier import classify, register_rules
+
+CLASSIFIER_GROUP = "smart_context"
 
 
 # Context detection rules
@@ -174,33 +176,24 @@ CONTEXT_RULES: List[Dict[str, Any]] = [
 ]
 
 
-def match_keywords(prompt: str, keywords: List[str]) -> bool:
-    """Check if any keyword matches the prompt (case-insensitive)"""
-    prompt_lower = prompt.lower()
-    return any(kw.lower() in prompt_lower for kw in keywords)
-
-
-def match_patterns(prompt: str, patterns: List[str]) -> bool:
-    """Check if any regex pattern matches the prompt"""
-    return any(re.search(pattern, prompt, re.IGNORECASE) for pattern in patterns)
+# Compiled into the shared prompt classifier
+register_rules(CLASSIFIER_GROUP, CONTEXT_RULES)
 
 
 def detect_contexts(prompt: str) -> List[Dict[str, Any]]:
     """Detect all matching contexts from the prompt"""
+    rules_by_name = {rule["name"]: rule for rule in CONTEXT_RULES}
     matched = []
 
-    for rule in CONTEXT_RULES:
-        keywords_match = match_keywords(prompt, rule["keywords"])
-        patterns_match = match_patterns(prompt, rule.get("patterns", []))
-
-        if keywords_match or patterns_match:
-            matched.append({
-                "name": rule["name"],
-                "skills": rule["skills"],
-                "context": rule["context"],
-                "priority": rule["priority"],
-                "match_type": "keyword" if keywords_match else "pattern"
-            })
+    for name, match_type in classify(prompt).matched(CLASSIFIER_GROUP):
+        rule = rules_by_name[name]
+        matched.append({
+            "name": rule["name"],
+            "skills": rule["skills"],
+            "context": rule["context"],
+            "priority": rule["priority"],
+            "match_type": match_type
+        })
 
     return matched
 
@@ -243,19 +236,6 @@ def format_output(contexts: List[Dict[str, Any]]) -> str:
 def log_context_detection(session_id: str, prompt: str, contexts: List[Dict[str, Any]]):
     """Log context detection to session directory"""
     try:
-        log_dir = ensure_session_log_dir(session_id)
-        log_file = log_dir / 'smart_context.json'
-
-        # Read existing log data
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-
         # Create log entry
         log_entry = {
             'timestamp': datetime.now().isoformat(),
@@ -272,38 +252,43 @@ def log_context_detection(session_id: str, prompt: str, contexts: List[Dict[str,
             'total_matches': len(contexts)
         }
 
-        log_data.append(log_entry)
-
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        append_event(session_id, 'smart_context', log_entry)
 
     except Exception:
         pass  # Don't fail the hook if logging fails
 
 
-def main():
-    try:
-        # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+def run(input_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Run the hook against an already-parsed payload, returning (exit_code, output)."""
+    session_id = input_data.get('session_id', 'unknown')
+    prompt = input_data.get('prompt', '')
+
+    if not prompt:
+        return 0, ""
+
+    # Detect contexts
+    contexts = detect_contexts(prompt)
 
-        session_id = input_data.get('session_id', 'unknown')
-        prompt = input_data.get('prompt', '')
+    # Log detection
+    log_context_detection(session_id, prompt, contexts)
 
-        if not prompt:
-            sys.exit(0)
+    # Output if contexts found
+    if contexts:
+        return 0, format_output(contexts)
 
-        # Detect contexts
-        contexts = detect_contexts(prompt)
+    return 0, ""
 
-        # Log detection
-        log_context_detection(session_id, prompt, contexts)
 
-        # Output if contexts found
-        if contexts:
-            output = format_output(contexts)
+def main():
+    try:
+        # Read JSON input from stdin
+        input_data = json.load(sys.stdin)
+
+        exit_code, output = run(input_data)
+        if output:
             print(output)
 
-        sys.exit(0)
+        sys.exit(exit_code)
 
     except json.JSONDecodeError:
         sys.exit(0)
@@ -35,19 +35,28 @@ def load_state_files() -> list[str]:
     return context_parts
 
 
-def main():
-    """Main entry point."""
+def run(input_data: dict) -> tuple[int, str]:
+    """Run the hook in-process, returning (exit_code, output)."""
     state_dir = Path(".claude/state")
 
     # Only run if state tracking is enabled
     if not state_dir.exists():
-        return
+        return 0, ""
 
     context_parts = load_state_files()
 
     if context_parts:
         message = "\n\n".join(context_parts)
-        print(json.dumps({"message": message}))
+        return 0, json.dumps({"message": message})
+
+    return 0, ""
+
+
+def main():
+    """Main entry point."""
+    _, output = run({})
+    if output:
+        print(output)
 
 
 if __name__ == "__main__":
@@ -24,7 +24,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from utils.constants import ensure_session_log_dir
+from utils.constants import get_session_log_dir
+from utils.session_log import append_event
 
 try:
     from dotenv import load_dotenv
@@ -214,26 +215,9 @@ def main():
         session_id = input_data.get("session_id", "unknown")
         transcript_path = input_data.get("transcript_path", "")
 
-        # Ensure session log directory exists
-        log_dir = ensure_session_log_dir(session_id)
-        log_path = log_dir / "stop.json"
-
-        # Read existing log data or initialize empty list
-        if log_path.exists():
-            with open(log_path, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-
-        # Append new data
-        log_data.append(input_data)
-
-        # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        # Append one line to the session's event log
+        append_event(session_id, "stop", input_data)
+        log_dir = get_session_log_dir(session_id)
 
         # Handle transcript processing
         if transcript_path and os.path.exists(transcript_path):
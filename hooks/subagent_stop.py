@@ -14,7 +14,8 @@ import subprocess
 from pathlib import Path
 from datetime import datetime
 
-from utils.constants import ensure_session_log_dir
+from utils.constants import get_session_log_dir
+from utils.session_log import append_event
 
 try:
     from dotenv import load_dotenv
@@ -39,26 +40,9 @@ def main():
         session_id = input_data.get("session_id", "unknown")
         stop_hook_active = input_data.get("stop_hook_active", False)
 
-        # Ensure session log directory exists
-        log_dir = ensure_session_log_dir(session_id)
-        log_path = log_dir / "subagent_stop.json"
-
-        # Read existing log data or initialize empty list
-        if log_path.exists():
-            with open(log_path, 'r') as f:
-                try:
-                    log_data = json.load(f)
-                except (json.JSONDecodeError, ValueError):
-                    log_data = []
-        else:
-            log_data = []
-
-        # Append new data
-        log_data.append(input_data)
-
-        # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        # Append one line to the session's event log
+        append_event(session_id, "subagent_stop", input_data)
+        log_dir = get_session_log_dir(session_id)
 
         # Handle --chat switch (same as stop.py)
         if args.chat and 'transcript_path' in input_data:
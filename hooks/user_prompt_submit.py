@@ -12,7 +12,7 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime
-from utils.constants import ensure_session_log_dir
+from utils.session_log import append_event
 
 try:
     from dotenv import load_dotenv
@@ -23,26 +23,7 @@ except ImportError:
 
 def log_user_prompt(session_id, input_data):
     """Log user prompt to session directory."""
-    # Ensure session log directory exists
-    log_dir = ensure_session_log_dir(session_id)
-    log_file = log_dir / 'user_prompt_submit.json'
-
-    # Read existing log data or initialize empty list
-    if log_file.exists():
-        with open(log_file, 'r') as f:
-            try:
-                log_data = json.load(f)
-            except (json.JSONDecodeError, ValueError):
-                log_data = []
-    else:
-        log_data = []
-
-    # Append the entire input data
-    log_data.append(input_data)
-
-    # Write back to file with formatting
-    with open(log_file, 'w') as f:
-        json.dump(log_data, f, indent=2)
+    append_event(session_id, 'user_prompt_submit', input_data)
 
 
 def validate_prompt(prompt):
@@ -65,6 +46,34 @@ def validate_prompt(prompt):
     return True, None
 
 
+def run(input_data, validate=False):
+    """
+    Run the hook against an already-parsed payload.
+    Returns tuple (exit_code, output); exit code 2 blocks the prompt.
+    """
+    # Extract session_id and prompt
+    session_id = input_data.get('session_id', 'unknown')
+    prompt = input_data.get('prompt', '')
+
+    # Log the user prompt
+    log_user_prompt(session_id, input_data)
+
+    # Validate prompt if requested
+    if validate:
+        is_valid, reason = validate_prompt(prompt)
+        if not is_valid:
+            # Exit code 2 blocks the prompt with error message
+            print(f"Prompt blocked: {reason}", file=sys.stderr)
+            return 2, ""
+
+    # Add context information (optional)
+    # You can return additional context that will be added to the prompt
+    # Example: return 0, f"Current time: {datetime.now()}"
+
+    # Success - prompt will be processed
+    return 0, ""
+
+
 def main():
     try:
         # Parse command line arguments
@@ -78,27 +87,11 @@ def main():
         # Read JSON input from stdin
         input_data = json.loads(sys.stdin.read())
 
-        # Extract session_id and prompt
-        session_id = input_data.get('session_id', 'unknown')
-        prompt = input_data.get('prompt', '')
-
-        # Log the user prompt
-        log_user_prompt(session_id, input_data)
+        exit_code, output = run(input_data, validate=args.validate and not args.log_only)
+        if output:
+            print(output)
 
-        # Validate prompt if requested and not in log-only mode
-        if args.validate and not args.log_only:
-            is_valid, reason = validate_prompt(prompt)
-            if not is_valid:
-                # Exit code 2 blocks the prompt with error message
-                print(f"Prompt blocked: {reason}", file=sys.stderr)
-                sys.exit(2)
-
-        # Add context information (optional)
-        # You can print additional context that will be added to the prompt
-        # Example: print(f"Current time: {datetime.now()}")
-
-        # Success - prompt will be processed
-        sys.exit(0)
+        sys.exit(exit_code)
 
     except json.JSONDecodeError:
         # Handle JSON decode errors gracefully
@@ -0,0 +1,179 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Access Stats - retrieval counters kept beside a knowledge store.
+
+Marking fragments as retrieved used to rewrite each fragment file (and
+re-index it) just to bump accessed_count. Access tracking now lives in two
+sidecar files per store, both gitignored:
+
+- access.log: one JSON line per retrieval batch, {"at": ..., "ids": [...]},
+  written with a single O_APPEND write. Each id counts as +1.
+- access.json: {fragment_id: {"count": n, "last": iso}}, the log folded in
+  by compact(), which runs once the log passes ACCESS_LOG_COMPACT_BYTES.
+
+Counts here are added to the accessed_count/last_accessed stored in the
+fragment itself (values written before the sidecar existed).
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .fragment_storage import file_lock, write_json_atomic
+
+# Fold access.log into access.json once it grows past this size
+ACCESS_LOG_COMPACT_BYTES = 64 * 1024
+
+
+def merge_access_stats(fragments, recorded: Dict[str, Tuple[int, Optional[str]]]) -> Dict[str, Tuple[int, Optional[str]]]:
+    """
+    Combine each fragment's stored accessed_count/last_accessed with the
+    recorded (count, last accessed) counters; returns them per fragment id.
+    """
+    stats = {}
+    for fragment in fragments:
+        count, last = recorded.get(fragment.id, (0, None))
+        if fragment.last_accessed and (last is None or fragment.last_accessed > last):
+            last = fragment.last_accessed
+        stats[fragment.id] = (fragment.accessed_count + count, last)
+    return stats
+
+
+class AccessStats:
+    """Access counters for one store directory."""
+
+    def __init__(self, base_dir: Path):
+        self.path = base_dir / "access.json"
+        self.log_path = base_dir / "access.log"
+        self.lock_path = base_dir / ".access.lock"
+
+        # fragment_id -> [count, last accessed]
+        self._stats: Dict[str, List] = {}
+        # (inode, mtime_ns) of access.json when loaded, and bytes of access.log applied
+        self._signature: Optional[Tuple[int, int]] = None
+        self._log_offset = 0
+
+    def _snapshot_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _load(self) -> None:
+        """Read access.json and the whole log (caller holds the lock)."""
+        self._signature = self._snapshot_signature()
+        self._stats = {}
+        try:
+            with open(self.path, 'r') as f:
+                for fragment_id, entry in json.load(f).items():
+                    self._stats[fragment_id] = [entry.get("count", 0), entry.get("last")]
+        except (OSError, ValueError, AttributeError):
+            pass
+        self._log_offset = 0
+        self._replay()
+
+    def _replay(self) -> None:
+        """Apply log lines written since the last replay (caller holds the lock)."""
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except OSError:
+            return
+
+        # Ignore a trailing partial line; it is picked up once complete
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+                at = entry["at"]
+                for fragment_id in entry["ids"]:
+                    stats = self._stats.setdefault(fragment_id, [0, None])
+                    stats[0] += 1
+                    if stats[1] is None or at > stats[1]:
+                        stats[1] = at
+            except (ValueError, KeyError, TypeError):
+                continue
+        self._log_offset += end
+
+    def refresh(self) -> None:
+        """Pick up accesses recorded by other processes."""
+        with file_lock(self.lock_path):
+            try:
+                log_size = os.stat(self.log_path).st_size
+            except OSError:
+                log_size = 0
+            if self._snapshot_signature() != self._signature or log_size < self._log_offset:
+                self._load()
+            elif log_size > self._log_offset:
+                self._replay()
+
+    def record(self, fragment_ids: List[str]) -> None:
+        """Count one access for each fragment, with a single append."""
+        if not fragment_ids:
+            return
+        line = json.dumps({"at": datetime.now().isoformat(), "ids": list(fragment_ids)}, separators=(',', ':'))
+        with file_lock(self.lock_path):
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (line + "\n").encode("utf-8"))
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+
+        if size >= ACCESS_LOG_COMPACT_BYTES:
+            self.compact()
+
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """Get (count, last accessed) for each fragment with recorded accesses."""
+        self.refresh()
+        return {
+            fragment_id: tuple(self._stats[fragment_id])
+            for fragment_id in fragment_ids if fragment_id in self._stats
+        }
+
+    def total(self) -> int:
+        """Total accesses recorded in the sidecar."""
+        self.refresh()
+        return sum(count for count, _ in self._stats.values())
+
+    def compact(self, live_ids: Optional[Set[str]] = None) -> None:
+        """
+        Fold access.log into access.json.
+
+        Args:
+            live_ids: If given, drop counters of fragments not in this set
+        """
+        with file_lock(self.lock_path, exclusive=True):
+            self._load()
+            if live_ids is not None:
+                self._stats = {k: v for k, v in self._stats.items() if k in live_ids}
+            write_json_atomic(self.path, {
+                fragment_id: {"count": count, "last": last}
+                for fragment_id, (count, last) in sorted(self._stats.items())
+            })
+            with open(self.log_path, 'wb'):
+                pass
+            self._signature = self._snapshot_signature()
+            self._log_offset = 0
+
+    def clear(self) -> None:
+        """Forget all recorded accesses."""
+        with file_lock(self.lock_path, exclusive=True):
+            for path in (self.path, self.log_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            self._stats = {}
+            self._signature = None
+            self._log_offset = 0
@@ -0,0 +1,240 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Binary Index - memory-mapped on-disk format for TFIDFIndex.
+
+index.json has to be parsed in full (and rebuilt into nested dicts) before
+the first query, so startup grows with the vocabulary. index.bin is laid
+out so it can be mmap'ed and queried in place:
+
+    header      magic, counts, total length and section offsets
+    doc ids     newline-separated fragment ids (ordinal = position)
+    doc hashes  newline-separated content hashes (empty if unknown)
+    doc lengths array('I') per doc ordinal
+    doc terms   array('I') offsets + array('I') term ordinals (forward index)
+    terms       array('I') offsets + sorted UTF-8 term dictionary
+    postings    array('I') offsets + array('I') doc ordinals + array('f') weights
+
+Opening the file reads only the header and the doc table. A term is found
+by binary search over the sorted dictionary and its postings are decoded
+only when a query (or an index change) touches it. Weights are the
+normalized term frequencies (count / doc length) stored as 32-bit floats.
+
+Multi-byte values are little-endian. Zero external dependencies - uses only
+Python standard library.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"KIDX"
+FORMAT_VERSION = 2
+
+# magic, version, num_docs, num_terms, num_postings, num_doc_terms,
+# total_length, doc id blob length, term blob length, doc hash blob length,
+# then the offsets of the sections below
+_HEADER = struct.Struct("<4sIIIII" + "Q" * 14)
+_SECTIONS = (
+    "doc_ids", "doc_lengths", "doc_term_offsets", "doc_term_ords",
+    "term_offsets", "term_blob", "posting_offsets", "posting_docs", "posting_weights",
+    "doc_hashes",
+)
+# Version 1 files (no doc hashes) are still readable
+_HEADER_V1 = struct.Struct("<4sIIIII" + "Q" * 12)
+_VERSION_PREFIX = struct.Struct("<4sI")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _pad(size: int) -> int:
+    """Padding that keeps the next section 4-byte aligned."""
+    return -size % 4
+
+
+def _array_bytes(typecode: str, values) -> bytes:
+    data = array(typecode, values)
+    if not _LITTLE_ENDIAN:
+        data.byteswap()
+    return data.tobytes()
+
+
+def dump_binary_index(data: Dict[str, Any], f: BinaryIO) -> None:
+    """
+    Write an index in binary form.
+
+    Args:
+        data: TFIDFIndex.to_dict() output
+        f: File opened for binary writing
+    """
+    term_frequencies: Dict[str, Dict[str, float]] = data.get("term_frequencies", {})
+    doc_lengths: Dict[str, int] = data.get("doc_lengths", {})
+    doc_terms: Dict[str, List[str]] = data.get("doc_terms", {})
+    doc_hashes: Dict[str, str] = data.get("doc_hashes", {})
+
+    doc_ids = list(doc_lengths)
+    doc_ordinals = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+    # Python string order is code point order, which UTF-8 byte order preserves
+    terms = sorted(term_frequencies)
+    term_ordinals = {term: i for i, term in enumerate(terms)}
+
+    doc_term_offsets = [0]
+    doc_term_ords: List[int] = []
+    for doc_id in doc_ids:
+        doc_term_ords.extend(term_ordinals[t] for t in doc_terms.get(doc_id, ()) if t in term_ordinals)
+        doc_term_offsets.append(len(doc_term_ords))
+
+    term_offsets = [0]
+    term_blob = bytearray()
+    posting_offsets = [0]
+    posting_docs: List[int] = []
+    posting_weights: List[float] = []
+    for term in terms:
+        term_blob += term.encode("utf-8")
+        term_offsets.append(len(term_blob))
+        postings = sorted((doc_ordinals[d], tf) for d, tf in term_frequencies[term].items() if d in doc_ordinals)
+        posting_docs.extend(ordinal for ordinal, _ in postings)
+        posting_weights.extend(tf for _, tf in postings)
+        posting_offsets.append(len(posting_docs))
+
+    doc_id_blob = "\n".join(doc_ids).encode("utf-8")
+    doc_hash_blob = "\n".join(doc_hashes.get(d, "") for d in doc_ids).encode("utf-8")
+    sections = [
+        doc_id_blob,
+        _array_bytes('I', (doc_lengths[d] for d in doc_ids)),
+        _array_bytes('I', doc_term_offsets),
+        _array_bytes('I', doc_term_ords),
+        _array_bytes('I', term_offsets),
+        bytes(term_blob),
+        _array_bytes('I', posting_offsets),
+        _array_bytes('I', posting_docs),
+        _array_bytes('f', posting_weights),
+        doc_hash_blob,
+    ]
+
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section) + _pad(len(section))
+
+    f.write(_HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(doc_ids), len(terms), len(posting_docs), len(doc_term_ords),
+        sum(doc_lengths.values()), len(doc_id_blob), len(term_blob), len(doc_hash_blob), *offsets
+    ))
+    for section in sections:
+        f.write(section)
+        f.write(b"\0" * _pad(len(section)))
+
+
+class MappedIndex:
+    """
+    Read-only view of an index.bin file.
+
+    The file is mmap'ed (read into memory on Windows, where a mapped file
+    cannot be replaced); postings are decoded per term on request.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if os.name == "nt":
+                self._buffer = f.read()
+            else:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._buffer)
+
+        if len(view) < _HEADER_V1.size:
+            raise ValueError(f"Truncated index file: {path}")
+        magic, version = _VERSION_PREFIX.unpack_from(view)
+        if magic != MAGIC or version not in (1, FORMAT_VERSION):
+            raise ValueError(f"Not a version {FORMAT_VERSION} binary index: {path}")
+        if version == 1:
+            header = _HEADER_V1.unpack_from(view)
+            doc_hashes_size = 0
+            offset = dict(zip(_SECTIONS, header[9:]))
+        else:
+            header = _HEADER.unpack_from(view)
+            doc_hashes_size = header[9]
+            offset = dict(zip(_SECTIONS, header[10:]))
+        (self.num_docs, self.num_terms, num_postings, num_doc_terms,
+         self.total_length, doc_ids_size, term_blob_size) = header[2:9]
+
+        self._view = view
+        doc_ids = self._buffer[offset["doc_ids"]:offset["doc_ids"] + doc_ids_size].decode("utf-8")
+        self.doc_ids: List[str] = doc_ids.split("\n") if self.num_docs else []
+        if doc_hashes_size:
+            start = offset["doc_hashes"]
+            self.doc_hashes: List[str] = self._buffer[start:start + doc_hashes_size].decode("utf-8").split("\n")
+        else:
+            self.doc_hashes = [""] * self.num_docs
+        self.doc_lengths = self._u32(offset["doc_lengths"], self.num_docs)
+        self._doc_term_offsets = self._u32(offset["doc_term_offsets"], self.num_docs + 1)
+        self._doc_term_ords = self._u32(offset["doc_term_ords"], num_doc_terms)
+        self._term_offsets = self._u32(offset["term_offsets"], self.num_terms + 1)
+        self._term_blob = offset["term_blob"]
+        self._posting_offsets = self._u32(offset["posting_offsets"], self.num_terms + 1)
+        self._posting_docs = self._u32(offset["posting_docs"], num_postings)
+        self._posting_weights = self._typed('f', offset["posting_weights"], num_postings)
+
+        # doc id -> ordinal, built on first use (only index changes need it)
+        self._doc_ordinals: Optional[Dict[str, int]] = None
+
+    def _typed(self, typecode: str, offset: int, count: int):
+        """Zero-copy typed view of a section (a byte-swapped copy on big-endian hosts)."""
+        section = self._view[offset:offset + 4 * count]
+        if _LITTLE_ENDIAN:
+            return section.cast(typecode)
+        data = array(typecode, section.tobytes())
+        data.byteswap()
+        return data
+
+    def _u32(self, offset: int, count: int):
+        return self._typed('I', offset, count)
+
+    def term_at(self, ordinal: int) -> str:
+        """Get the term with the given ordinal."""
+        base = self._term_blob
+        return self._buffer[base + self._term_offsets[ordinal]:base + self._term_offsets[ordinal + 1]].decode("utf-8")
+
+    def find_term(self, term: str) -> Optional[int]:
+        """Binary search the term dictionary; returns the term ordinal or None."""
+        key = term.encode("utf-8")
+        buffer, base, offsets = self._buffer, self._term_blob, self._term_offsets
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # Slicing the mmap (or bytes) buffer yields comparable bytes
+            candidate = buffer[base + offsets[mid]:base + offsets[mid + 1]]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def postings(self, ordinal: int) -> Dict[str, float]:
+        """Decode one term's postings into {doc_id: term frequency}."""
+        start, end = self._posting_offsets[ordinal], self._posting_offsets[ordinal + 1]
+        doc_ids = self.doc_ids
+        return dict(zip([doc_ids[i] for i in self._posting_docs[start:end]], self._posting_weights[start:end]))
+
+    def doc_terms(self, doc_id: str) -> List[str]:
+        """Get the terms of a document (forward index)."""
+        if self._doc_ordinals is None:
+            self._doc_ordinals = {d: i for i, d in enumerate(self.doc_ids)}
+        ordinal = self._doc_ordinals.get(doc_id)
+        if ordinal is None:
+            return []
+        start, end = self._doc_term_offsets[ordinal], self._doc_term_offsets[ordinal + 1]
+        return [self.term_at(t) for t in self._doc_term_ords[start:end]]
+
+    def iter_terms(self) -> Iterator[Tuple[str, int]]:
+        """Yield (term, ordinal) for every term, in sorted order."""
+        for ordinal in range(self.num_terms):
+            yield self.term_at(ordinal), ordinal
@@ -0,0 +1,76 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Fast-path event logging for hooks that fire on every tool call.
+
+PreToolUse and PostToolUse run with matcher "" and block every tool call, so
+they must cost as close to nothing as possible. append_raw_event() writes the
+stdin payload to logs/<session_id>/<name>.jsonl as-is:
+
+- stdin is read as bytes and never decoded into objects
+- session_id is found with a byte search instead of a JSON parse
+- the line is written with one os.open(O_APPEND) + os.write
+- the session directory is only created when that open fails
+
+Only `os` is imported. Latency target: under 1ms beyond interpreter start-up
+for typical payloads. The resulting files are read by utils/session_log.py.
+"""
+
+import os
+
+LOG_BASE_DIR = os.environ.get("CLAUDE_HOOKS_LOG_DIR", "logs")
+
+_SESSION_KEY = b'"session_id"'
+_SESSION_ID_CHARS = frozenset(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_."
+)
+
+
+def extract_session_id(payload: bytes) -> str:
+    """
+    Find the top-level session_id value without parsing the payload.
+
+    Returns 'unknown' if the key is missing or the value is not a plain
+    identifier (so a malformed value can never escape the log directory).
+    """
+    pos = payload.find(_SESSION_KEY)
+    if pos < 0:
+        return "unknown"
+    colon = payload.find(b":", pos + len(_SESSION_KEY))
+    start = payload.find(b'"', colon + 1) if colon >= 0 else -1
+    end = payload.find(b'"', start + 1) if start >= 0 else -1
+    if end < 0:
+        return "unknown"
+
+    value = payload[start + 1:end]
+    if not value or value.strip(b".") == b"" or not _SESSION_ID_CHARS.issuperset(value):
+        return "unknown"
+    return value.decode("ascii")
+
+
+def append_raw_event(name: str, payload: bytes) -> None:
+    """Append a raw JSON payload as one line of logs/<session_id>/<name>.jsonl."""
+    payload = payload.strip()
+    if not payload.startswith(b"{"):
+        return  # Not a hook event payload
+
+    # JSON never needs raw newlines, so flattening them keeps one event per line
+    if b"\n" in payload or b"\r" in payload:
+        payload = payload.replace(b"\r", b" ").replace(b"\n", b" ")
+
+    log_dir = os.path.join(LOG_BASE_DIR, extract_session_id(payload))
+    path = os.path.join(log_dir, name + ".jsonl")
+
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    try:
+        fd = os.open(path, flags, 0o644)
+    except FileNotFoundError:
+        os.makedirs(log_dir, exist_ok=True)
+        fd = os.open(path, flags, 0o644)
+    try:
+        os.write(fd, payload + b"\n")
+    finally:
+        os.close(fd)
@@ -0,0 +1,68 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+In-process cache for JSON files, invalidated by mtime.
+
+A one-shot hook gains nothing from this, but when hooks run inside the
+long-lived hook daemon (hook_daemon.py) config files are parsed once and
+only re-read after they change on disk.
+
+Cached values are shared between callers and must be treated as read-only.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+# path -> ((mtime_ns, size), parsed value)
+_json_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+_lock = threading.Lock()
+
+
+def file_signature(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """Get (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_json_cached(path: Union[str, Path]) -> Optional[Any]:
+    """
+    Load a JSON file, reusing the parsed value while the file is unchanged.
+
+    Returns None if the file does not exist or cannot be parsed.
+    """
+    key = str(path)
+    signature = file_signature(key)
+    if signature is None:
+        with _lock:
+            _json_cache.pop(key, None)
+        return None
+
+    with _lock:
+        cached = _json_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    try:
+        with open(key, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError, ValueError):
+        return None
+
+    with _lock:
+        _json_cache[key] = (signature, data)
+    return data
+
+
+def clear_cache() -> None:
+    """Drop all cached files."""
+    with _lock:
+        _json_cache.clear()
@@ -0,0 +1,412 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Fragment Storage - where KnowledgeStore keeps fragment records.
+
+Two layouts are available, selected per store in config.json:
+
+- "files" (default): one fragments/<id>.json file per fragment. Every change
+  is its own git diff, but listing the store opens one file per fragment.
+- "packed": every fragment in one append-only fragments.jsonl file with an
+  in-memory id -> (offset, length) table. Full scans are one sequential read
+  and a random read is a single pread(). Updates and deletes append a new
+  record (or a tombstone); superseded records are dropped by compact().
+
+Both layouts store the plain Fragment.to_dict() records, so stores can be
+migrated between them without touching the index.
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+STORAGE_FILES = "files"
+STORAGE_PACKED = "packed"
+STORAGE_TYPES = (STORAGE_FILES, STORAGE_PACKED)
+
+# Rewrite fragments.jsonl once superseded records outweigh live ones
+PACKED_COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """
+    Write JSON via a temp file and rename, so readers and interrupted
+    writers never leave a half-written file behind.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path: Path, exclusive: bool = False) -> Iterator[None]:
+    """
+    Hold an advisory lock on `path` (shared or exclusive) for the block.
+
+    Used to keep store files consistent across processes.
+    A no-op where fcntl is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
+
+
+class FileFragmentStorage:
+    """One JSON file per fragment in fragments/."""
+
+    kind = STORAGE_FILES
+
+    def __init__(self, base_dir: Path):
+        self.fragments_dir = base_dir / "fragments"
+        self.fragments_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fragment_id: str) -> Path:
+        return self.fragments_dir / f"{fragment_id}.json"
+
+    def exists(self, fragment_id: str) -> bool:
+        return self._path(fragment_id).exists()
+
+    def get(self, fragment_id: str) -> Optional[Dict[str, Any]]:
+        """Read one fragment record, or None if missing or unreadable."""
+        try:
+            with open(self._path(fragment_id), 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several fragment records; missing ones are left out."""
+        records = {}
+        for fragment_id in fragment_ids:
+            data = self.get(fragment_id)
+            if data is not None:
+                records[fragment_id] = data
+        return records
+
+    def version(self, fragment_id: str) -> Optional[Tuple[int, int, int]]:
+        """(inode, mtime_ns, size) of the fragment file, or None if missing."""
+        try:
+            st = os.stat(self._path(fragment_id))
+        except OSError:
+            return None
+        # put() replaces the file, so the inode changes on every write
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def scan(self) -> Dict[str, Tuple[int, int, int]]:
+        """version() of every fragment, from one directory scan."""
+        versions = {}
+        with os.scandir(self.fragments_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                # Skip write_json_atomic() temp files
+                if not name.endswith(".json") or name.startswith("."):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                versions[name[:-5]] = (st.st_ino, st.st_mtime_ns, st.st_size)
+        return versions
+
+    def put(self, fragment_id: str, data: Dict[str, Any]) -> None:
+        write_json_atomic(self._path(fragment_id), data)
+
+    def delete(self, fragment_id: str) -> bool:
+        try:
+            self._path(fragment_id).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Yield every fragment record."""
+        for path in self.fragments_dir.glob("*.json"):
+            try:
+                with open(path, 'r') as f:
+                    yield json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+
+    def refresh(self) -> None:
+        """Nothing is cached for per-file storage."""
+
+    def clear(self) -> None:
+        """Delete every fragment file."""
+        for path in self.fragments_dir.glob("*.json"):
+            path.unlink()
+
+
+class PackedFragmentStorage:
+    """
+    All fragments in one append-only fragments.jsonl file.
+
+    Each line is a full fragment record ({"id": ..., ...}) or a tombstone
+    ({"id": ..., "deleted": true}); the last line for an id wins. The offset
+    table is built by one sequential scan and then extended incrementally as
+    the file grows, including appends made by other processes.
+    """
+
+    kind = STORAGE_PACKED
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.path = base_dir / "fragments.jsonl"
+        self.lock_path = base_dir / ".fragments.lock"
+
+        # id -> (offset, length) of the live record
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        # Bytes of fragments.jsonl already scanned, and the file's inode
+        self._scanned = 0
+        self._inode: Optional[int] = None
+        # Bytes taken by superseded records and tombstones
+        self._dead_bytes = 0
+
+        self.refresh()
+
+    @staticmethod
+    def _record_id(line: bytes) -> Optional[str]:
+        """Get the id of a record line without parsing the whole record."""
+        # Records are written by put() with "id" as the first key
+        if line.startswith(b'{"id":"'):
+            end = line.find(b'"', 7)
+            if end > 0 and b"\\" not in line[7:end]:
+                return line[7:end].decode("utf-8")
+        try:
+            return json.loads(line)["id"]
+        except (json.JSONDecodeError, KeyError, TypeError, UnicodeDecodeError):
+            return None
+
+    def _scan(self, start: int) -> None:
+        """Extend the offset table with records from `start` to the end of file."""
+        try:
+            with open(self.path, 'rb') as f:
+                self._inode = os.fstat(f.fileno()).st_ino
+                f.seek(start)
+                data = f.read()
+        except FileNotFoundError:
+            self._inode = None
+            self._scanned = 0
+            return
+
+        offset = start
+        # Ignore a trailing partial line; it is picked up once complete
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].split(b"\n")[:-1]:
+            length = len(line) + 1
+            fragment_id = self._record_id(line)
+            if fragment_id is not None:
+                previous = self._offsets.pop(fragment_id, None)
+                if previous is not None:
+                    self._dead_bytes += previous[1]
+                if line.endswith(b'"deleted":true}') and line == self._tombstone(fragment_id)[:-1]:
+                    self._dead_bytes += length
+                else:
+                    self._offsets[fragment_id] = (offset, length)
+            else:
+                self._dead_bytes += length
+            offset += length
+        self._scanned = offset
+
+    def refresh(self) -> None:
+        """Pick up records appended (or a compaction done) by other processes."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._offsets = {}
+            self._scanned = 0
+            self._inode = None
+            self._dead_bytes = 0
+            return
+
+        if st.st_ino != self._inode or st.st_size < self._scanned:
+            # New file (first load or compacted elsewhere): rescan from the start
+            self._offsets = {}
+            self._dead_bytes = 0
+            self._scan(0)
+        elif st.st_size > self._scanned:
+            self._scan(self._scanned)
+
+    def exists(self, fragment_id: str) -> bool:
+        if fragment_id not in self._offsets:
+            self.refresh()
+        return fragment_id in self._offsets
+
+    def get(self, fragment_id: str) -> Optional[Dict[str, Any]]:
+        """Read one fragment record with a single pread()."""
+        if fragment_id not in self._offsets:
+            self.refresh()
+        location = self._offsets.get(fragment_id)
+        if location is None:
+            return None
+
+        offset, length = location
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                line = os.pread(fd, length, offset)
+            finally:
+                os.close(fd)
+            return json.loads(line)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several fragment records with one open and a pread() each."""
+        if any(fragment_id not in self._offsets for fragment_id in fragment_ids):
+            self.refresh()
+        # Read in file order
+        locations = sorted(
+            (self._offsets[fragment_id], fragment_id)
+            for fragment_id in set(fragment_ids) if fragment_id in self._offsets
+        )
+        records = {}
+        if not locations:
+            return records
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return records
+        try:
+            for (offset, length), fragment_id in locations:
+                try:
+                    records[fragment_id] = json.loads(os.pread(fd, length, offset))
+                except (OSError, json.JSONDecodeError):
+                    continue
+        finally:
+            os.close(fd)
+        return records
+
+    def version(self, fragment_id: str) -> Optional[Tuple[int, int, int]]:
+        """(inode, offset, length) of the live record, or None if missing."""
+        if fragment_id not in self._offsets:
+            self.refresh()
+        location = self._offsets.get(fragment_id)
+        if location is None:
+            return None
+        return (self._inode or 0,) + location
+
+    def scan(self) -> Dict[str, Tuple[int, int, int]]:
+        """version() of every live fragment."""
+        self.refresh()
+        inode = self._inode or 0
+        return {fragment_id: (inode,) + location for fragment_id, location in self._offsets.items()}
+
+    def _append(self, lines: List[bytes]) -> None:
+        """Append records and index them (callers hold no lock)."""
+        with file_lock(self.lock_path, exclusive=True):
+            # Catch up first so the table matches the file we append to
+            self.refresh()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"".join(lines))
+            finally:
+                os.close(fd)
+            self._scan(self._scanned)
+
+        live_bytes = self._scanned - self._dead_bytes
+        if self._dead_bytes > max(live_bytes, PACKED_COMPACT_MIN_BYTES):
+            self.compact()
+
+    @staticmethod
+    def _tombstone(fragment_id: str) -> bytes:
+        return json.dumps({"id": fragment_id, "deleted": True}, separators=(',', ':')).encode("utf-8") + b"\n"
+
+    @staticmethod
+    def _encode(data: Dict[str, Any]) -> bytes:
+        record = {"id": data["id"]}
+        record.update(data)
+        return json.dumps(record, separators=(',', ':')).encode("utf-8") + b"\n"
+
+    def put(self, fragment_id: str, data: Dict[str, Any]) -> None:
+        self._append([self._encode(dict(data, id=fragment_id))])
+
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        """Append many records with one write (used by migration)."""
+        if records:
+            self._append([self._encode(data) for data in records])
+
+    def delete(self, fragment_id: str) -> bool:
+        if not self.exists(fragment_id):
+            return False
+        self._append([self._tombstone(fragment_id)])
+        return True
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Yield every live fragment record with one sequential read."""
+        self.refresh()
+        live = {offset for offset, _ in self._offsets.values()}
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read(self._scanned)
+        except FileNotFoundError:
+            return
+
+        offset = 0
+        for line in data.split(b"\n")[:-1]:
+            if offset in live:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+            offset += len(line) + 1
+
+    def compact(self) -> None:
+        """Rewrite fragments.jsonl with only the live records."""
+        with file_lock(self.lock_path, exclusive=True):
+            self.refresh()
+            records = list(self.iter_all())
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.base_dir), prefix=".fragments.jsonl.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for data in records:
+                        f.write(self._encode(data))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
+                raise
+
+            self._offsets = {}
+            self._dead_bytes = 0
+            self._scan(0)
+
+    def clear(self) -> None:
+        """Delete the packed file."""
+        with file_lock(self.lock_path, exclusive=True):
+            with contextlib.suppress(FileNotFoundError):
+                self.path.unlink()
+            self.refresh()
+
+
+def create_storage(kind: str, base_dir: Path):
+    """Create the storage backend for a store directory."""
+    if kind == STORAGE_PACKED:
+        return PackedFragmentStorage(base_dir)
+    if kind == STORAGE_FILES:
+        return FileFragmentStorage(base_dir)
+    raise ValueError(f"Unknown fragment storage: {kind} (expected one of {', '.join(STORAGE_TYPES)})")
@@ -0,0 +1,140 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Knowledge Matrix - vectorised batch scoring for TFIDFIndex (optional NumPy).
+
+Compiles the index into a CSR term-document matrix whose entries are the
+precomputed per-document term weights (TF x IDF, or the BM25 term score),
+then scores a whole batch of tokenized queries with one sparse product:
+each query's rows are gathered from the matrix and summed into a dense
+(queries x documents) block with np.bincount, and the top k per query are
+taken with np.argpartition.
+
+Used automatically by TFIDFIndex.search_many() when NumPy is importable.
+Without NumPy, search_many() runs TFIDFIndex.search() once per query, so
+NumPy is never required.
+"""
+
+import math
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Batch APIs fall back to per-query search
+    np = None
+
+from .knowledge_scoring import SCORER_BM25, bm25_idf, bm25_tf
+
+HAS_NUMPY = np is not None
+
+# Upper bound on the dense (queries x documents) score block per product
+MAX_BLOCK_CELLS = 4 * 1024 * 1024
+
+
+class CSRMatrix:
+    """
+    One scorer's term-document weights in CSR form (one row per term).
+
+    Built from a TFIDFIndex snapshot; rebuild when index.version changes.
+    """
+
+    def __init__(self, index, scorer: str):
+        index.materialize()
+        self.scorer = scorer
+        self.version = index.version
+        self.doc_ids: List[str] = list(index.doc_lengths)
+        doc_numbers = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        num_docs = index.num_docs
+        avg_length = index.total_length / num_docs if num_docs else 0.0
+        lengths = index.doc_lengths
+
+        self.term_rows = {}
+        self.idf = np.zeros(len(index.term_frequencies))
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+
+        for row, (term, docs) in enumerate(index.term_frequencies.items()):
+            self.term_rows[term] = row
+            if scorer == SCORER_BM25:
+                idf = bm25_idf(index.doc_frequencies[term], num_docs)
+                for doc_id, tf in docs.items():
+                    length = lengths[doc_id]
+                    indices.append(doc_numbers[doc_id])
+                    data.append(idf * bm25_tf(round(tf * length), length, avg_length))
+            else:
+                # Same smoothed IDF as TFIDFIndex.search()
+                idf = math.log((num_docs + 1) / (index.doc_frequencies[term] + 1)) + 1
+                for doc_id, tf in docs.items():
+                    indices.append(doc_numbers[doc_id])
+                    data.append(tf * idf)
+            self.idf[row] = idf
+            indptr.append(len(indices))
+
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.data = np.array(data, dtype=np.float64)
+
+    def _query_rows(self, tokens: List[str]) -> List[Tuple[int, float]]:
+        """Map a tokenized query to (matrix row, query weight) pairs."""
+        rows = {}
+        for token in tokens:
+            row = self.term_rows.get(token)
+            if row is not None:
+                if self.scorer == SCORER_BM25:
+                    # BM25 scores each distinct query term once
+                    rows[row] = 1.0
+                else:
+                    rows[row] = rows.get(row, 0.0) + 1.0
+        return list(rows.items())
+
+    def search_many(self, token_lists: List[List[str]], top_k: int) -> List[List[Tuple[str, float]]]:
+        """Score every query and return each one's top_k (doc_id, score) pairs."""
+        num_docs = len(self.doc_ids)
+        results: List[List[Tuple[str, float]]] = []
+        if num_docs == 0 or top_k <= 0:
+            return [[] for _ in token_lists]
+
+        block = max(1, MAX_BLOCK_CELLS // num_docs)
+        for start in range(0, len(token_lists), block):
+            chunk = token_lists[start:start + block]
+            query_rows = [self._query_rows(tokens) for tokens in chunk]
+
+            # Gather the matrix rows each query touches, scaled by query weight
+            cells, weights = [], []
+            for q, rows in enumerate(query_rows):
+                for row, weight in rows:
+                    lo, hi = self.indptr[row], self.indptr[row + 1]
+                    cells.append(self.indices[lo:hi] + q * num_docs)
+                    weights.append(self.data[lo:hi] * weight)
+            if cells:
+                scores = np.bincount(
+                    np.concatenate(cells),
+                    weights=np.concatenate(weights),
+                    minlength=len(chunk) * num_docs,
+                ).reshape(len(chunk), num_docs)
+            else:
+                scores = np.zeros((len(chunk), num_docs))
+
+            for q, rows in enumerate(query_rows):
+                if not rows:
+                    results.append([])
+                    continue
+                row_scores = scores[q]
+                if top_k < num_docs:
+                    top = np.argpartition(-row_scores, top_k - 1)[:top_k]
+                else:
+                    top = np.arange(num_docs)
+                top = top[np.argsort(-row_scores[top], kind="stable")]
+                top = top[row_scores[top] > 0]
+
+                scale = 1.0
+                if self.scorer == SCORER_BM25:
+                    # Normalize like BM25Scorer (see knowledge_scoring)
+                    scale = 1.0 / float(self.idf[[row for row, _ in rows]].sum())
+                results.append([(self.doc_ids[i], float(row_scores[i]) * scale) for i in top])
+
+        return results
@@ -49,9 +49,32 @@ The final score for each fragment is calculated as:
 ### Default Thresholds
 - min_score: 0.1 (fragments below this are filtered out)
 - top_k: 5 (maximum fragments returned)
+
+## Dense Channel and Fusion
+
+When NumPy is installed, the prompt is also matched against hashed
+embeddings of the fragments (vector_index.py), which catch paraphrases and
+spelling variants TF-IDF misses. Dense hits with cosine similarity of at
+least DENSE_MIN_SIMILARITY are boosted the same way, and the two ranked
+lists are merged by reciprocal rank fusion:
+
+    fused_score = sum over lists of 1 / (RRF_K + rank)
+
+scaled so a fragment ranked first in both lists scores 1.0. min_score
+applies to the TF-IDF list before fusion. Without dense hits the TF-IDF
+ranking and scores are returned unchanged.
+
+## Result Cache
+
+The candidates of both channels, before boosting, are cached by the
+prompt's token multiset and the stores' generation (result_cache.py); a
+repeated prompt against unchanged stores only loads the cached fragment ids
+and boosts them again, so recency and access counts recorded since (which
+do not change the generation) still count.
 """
 
 import math
+from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -61,7 +84,21 @@ from .knowledge_store import (
     SCOPE_SHARED,
     SCOPE_PERSONAL
 )
+from .positions import quoted_phrases
+from .prompt_classifier import classify, register_rules
+from .result_cache import ResultCache, cache_key
+
+
+# Reciprocal rank fusion: rank r in a list contributes 1 / (RRF_K + r)
+RRF_K = 60
 
+# Dense hits below this cosine similarity are left out of the fusion
+DENSE_MIN_SIMILARITY = 0.25
+# Floor for dense hits the lexical channel did not also return: one shared
+# word already scores ~0.3 ("configure the database connection pool" vs
+# "Configure eslint import order rules"); unrelated fragments reached 0.36
+# on a labelled sample, related dense-only ones stayed below 0.25
+DENSE_ONLY_MIN_SIMILARITY = 0.4
 
 # Context rules for tag boosting based on detected prompt patterns
 CONTEXT_TAG_RULES: List[Dict[str, Any]] = [
@@ -118,6 +155,11 @@ CONTEXT_TAG_RULES: List[Dict[str, Any]] = [
 ]
 
 
+# Compiled into the shared prompt classifier
+CLASSIFIER_GROUP = "knowledge_tags"
+register_rules(CLASSIFIER_GROUP, CONTEXT_TAG_RULES)
+
+
 def detect_context_tags(prompt: str) -> List[str]:
     """
     Detect relevant tags based on prompt content.
@@ -125,12 +167,11 @@ def detect_context_tags(prompt: str) -> List[str]:
     Analyzes the prompt for keywords that indicate what context
     the user is working in, returns tags to boost.
     """
-    prompt_lower = prompt.lower()
+    rules_by_name = {rule["name"]: rule for rule in CONTEXT_TAG_RULES}
     boost_tags: List[str] = []
 
-    for rule in CONTEXT_TAG_RULES:
-        if any(kw in prompt_lower for kw in rule["keywords"]):
-            boost_tags.extend(rule["boost_tags"])
+    for name, _ in classify(prompt).matched(CLASSIFIER_GROUP):
+        boost_tags.extend(rules_by_name[name]["boost_tags"])
 
     # Deduplicate while preserving order
     seen = set()
@@ -143,18 +184,25 @@ def detect_context_tags(prompt: str) -> List[str]:
     return unique_tags
 
 
-def calculate_recency_boost(fragment: Fragment, max_boost: float = 0.2) -> float:
+def calculate_recency_boost(
+    fragment: Fragment,
+    max_boost: float = 0.2,
+    last_accessed: Optional[str] = None
+) -> float:
     """
     Calculate recency boost based on last access time.
 
     Fragments accessed recently get a small boost.
     Returns a multiplier between 1.0 and (1.0 + max_boost).
+
+    last_accessed overrides the fragment's own value (see access_stats).
     """
-    if not fragment.last_accessed:
+    last_accessed = last_accessed or fragment.last_accessed
+    if not last_accessed:
         return 1.0
 
     try:
-        last_accessed = datetime.fromisoformat(fragment.last_accessed)
+        last_accessed = datetime.fromisoformat(last_accessed)
         now = datetime.now()
         age = now - last_accessed
 
@@ -192,21 +240,51 @@ def calculate_tag_boost(fragment: Fragment, boost_tags: List[str], boost_factor:
     return 1.0 + (boost_factor * match_ratio)
 
 
-def calculate_access_boost(fragment: Fragment, max_boost: float = 0.1) -> float:
+def calculate_access_boost(
+    fragment: Fragment,
+    max_boost: float = 0.1,
+    accessed_count: Optional[int] = None
+) -> float:
     """
     Calculate boost based on access frequency.
 
     Frequently accessed fragments are likely more valuable.
+    accessed_count overrides the fragment's own value (see access_stats).
     """
-    if fragment.accessed_count <= 0:
+    if accessed_count is None:
+        accessed_count = fragment.accessed_count
+    if accessed_count <= 0:
         return 1.0
 
     # Logarithmic boost to prevent runaway scores
     # 10 accesses = ~0.5 * max_boost, 100 accesses = max_boost
-    normalized = math.log10(fragment.accessed_count + 1) / 2
+    normalized = math.log10(accessed_count + 1) / 2
     return 1.0 + min(normalized * max_boost, max_boost)
 
 
+def reciprocal_rank_fusion(
+    rankings: List[List[Tuple[Fragment, float]]],
+    k: int = RRF_K
+) -> List[Tuple[Fragment, float]]:
+    """
+    Merge ranked lists by reciprocal rank fusion.
+
+    Each list adds 1 / (k + rank) to a fragment's score; scores are scaled
+    so a fragment ranked first in every list scores 1.0.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    fragments: Dict[str, Fragment] = {}
+    for ranking in rankings:
+        for rank, (fragment, _) in enumerate(ranking, 1):
+            scores[fragment.id] += 1.0 / (k + rank)
+            fragments.setdefault(fragment.id, fragment)
+
+    scale = (k + 1) / len(rankings) if rankings else 1.0
+    fused = [(fragments[fragment_id], score * scale) for fragment_id, score in scores.items()]
+    fused.sort(key=lambda x: x[1], reverse=True)
+    return fused
+
+
 class KnowledgeRetriever:
     """
     Query engine for semantic knowledge retrieval.
@@ -215,14 +293,21 @@ class KnowledgeRetriever:
     the most relevant knowledge fragments for a given prompt.
     """
 
-    def __init__(self, store: Optional[DualKnowledgeStore] = None):
+    def __init__(
+        self,
+        store: Optional[DualKnowledgeStore] = None,
+        cache: Optional[ResultCache] = None
+    ):
         """
         Initialize retriever with a knowledge store.
 
         Args:
             store: DualKnowledgeStore instance. Created if not provided.
+            cache: Result cache. The shared on-disk cache if not provided;
+                pass ResultCache(path=None) for an in-memory one.
         """
         self.store = store or DualKnowledgeStore()
+        self.cache = cache if cache is not None else ResultCache()
 
     def retrieve(
         self,
@@ -242,10 +327,42 @@ class KnowledgeRetriever:
 
         Returns:
             List of (fragment, final_score) tuples, sorted by relevance.
+            final_score is the boosted TF-IDF score, or the fused rank score
+            (1.0 = first in both channels) when dense hits were fused in;
+            min_score applies to the TF-IDF channel before fusion.
         """
         # Detect context for tag boosting
         boost_tags = detect_context_tags(prompt)
 
+        key = cache_key(prompt, [top_k, include_personal, boost_tags])
+        generation = self.store.generation()
+        channels = None
+        cached = self.cache.get(key, generation)
+        if cached is not None:
+            ids = [fragment_id for ranking in cached for fragment_id, _ in ranking]
+            fragments = self.store.get_many(ids)
+            if all(fragment_id in fragments for fragment_id in ids):
+                channels = [
+                    [(fragments[fragment_id], score) for fragment_id, score in ranking]
+                    for ranking in cached
+                ]
+
+        if channels is None:
+            channels = self._search(prompt, top_k, include_personal, boost_tags)
+            self.cache.put(key, generation, [
+                [(fragment.id, score) for fragment, score in ranking] for ranking in channels
+            ])
+        results, dense_results = channels
+        return self._rank(results, dense_results, top_k, min_score, boost_tags)
+
+    def _search(
+        self,
+        prompt: str,
+        top_k: int,
+        include_personal: bool,
+        boost_tags: List[str]
+    ) -> Tuple[List[Tuple[Fragment, float]], List[Tuple[Fragment, float]]]:
+        """Candidates of both retrieval channels, unboosted: (TF-IDF, dense)."""
         # Get base results from store
         # Request more than top_k so we can re-rank
         results = self.store.search(
@@ -255,24 +372,76 @@ class KnowledgeRetriever:
             personal_tags_boost=boost_tags if include_personal else []
         )
 
-        # Apply boosting factors
+        # Second channel: hashed embeddings (empty without NumPy)
+        dense_results = [
+            (fragment, similarity)
+            for fragment, similarity in self.store.search_dense(prompt, top_k * 3)
+            if similarity >= DENSE_MIN_SIMILARITY
+        ]
+        if dense_results and quoted_phrases(prompt):
+            # Embeddings ignore word order; keep only fragments the lexical
+            # channel kept after checking the quoted phrases
+            lexical_ids = {fragment.id for fragment, _ in results}
+            dense_results = [r for r in dense_results if r[0].id in lexical_ids]
+        if not include_personal:
+            results = [r for r in results if r[0].scope != SCOPE_PERSONAL]
+            dense_results = [r for r in dense_results if r[0].scope != SCOPE_PERSONAL]
+        return results, dense_results
+
+    def _rank(
+        self,
+        results: List[Tuple[Fragment, float]],
+        dense_results: List[Tuple[Fragment, float]],
+        top_k: int,
+        min_score: float,
+        boost_tags: List[str]
+    ) -> List[Tuple[Fragment, float]]:
+        """Boost both channels' candidates, apply the thresholds and fuse them."""
+        # Access counters live in each store's sidecar, not the fragment files
+        access = self.store.access_stats(
+            list({fragment.id: fragment for fragment, _ in results + dense_results}.values())
+        )
+
+        # Sort by final score and apply threshold
+        boosted_results = self._boost(results, boost_tags, access)
+        filtered = [(f, s) for f, s in boosted_results if s >= min_score]
+
+        # RRF scores by rank alone, so a weak dense-only hit would fuse as
+        # high as the best lexical one; it needs a higher similarity instead
+        lexical_ids = {fragment.id for fragment, _ in filtered}
+        dense_results = [
+            (fragment, similarity) for fragment, similarity in dense_results
+            if fragment.id in lexical_ids or similarity >= DENSE_ONLY_MIN_SIMILARITY
+        ]
+        if not dense_results:
+            return filtered[:top_k]
+        fused = reciprocal_rank_fusion([filtered, self._boost(dense_results, boost_tags, access)])
+        return fused[:top_k]
+
+    def _boost(
+        self,
+        results: List[Tuple[Fragment, float]],
+        boost_tags: List[str],
+        access: Dict[str, Tuple[int, Optional[str]]]
+    ) -> List[Tuple[Fragment, float]]:
+        """Apply the boosting factors to one channel's results; sorted best first."""
         boosted_results: List[Tuple[Fragment, float]] = []
 
         for fragment, base_score in results:
-            # Skip personal if not included
-            if not include_personal and fragment.scope == SCOPE_PERSONAL:
-                continue
-
             final_score = base_score
 
             # Apply tag boost
             final_score *= calculate_tag_boost(fragment, boost_tags)
 
+            accessed_count, last_accessed = access.get(
+                fragment.id, (fragment.accessed_count, fragment.last_accessed)
+            )
+
             # Apply recency boost
-            final_score *= calculate_recency_boost(fragment)
+            final_score *= calculate_recency_boost(fragment, last_accessed=last_accessed)
 
             # Apply access frequency boost
-            final_score *= calculate_access_boost(fragment)
+            final_score *= calculate_access_boost(fragment, accessed_count=accessed_count)
 
             # Shared fragments get slight preference for project knowledge
             # (unless boost_tags indicate workflow/personal context)
@@ -282,11 +451,8 @@ class KnowledgeRetriever:
 
             boosted_results.append((fragment, final_score))
 
-        # Sort by final score and apply threshold
         boosted_results.sort(key=lambda x: x[1], reverse=True)
-        filtered = [(f, s) for f, s in boosted_results if s >= min_score]
-
-        return filtered[:top_k]
+        return boosted_results
 
     def retrieve_and_format(
         self,
@@ -305,8 +471,10 @@ class KnowledgeRetriever:
         Returns:
             Formatted string ready for injection or display.
         """
-        results = self.retrieve(prompt, top_k=top_k)
+        return self.format_results(self.retrieve(prompt, top_k=top_k), format_style)
 
+    def format_results(self, results: List[Tuple[Fragment, float]], format_style: str = "context") -> str:
+        """Format retrieve() output; see retrieve_and_format()."""
         if not results:
             return ""
 
@@ -346,7 +514,8 @@ class KnowledgeRetriever:
         if not results:
             return "No relevant knowledge found."
 
-        lines = ["Found knowledge fragments:", ""]
+        # Fused results score by rank, not by TF-IDF (see retrieve())
+        lines = ["Found knowledge fragments (scores are rank-fused when dense matches were found):", ""]
 
         for i, (fragment, score) in enumerate(results, 1):
             scope_label = "shared" if fragment.scope == SCOPE_SHARED else "personal"
@@ -363,15 +532,11 @@ class KnowledgeRetriever:
         """
         Mark fragments as accessed (updates access tracking).
 
-        Call this after successfully using retrieved fragments.
+        Call this after successfully using retrieved fragments. Only the
+        stores' access sidecars are appended to; fragment files and the
+        index are left untouched.
         """
-        for fragment in fragments:
-            fragment.mark_accessed()
-            # Get the appropriate store
-            if fragment.scope == SCOPE_SHARED:
-                self.store.shared.update(fragment)
-            else:
-                self.store.personal.update(fragment)
+        self.store.record_access(fragments)
 
 
 def retrieve_for_prompt(prompt: str, top_k: int = 5) -> str:
@@ -0,0 +1,207 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Knowledge Scoring - BM25 scoring shared by the knowledge store backends.
+
+BM25 scores are reported normalized: a document is scored relative to one
+that contains every query term (that occurs in the corpus) exactly once at
+average length, which scores 1.0. This keeps BM25 scores on roughly the
+same scale as the TF-IDF scorer, so thresholds such as the retriever's
+min_score keep their meaning.
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# TFIDFIndex scorers
+SCORER_TFIDF = "tfidf"
+SCORER_BM25 = "bm25"
+SCORERS = (SCORER_TFIDF, SCORER_BM25)
+
+# Term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# (num_docs, total_length, {term: doc frequency}) of a whole collection, so
+# one shard of it is scored on the collection's scale (knowledge_shards.py)
+CollectionStats = Tuple[int, int, Dict[str, int]]
+
+
+def merge_collection_stats(parts: Iterable[CollectionStats]) -> CollectionStats:
+    """Sum the statistics of disjoint parts of a collection."""
+    num_docs = 0
+    total_length = 0
+    doc_frequencies: Dict[str, int] = {}
+    for part_docs, part_length, part_frequencies in parts:
+        num_docs += part_docs
+        total_length += part_length
+        for term, df in part_frequencies.items():
+            doc_frequencies[term] = doc_frequencies.get(term, 0) + df
+    return num_docs, total_length, doc_frequencies
+
+
+def bm25_idf(doc_frequency: int, num_docs: int) -> float:
+    """BM25 IDF, smoothed so it stays positive for terms in most documents."""
+    return math.log(1 + (num_docs - doc_frequency + 0.5) / (doc_frequency + 0.5))
+
+
+def bm25_tf(count: float, doc_length: float, avg_length: float) -> float:
+    """Saturated, length-normalized term frequency (1.0 for count 1 at average length)."""
+    norm = 1 - BM25_B + BM25_B * (doc_length / avg_length if avg_length else 1.0)
+    return count * (BM25_K1 + 1) / (count + BM25_K1 * norm)
+
+
+def bm25_tf_bound() -> float:
+    """Upper bound of bm25_tf() for any count and length."""
+    return (BM25_K1 + 1) / (1 - BM25_B) if BM25_B < 1 else float("inf")
+
+
+class BM25Scorer:
+    """
+    BM25 top-k search over a TFIDFIndex with MaxScore pruning.
+
+    Per-term IDF and score upper bounds are computed on first use and reused
+    until the index changes (index.version), so a long-lived process pays for
+    them once. Query terms are visited from the highest upper bound down;
+    once the top-k threshold exceeds the summed bounds of the remaining
+    terms, those terms are "non-essential": their postings are never
+    enumerated, and a candidate's evaluation stops as soon as its score plus
+    the bounds of the terms left to check cannot beat the threshold. The top
+    k are kept in a bounded heap.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self._version = -1
+        self._idf: Dict[str, float] = {}
+        self._upper_bounds: Dict[str, float] = {}
+        self._avg_length = 0.0
+
+    def _sync(self) -> None:
+        """Drop cached term statistics if the index changed."""
+        if self._version != self.index.version:
+            self._version = self.index.version
+            self._idf.clear()
+            self._upper_bounds.clear()
+            num_docs = self.index.num_docs
+            self._avg_length = self.index.total_length / num_docs if num_docs else 0.0
+
+    def _max_tf(self, term: str, avg_length: float) -> float:
+        """Highest bm25_tf() of a term over its postings."""
+        lengths = self.index.doc_lengths
+        best = 0.0
+        for doc_id, tf in self.index.postings(term).items():
+            length = lengths[doc_id]
+            best = max(best, bm25_tf(round(tf * length), length, avg_length))
+        return best
+
+    def _term_stats(self, term: str) -> Tuple[float, float]:
+        """Get (idf, score upper bound) for a term."""
+        idf = self._idf.get(term)
+        if idf is None:
+            index = self.index
+            idf = bm25_idf(len(index.postings(term)), index.num_docs)
+            self._idf[term] = idf
+            self._upper_bounds[term] = idf * self._max_tf(term, self._avg_length)
+        return idf, self._upper_bounds[term]
+
+    def search(
+        self,
+        query_tokens: List[str],
+        top_k: int = 5,
+        collection: Optional[CollectionStats] = None,
+        allowed: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Return the top_k (doc_id, score) pairs, best first.
+
+        Scores are normalized so that a document containing every query term
+        once at average length scores 1.0 (see module docstring). With
+        `collection`, IDF, average length and the normalization come from
+        those statistics instead of this index (not cached). With `allowed`,
+        other documents are skipped; IDF and upper bounds stay those of the
+        whole index, so scores do not depend on the filter.
+        """
+        index = self.index
+        if index.num_docs == 0 or top_k <= 0:
+            return []
+        self._sync()
+
+        terms = [t for t in set(query_tokens) if index.postings(t)]
+        if not terms:
+            return []
+
+        if collection is None:
+            avg_length = self._avg_length
+            stats = {t: self._term_stats(t) for t in terms}
+            reference = sum(idf for idf, _ in stats.values())
+        else:
+            num_docs, total_length, doc_frequencies = collection
+            avg_length = total_length / num_docs if num_docs else 0.0
+            stats = {}
+            for t in terms:
+                idf = bm25_idf(doc_frequencies.get(t, len(index.postings(t))), num_docs)
+                stats[t] = (idf, idf * self._max_tf(t, avg_length))
+            reference = sum(
+                bm25_idf(doc_frequencies[t], num_docs) for t in set(query_tokens) if doc_frequencies.get(t)
+            )
+        # Highest upper bound first; remaining[i] = sum of bounds of terms[i:]
+        terms.sort(key=lambda t: stats[t][1], reverse=True)
+        remaining = [0.0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + stats[terms[i]][1]
+
+        postings = [index.postings(t) for t in terms]
+        idfs = [stats[t][0] for t in terms]
+        lengths = index.doc_lengths
+
+        heap: List[Tuple[float, str]] = []
+        threshold = 0.0
+        seen: Set[str] = set()
+
+        for i, docs in enumerate(postings):
+            # Documents only in terms[i:] can score at most remaining[i]
+            if len(heap) >= top_k and remaining[i] <= threshold:
+                break
+
+            if allowed is not None:
+                # Walk the smaller side
+                if len(allowed) < len(docs):
+                    docs = [doc_id for doc_id in allowed if doc_id in docs]
+                else:
+                    docs = [doc_id for doc_id in docs if doc_id in allowed]
+
+            for doc_id in docs:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+
+                # Terms before i were already enumerated, so doc_id is not in them
+                length = lengths[doc_id]
+                score = 0.0
+                for j in range(i, len(terms)):
+                    if len(heap) >= top_k and score + remaining[j] <= threshold:
+                        score = -1.0
+                        break
+                    tf = postings[j].get(doc_id)
+                    if tf is not None:
+                        score += idfs[j] * bm25_tf(round(tf * length), length, avg_length)
+
+                if score <= 0:
+                    continue
+                if len(heap) < top_k:
+                    heapq.heappush(heap, (score, doc_id))
+                elif score > threshold:
+                    heapq.heapreplace(heap, (score, doc_id))
+                else:
+                    continue
+                if len(heap) >= top_k:
+                    threshold = heap[0][0]
+
+        return [(doc_id, score / reference) for score, doc_id in sorted(heap, reverse=True)]
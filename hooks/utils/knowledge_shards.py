@@ -0,0 +1,584 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Knowledge Shards - a json-backend store split into N index shards.
+
+One TFIDFIndex per scope has to be loaded, replayed and compacted as a
+whole. With {"shards": N} in config.json the store is split into N
+KnowledgeStores, each with its own fragments, index, journal and sidecars:
+
+    <store>/shards-<strategy>-<N>/00/ ... /<N-1>/
+
+A fragment's shard is picked by `shard_by`:
+
+- "id": hash of the fragment id (even spread, direct lookups)
+- "tag": hash of the family of its first tag ("react" for "react-forms"),
+  so related fragments share a shard; untagged fragments fall back to the
+  id hash. Lookups by id probe every shard.
+
+A search fans out over a thread pool (or a process pool with
+{"shard_executor": "process"}) in two rounds: every shard reports its
+document count, total length and the document frequency of the query
+terms; the sums are passed back so each shard scores its top k with the
+statistics of the whole store, and the sorted per-shard lists are combined
+with a k-way heap merge. Scores therefore match an unsharded store.
+
+Process-pool workers open the shards themselves and keep them between
+searches (refreshed from the journal like the hook daemon does); with the
+binary index format their mapped pages are shared by the OS.
+
+`knowledge_admin rebalance <N> [id|tag]` moves every fragment to a new
+layout (N = 1 returns to a single index).
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import contextlib
+import hashlib
+import heapq
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .fragment_storage import write_json_atomic
+from .knowledge_scoring import CollectionStats, merge_collection_stats
+from .knowledge_store import (
+    BACKEND_JSON,
+    Fragment,
+    KnowledgeStore,
+    RebuildProgress,
+    TFIDFIndex,
+    get_store_dir,
+    load_store_config,
+    open_store,
+    save_store_config,
+)
+from .tokenizer import Analyzer
+
+SHARD_BY_ID = "id"
+SHARD_BY_TAG = "tag"
+SHARD_STRATEGIES = (SHARD_BY_ID, SHARD_BY_TAG)
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+SHARD_EXECUTORS = (EXECUTOR_THREAD, EXECUTOR_PROCESS)
+
+
+def _bucket(key: str, num_shards: int) -> int:
+    """Stable shard number of a key (hash() is salted per process)."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_shards
+
+
+def tag_family(tag: str) -> str:
+    """Family of a tag: its first dash-separated part ("react-forms" -> "react")."""
+    return tag.lower().split("-", 1)[0]
+
+
+def shard_for(fragment_id: str, tags: Optional[List[str]], num_shards: int, strategy: str) -> int:
+    """Shard number of a fragment."""
+    if strategy == SHARD_BY_TAG and tags:
+        return _bucket("tag:" + tag_family(tags[0]), num_shards)
+    return _bucket("id:" + fragment_id, num_shards)
+
+
+def shards_dir(base_dir: Path, num_shards: int, strategy: str) -> Path:
+    """Directory holding the shards of one layout."""
+    return base_dir / f"shards-{strategy}-{num_shards}"
+
+
+# Shard tasks, run on a thread (with the store's own shard objects) or in a
+# process-pool worker (with the worker's copy, see _run_in_worker)
+
+def _shard_stats(shard: KnowledgeStore, terms: List[str]) -> CollectionStats:
+    return shard.collection_stats(terms)
+
+
+def _shard_rank(
+    shard: KnowledgeStore,
+    queries: List[str],
+    top_k: int,
+    scorer: Optional[str],
+    collections: List[CollectionStats],
+    tags: Optional[List[str]] = None
+) -> List[List[Tuple[str, float]]]:
+    return [shard.rank(query, top_k, scorer, collection, tags) for query, collection in zip(queries, collections)]
+
+
+def _shard_rank_dense(shard: KnowledgeStore, query: str, top_k: int) -> List[Tuple[str, float]]:
+    return shard.rank_dense(query, top_k)
+
+
+_SHARD_TASKS: Dict[str, Callable[..., Any]] = {
+    "stats": _shard_stats,
+    "rank": _shard_rank,
+    "rank_dense": _shard_rank_dense,
+}
+
+# Shards opened by this process as a pool worker: directory -> store
+_worker_shards: Dict[str, KnowledgeStore] = {}
+
+
+def _run_in_worker(scope: str, directory: str, config: Dict[str, Any], task: str, args: tuple) -> Any:
+    """Run a shard task in a process-pool worker, opening the shard on first use."""
+    shard = _worker_shards.get(directory)
+    if shard is None:
+        shard = _worker_shards[directory] = KnowledgeStore(scope, base_dir=Path(directory), config=config)
+    else:
+        shard.refresh()
+    return _SHARD_TASKS[task](shard, *args)
+
+
+def _merge_ranked(ranked: List[List[Tuple[str, float]]], top_k: int) -> List[Tuple[int, str, float]]:
+    """K-way merge of per-shard lists sorted best first into the overall top_k (shard, id, score)."""
+    streams = [[(shard, doc_id, score) for doc_id, score in results] for shard, results in enumerate(ranked)]
+    return list(islice(heapq.merge(*streams, key=lambda r: r[2], reverse=True), top_k))
+
+
+class ShardedKnowledgeStore:
+    """
+    Json-backend store split into index shards; same interface as KnowledgeStore.
+
+    Writes go to the fragment's shard. Reads fan out over all shards in
+    parallel and are merged (see module docstring).
+    """
+
+    def __init__(self, scope: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            scope: 'shared' or 'personal'
+            config: Store settings; defaults to the scope's config.json
+        """
+        self.scope = scope
+        self.base_dir = get_store_dir(scope)
+        self.config = dict(config) if config is not None else load_store_config(self.base_dir)
+        self.num_shards = int(self.config["shards"])
+        self.shard_by = self.config["shard_by"]
+        if self.num_shards < 1:
+            raise ValueError(f"Invalid shard count: {self.num_shards}")
+        if self.shard_by not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy: {self.shard_by} (expected one of {', '.join(SHARD_STRATEGIES)})")
+        self.executor_kind = self.config["shard_executor"]
+        if self.executor_kind not in SHARD_EXECUTORS:
+            raise ValueError(f"Unknown shard executor: {self.executor_kind} (expected one of {', '.join(SHARD_EXECUTORS)})")
+        self.index_format = self.config["index_format"]
+        self.analyzer = Analyzer.from_config(self.config)
+
+        self.shards_dir = shards_dir(self.base_dir, self.num_shards, self.shard_by)
+        self.shards: List[KnowledgeStore] = []
+        for number in range(self.num_shards):
+            directory = self.shards_dir / f"{number:02d}"
+            (directory / "fragments").mkdir(parents=True, exist_ok=True)
+            self.shards.append(KnowledgeStore(scope, base_dir=directory, config=self.config))
+
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+
+    def _shard_of(self, fragment_id: str, tags: Optional[List[str]]) -> KnowledgeStore:
+        return self.shards[shard_for(fragment_id, tags, self.num_shards, self.shard_by)]
+
+    def _locate(self, fragment_id: str) -> Optional[KnowledgeStore]:
+        """Shard currently holding a fragment (None if missing)."""
+        if self.shard_by == SHARD_BY_ID:
+            shard = self._shard_of(fragment_id, None)
+            return shard if shard.exists(fragment_id) else None
+        for shard in self.shards:
+            if shard.exists(fragment_id):
+                return shard
+        return None
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                workers = max(1, min(self.num_shards, os.cpu_count() or 1))
+                if self.executor_kind == EXECUTOR_PROCESS:
+                    # spawn: forking a threaded process (the hook daemon) can deadlock
+                    self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="knowledge-shard")
+            return self._executor
+
+    def _fan_out(self, task: str, *args) -> List[Any]:
+        """Run a shard task on every shard in parallel; results in shard order."""
+        executor = self._get_executor()
+        if self.executor_kind == EXECUTOR_PROCESS:
+            futures = [
+                executor.submit(_run_in_worker, self.scope, str(shard.base_dir), self.config, task, args)
+                for shard in self.shards
+            ]
+        else:
+            futures = [executor.submit(_SHARD_TASKS[task], shard, *args) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        """Shut down the fan-out pool."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _fetch(self, hits: List[Tuple[int, str, float]]) -> List[Tuple[Fragment, float]]:
+        """Load the fragments of (shard, id, score) hits from their shards."""
+        by_shard: Dict[int, List[str]] = defaultdict(list)
+        for number, doc_id, _ in hits:
+            by_shard[number].append(doc_id)
+        found: Dict[str, Fragment] = {}
+        for number, doc_ids in by_shard.items():
+            found.update(self.shards[number].get_many(doc_ids))
+        return [(found[doc_id], score) for _, doc_id, score in hits if doc_id in found]
+
+    def refresh(self) -> bool:
+        """Pick up index changes made by other processes in any shard."""
+        changed = False
+        for shard in self.shards:
+            changed = shard.refresh() or changed
+        return changed
+
+    def generation(self) -> Tuple[Any, ...]:
+        """Generations of every shard (see KnowledgeStore.generation())."""
+        return tuple(shard.generation() for shard in self.shards)
+
+    def get(self, fragment_id: str) -> Optional[Fragment]:
+        """Get a fragment by ID."""
+        return self.get_many([fragment_id]).get(fragment_id)
+
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Fragment]:
+        """Get several fragments by ID; missing ones are left out."""
+        if self.shard_by == SHARD_BY_ID:
+            by_shard: Dict[int, List[str]] = defaultdict(list)
+            for fragment_id in fragment_ids:
+                by_shard[shard_for(fragment_id, None, self.num_shards, SHARD_BY_ID)].append(fragment_id)
+            found: Dict[str, Fragment] = {}
+            for number, ids in by_shard.items():
+                found.update(self.shards[number].get_many(ids))
+            return found
+
+        found = {}
+        missing = list(fragment_ids)
+        for shard in self.shards:
+            if not missing:
+                break
+            found.update(shard.get_many(missing))
+            missing = [fragment_id for fragment_id in missing if fragment_id not in found]
+        return found
+
+    def _collections(self, queries: List[str]) -> List[CollectionStats]:
+        """Whole-store statistics for each query's terms."""
+        tokens = [self.analyzer.tokenize(query) for query in queries]
+        terms = sorted({term for query_tokens in tokens for term in query_tokens})
+        merged = merge_collection_stats(self._fan_out("stats", terms))
+        num_docs, total_length, doc_frequencies = merged
+        return [
+            (num_docs, total_length, {t: doc_frequencies[t] for t in set(query_tokens) if t in doc_frequencies})
+            for query_tokens in tokens
+        ]
+
+    def rank(
+        self,
+        query: str,
+        top_k: int = 5,
+        scorer: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Top_k (fragment_id, score) pairs over all shards."""
+        return [(doc_id, score) for _, doc_id, score in self._rank_many([query], top_k, scorer, tags)[0]]
+
+    def _rank_many(
+        self,
+        queries: List[str],
+        top_k: int,
+        scorer: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> List[List[Tuple[int, str, float]]]:
+        if not queries or top_k <= 0:
+            return [[] for _ in queries]
+        collections = self._collections(queries)
+        # Each shard filters by its own tag index
+        per_shard = self._fan_out("rank", queries, top_k, scorer, collections, tags)
+        return [
+            _merge_ranked([ranked[i] for ranked in per_shard], top_k)
+            for i in range(len(queries))
+        ]
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        tags: Optional[List[str]] = None
+    ) -> List[Tuple[Fragment, float]]:
+        """
+        Search for fragments matching the query, optionally only those
+        having any of `tags`.
+
+        Returns list of (fragment, score) tuples.
+        """
+        return self._fetch(self._rank_many([query], top_k, tags=tags)[0])
+
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[Fragment, float]]]:
+        """Search for many queries at once; each shard ranks the whole batch in one task."""
+        return [self._fetch(hits) for hits in self._rank_many(queries, top_k)]
+
+    def search_dense(self, query: str, top_k: int = 5) -> List[Tuple[Fragment, float]]:
+        """
+        Search the hashed-embedding channel of every shard.
+
+        Returns (fragment, cosine similarity) tuples; empty without NumPy.
+        """
+        if top_k <= 0:
+            return []
+        return self._fetch(_merge_ranked(self._fan_out("rank_dense", query, top_k), top_k))
+
+    def find_similar(
+        self,
+        content: str,
+        threshold: float = 0.5,
+        tags: Optional[List[str]] = None
+    ) -> Optional[Fragment]:
+        """Find the closest near-duplicate fragment in any shard (see KnowledgeStore.find_similar)."""
+        best: Optional[Tuple[float, str, KnowledgeStore]] = None
+        for shard in self.shards:
+            match = shard.find_similar_id(content, threshold, tags)
+            if match and (best is None or (match[1], match[0]) > (best[0], best[1])):
+                best = (match[1], match[0], shard)
+        return best[2].get(best[1]) if best else None
+
+    def list_all(self) -> List[Fragment]:
+        """List all fragments in the store."""
+        return [fragment for shard in self.shards for fragment in shard.list_all()]
+
+    def record_access(self, fragment_ids: List[str]) -> None:
+        """Count a retrieval of each fragment in its shard's access sidecar."""
+        by_shard: Dict[int, List[str]] = defaultdict(list)
+        for fragment_id in fragment_ids:
+            shard = self._locate(fragment_id)
+            if shard is not None:
+                by_shard[self.shards.index(shard)].append(fragment_id)
+        for number, ids in by_shard.items():
+            self.shards[number].record_access(ids)
+
+    def access_stats(self, fragments: List[Fragment]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """Get each fragment's (accessed_count, last_accessed) from its shard."""
+        by_shard: Dict[int, List[Fragment]] = defaultdict(list)
+        for fragment in fragments:
+            by_shard[shard_for(fragment.id, fragment.tags, self.num_shards, self.shard_by)].append(fragment)
+        stats: Dict[str, Tuple[int, Optional[str]]] = {}
+        for number, shard_fragments in by_shard.items():
+            stats.update(self.shards[number].access_stats(shard_fragments))
+        return stats
+
+    def add(self, fragment: Fragment) -> str:
+        """
+        Add a fragment to its shard.
+
+        Returns the fragment ID.
+        """
+        target = self._shard_of(fragment.id, fragment.tags)
+        if self.shard_by == SHARD_BY_TAG:
+            # A changed first tag moves the fragment to another shard
+            current = self._locate(fragment.id)
+            if current is not None and current is not target:
+                current.delete(fragment.id)
+        return target.add(fragment)
+
+    def add_many(self, fragments: List[Fragment], reuse: Optional[List[TFIDFIndex]] = None) -> int:
+        """Add many fragments, one batch per shard. Returns the count."""
+        by_shard: Dict[int, List[Fragment]] = defaultdict(list)
+        for fragment in fragments:
+            by_shard[shard_for(fragment.id, fragment.tags, self.num_shards, self.shard_by)].append(fragment)
+        return sum(self.shards[number].add_many(batch, reuse) for number, batch in by_shard.items())
+
+    def update(self, fragment: Fragment) -> bool:
+        """
+        Update an existing fragment.
+
+        Returns True if successful, False if fragment doesn't exist.
+        """
+        current = self._locate(fragment.id)
+        if current is None:
+            return False
+        target = self._shard_of(fragment.id, fragment.tags)
+        if target is current:
+            return current.update(fragment)
+        current.delete(fragment.id)
+        target.add(fragment)
+        return True
+
+    def delete(self, fragment_id: str) -> bool:
+        """
+        Delete a fragment.
+
+        Returns True if successful, False if fragment doesn't exist.
+        """
+        shard = self._locate(fragment_id)
+        return shard.delete(fragment_id) if shard is not None else False
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["ShardedKnowledgeStore"]:
+        """
+        Group writes into one batch per shard (see KnowledgeStore.batch()).
+
+        Each shard commits separately when the block exits; if an exception
+        escapes, every shard rolls back. Process-pool searches inside the
+        block read the shards from disk, so they miss the uncommitted writes.
+        """
+        with contextlib.ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.batch())
+            yield self
+
+    def clear(self) -> None:
+        """Delete every fragment and reset every shard's index."""
+        for shard in self.shards:
+            shard.clear()
+
+    def compact(self) -> None:
+        """Fold each shard's journal into its index file."""
+        for shard in self.shards:
+            shard.compact()
+
+    def rebuild_index(self, workers: int = 1, progress: Optional[RebuildProgress] = None) -> int:
+        """
+        Rebuild every shard's index, one after another (see
+        KnowledgeStore.rebuild_index()). Progress covers the whole store.
+        Returns the number of fragments indexed.
+        """
+        start = time.perf_counter()
+        sizes = [len(shard.storage.scan()) for shard in self.shards]
+
+        def store_progress(offset: int, done: int, total: int, elapsed: float) -> None:
+            progress(offset + done, sum(sizes), time.perf_counter() - start)
+
+        count = 0
+        for number, shard in enumerate(self.shards):
+            shard_progress = None if progress is None else partial(store_progress, sum(sizes[:number]))
+            count += shard.rebuild_index(workers, shard_progress)
+        return count
+
+    def sync(self) -> Dict[str, int]:
+        """Apply outside fragment changes to every shard's index (see KnowledgeStore.sync())."""
+        counts: Dict[str, int] = defaultdict(int)
+        for shard in self.shards:
+            for key, value in shard.sync().items():
+                counts[key] += value
+        return dict(counts)
+
+    def migrate_storage(self, kind: str) -> int:
+        """Move every shard's fragments to another storage layout (see KnowledgeStore)."""
+        count = sum(shard.migrate_storage(kind) for shard in self.shards)
+        self.config["storage"] = kind
+        save_store_config(self.base_dir, self.config)
+        return count
+
+    def migrate_index_format(self, kind: str) -> int:
+        """Rewrite every shard's index in another format (see KnowledgeStore)."""
+        count = sum(shard.migrate_index_format(kind) for shard in self.shards)
+        self.index_format = kind
+        self.config["index_format"] = kind
+        save_store_config(self.base_dir, self.config)
+        return count
+
+    def export_index(self, path: Path) -> None:
+        """Write the shards' indexes, merged, as index.json-style JSON to `path`."""
+        merged: Dict[str, Any] = {
+            "term_frequencies": defaultdict(dict),
+            "doc_lengths": {},
+            "num_docs": 0,
+            "doc_frequencies": defaultdict(int),
+            "doc_terms": {},
+            "doc_hashes": {},
+        }
+        for shard in self.shards:
+            data = shard.index_dict()
+            for term, docs in data["term_frequencies"].items():
+                merged["term_frequencies"][term].update(docs)
+            for term, count in data["doc_frequencies"].items():
+                merged["doc_frequencies"][term] += count
+            merged["num_docs"] += data["num_docs"]
+            for key in ("doc_lengths", "doc_terms", "doc_hashes"):
+                merged[key].update(data.get(key, {}))
+        write_json_atomic(path, merged)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the store, with the fragment count of each shard."""
+        shard_stats = [shard.get_stats() for shard in self.shards]
+        tag_counts: Dict[str, int] = defaultdict(int)
+        source_counts: Dict[str, int] = defaultdict(int)
+        scope_counts: Dict[str, int] = defaultdict(int)
+        for stats in shard_stats:
+            for tag, count in stats["tag_counts"].items():
+                tag_counts[tag] += count
+            for source, count in stats["source_counts"].items():
+                source_counts[source] += count
+            for scope, count in stats["scope_counts"].items():
+                scope_counts[scope] += count
+
+        return {
+            "scope": self.scope,
+            "total_fragments": sum(stats["total_fragments"] for stats in shard_stats),
+            # Summed over shards (a term in two shards counts twice), so no
+            # shard's index has to be loaded
+            "total_terms": sum(stats["total_terms"] for stats in shard_stats),
+            "tag_counts": dict(tag_counts),
+            "source_counts": dict(source_counts),
+            "scope_counts": dict(scope_counts),
+            "total_accesses": sum(stats["total_accesses"] for stats in shard_stats),
+            "shards": [stats["total_fragments"] for stats in shard_stats],
+        }
+
+
+def rebalance_store(scope: str, num_shards: int, strategy: str = SHARD_BY_ID) -> int:
+    """
+    Move every fragment of a json-backend store to a new shard layout and
+    switch config.json to it (num_shards = 1: a single index).
+
+    Access counters are folded into the fragments; indexed term counts are
+    reused, so fragments are not tokenized again. Returns the number of
+    fragments moved.
+    """
+    if num_shards < 1:
+        raise ValueError(f"Invalid shard count: {num_shards}")
+    if strategy not in SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy: {strategy} (expected one of {', '.join(SHARD_STRATEGIES)})")
+
+    base_dir = get_store_dir(scope)
+    config = load_store_config(base_dir)
+    if config["backend"] != BACKEND_JSON:
+        raise ValueError(f"Sharding only applies to the {BACKEND_JSON} backend")
+    if num_shards == config["shards"] and (num_shards == 1 or strategy == config["shard_by"]):
+        raise ValueError(f"Already using {num_shards} shard(s) by {strategy}")
+
+    source = open_store(scope)
+    target_config = dict(config, shards=num_shards, shard_by=strategy)
+    if num_shards > 1:
+        target = ShardedKnowledgeStore(scope, target_config)
+    else:
+        target = KnowledgeStore(scope, config=target_config)
+
+    fragments = source.list_all()
+    access = source.access_stats(fragments)
+    for fragment in fragments:
+        fragment.accessed_count, fragment.last_accessed = access[fragment.id]
+    source_shards = getattr(source, "shards", [source])
+
+    target.clear()
+    count = target.add_many(fragments, [shard.index for shard in source_shards])
+
+    save_store_config(base_dir, target_config)
+    source.clear()
+    if isinstance(source, ShardedKnowledgeStore):
+        source.close()
+        shutil.rmtree(source.shards_dir, ignore_errors=True)
+    if isinstance(target, ShardedKnowledgeStore):
+        target.close()
+    return count
@@ -0,0 +1,624 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+SQLite Knowledge Store - FTS5 backend with BM25 ranking.
+
+Drop-in alternative to KnowledgeStore (same add/get/update/delete/search/
+list_all/get_stats interface) for large stores. Fragments live in one
+knowledge.db file per store:
+
+- `fragments` holds the fragment records (tags and metadata as JSON)
+- `fragments_fts` is an external-content FTS5 table over content and tags,
+  kept in sync by triggers
+- `term_stats` keeps per-term document frequencies (a B-tree lookup per
+  query term, where fts5vocab would walk each term's postings)
+- `store_meta` keeps document count and total length for BM25, and a
+  generation counter bumped by every fragment write (see generation())
+- `tag_counts` and `source_counts` (fragments per tag and per source and
+  scope), with the term and access totals in `store_meta`, are kept by
+  triggers too, so get_stats() reads a few small tables instead of scanning
+  every fragment
+
+Queries never load the index into Python: FTS5 selects and ranks the
+candidates with bm25(), which are then rescored with the shared BM25
+formula (knowledge_scoring.py) so scores stay on the TF-IDF scale. Every
+write is a single transaction; writes inside batch() share one.
+
+Select it per store with {"backend": "sqlite"} in config.json, or run
+`uv run hooks/knowledge_admin.py migrate-backend sqlite`.
+
+Zero external dependencies - uses only Python standard library (sqlite3 with
+FTS5, which standard CPython builds include).
+"""
+
+import contextlib
+import json
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .access_stats import merge_access_stats
+from .knowledge_scoring import bm25_idf, bm25_tf
+from .knowledge_store import SCOPE_SHARED, Fragment, TFIDFIndex, get_store_dir
+from .minhash import jaccard
+
+SCHEMA_VERSION = 4
+
+# FTS5 hits checked for near-duplicates by find_similar()
+SIMILAR_CANDIDATES = 10
+
+# FTS5 candidates fetched per requested result before rescoring
+CANDIDATE_FACTOR = 4
+MIN_CANDIDATES = 20
+
+# Terms in more than this share of documents are left out of the FTS5 match,
+# and at most MAX_MATCH_TERMS of the rarest terms are matched (all terms still
+# count when rescoring). Ranking every document that contains a common word
+# is what makes long prompts slow on large stores.
+COMMON_TERM_RATIO = 0.02
+MAX_MATCH_TERMS = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fragments (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    source TEXT,
+    scope TEXT,
+    created TEXT,
+    accessed_count INTEGER NOT NULL DEFAULT 0,
+    last_accessed TEXT,
+    metadata TEXT NOT NULL,
+    length INTEGER NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS fragments_fts USING fts5(
+    content, tags, content='fragments', content_rowid='rowid'
+);
+
+CREATE TABLE IF NOT EXISTS term_stats (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Retrieval counters, kept out of fragments so counting an access does not
+-- fire the FTS update trigger
+CREATE TABLE IF NOT EXISTS access_stats (
+    id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_accessed TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+-- Fragments per tag, and per (source, scope); missing values count as ''
+CREATE TABLE IF NOT EXISTS tag_counts (
+    tag TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS source_counts (
+    source TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (source, scope)
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO store_meta (key, value) VALUES
+    ('num_docs', 0), ('total_length', 0), ('generation', 0), ('num_terms', 0), ('accessed', 0);
+
+CREATE TRIGGER IF NOT EXISTS fragments_ai AFTER INSERT ON fragments BEGIN
+    INSERT INTO fragments_fts (rowid, content, tags) VALUES (new.rowid, new.content, new.tags);
+    UPDATE store_meta SET value = value + 1 WHERE key = 'num_docs';
+    UPDATE store_meta SET value = value + new.length WHERE key = 'total_length';
+    UPDATE store_meta SET value = value + 1 WHERE key = 'generation';
+    UPDATE store_meta SET value = value + new.accessed_count WHERE key = 'accessed';
+    INSERT INTO tag_counts (tag, count) SELECT DISTINCT value, 1 FROM json_each(new.tags) WHERE true
+        ON CONFLICT (tag) DO UPDATE SET count = count + 1;
+    INSERT INTO source_counts (source, scope, count) VALUES (COALESCE(new.source, ''), COALESCE(new.scope, ''), 1)
+        ON CONFLICT (source, scope) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fragments_ad AFTER DELETE ON fragments BEGIN
+    INSERT INTO fragments_fts (fragments_fts, rowid, content, tags)
+        VALUES ('delete', old.rowid, old.content, old.tags);
+    UPDATE store_meta SET value = value - 1 WHERE key = 'num_docs';
+    UPDATE store_meta SET value = value - old.length WHERE key = 'total_length';
+    UPDATE store_meta SET value = value + 1 WHERE key = 'generation';
+    UPDATE store_meta SET value = value - old.accessed_count WHERE key = 'accessed';
+    UPDATE tag_counts SET count = count - 1 WHERE tag IN (SELECT value FROM json_each(old.tags));
+    DELETE FROM tag_counts WHERE tag IN (SELECT value FROM json_each(old.tags)) AND count <= 0;
+    UPDATE source_counts SET count = count - 1
+        WHERE source = COALESCE(old.source, '') AND scope = COALESCE(old.scope, '');
+    DELETE FROM source_counts
+        WHERE source = COALESCE(old.source, '') AND scope = COALESCE(old.scope, '') AND count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS fragments_au AFTER UPDATE ON fragments BEGIN
+    INSERT INTO fragments_fts (fragments_fts, rowid, content, tags)
+        VALUES ('delete', old.rowid, old.content, old.tags);
+    INSERT INTO fragments_fts (rowid, content, tags) VALUES (new.rowid, new.content, new.tags);
+    UPDATE store_meta SET value = value - old.length + new.length WHERE key = 'total_length';
+    UPDATE store_meta SET value = value + 1 WHERE key = 'generation';
+    UPDATE store_meta SET value = value - old.accessed_count + new.accessed_count WHERE key = 'accessed';
+    UPDATE tag_counts SET count = count - 1 WHERE tag IN (SELECT value FROM json_each(old.tags));
+    DELETE FROM tag_counts WHERE tag IN (SELECT value FROM json_each(old.tags)) AND count <= 0;
+    INSERT INTO tag_counts (tag, count) SELECT DISTINCT value, 1 FROM json_each(new.tags) WHERE true
+        ON CONFLICT (tag) DO UPDATE SET count = count + 1;
+    UPDATE source_counts SET count = count - 1
+        WHERE source = COALESCE(old.source, '') AND scope = COALESCE(old.scope, '');
+    DELETE FROM source_counts
+        WHERE source = COALESCE(old.source, '') AND scope = COALESCE(old.scope, '') AND count <= 0;
+    INSERT INTO source_counts (source, scope, count) VALUES (COALESCE(new.source, ''), COALESCE(new.scope, ''), 1)
+        ON CONFLICT (source, scope) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS term_stats_ai AFTER INSERT ON term_stats BEGIN
+    UPDATE store_meta SET value = value + 1 WHERE key = 'num_terms';
+END;
+
+CREATE TRIGGER IF NOT EXISTS term_stats_ad AFTER DELETE ON term_stats BEGIN
+    UPDATE store_meta SET value = value - 1 WHERE key = 'num_terms';
+END;
+
+CREATE TRIGGER IF NOT EXISTS access_stats_ai AFTER INSERT ON access_stats BEGIN
+    UPDATE store_meta SET value = value + new.count WHERE key = 'accessed';
+END;
+
+CREATE TRIGGER IF NOT EXISTS access_stats_au AFTER UPDATE ON access_stats BEGIN
+    UPDATE store_meta SET value = value - old.count + new.count WHERE key = 'accessed';
+END;
+
+CREATE TRIGGER IF NOT EXISTS access_stats_ad AFTER DELETE ON access_stats BEGIN
+    UPDATE store_meta SET value = value - old.count WHERE key = 'accessed';
+END;
+"""
+
+# Triggers changed in schema versions 3 (generation counter) and 4 (stats
+# counters); dropped and recreated when an older database is opened
+UPGRADE_TRIGGERS = """
+DROP TRIGGER IF EXISTS fragments_ai;
+DROP TRIGGER IF EXISTS fragments_ad;
+DROP TRIGGER IF EXISTS fragments_au;
+"""
+
+# Fill the stats counters of a database created before schema version 4
+BACKFILL_COUNTS = """
+DELETE FROM tag_counts;
+INSERT INTO tag_counts (tag, count)
+    SELECT tag.value, COUNT(DISTINCT fragments.rowid) FROM fragments, json_each(fragments.tags) AS tag
+    GROUP BY tag.value;
+DELETE FROM source_counts;
+INSERT INTO source_counts (source, scope, count)
+    SELECT COALESCE(source, ''), COALESCE(scope, ''), COUNT(*) FROM fragments
+    GROUP BY COALESCE(source, ''), COALESCE(scope, '');
+UPDATE store_meta SET value = (SELECT COUNT(*) FROM term_stats) WHERE key = 'num_terms';
+UPDATE store_meta SET value = (SELECT COALESCE(SUM(accessed_count), 0) FROM fragments)
+    + (SELECT COALESCE(SUM(count), 0) FROM access_stats) WHERE key = 'accessed';
+"""
+
+COLUMNS = "id, content, tags, source, scope, created, accessed_count, last_accessed, metadata"
+
+
+def _analyze(fragment: Fragment) -> Counter:
+    """Term counts of a fragment, tokenized like the TF-IDF index."""
+    text = fragment.content
+    if fragment.tags:
+        text += " " + " ".join(fragment.tags)
+    return Counter(TFIDFIndex.tokenize(text))
+
+
+def _row_to_fragment(row: Tuple) -> Fragment:
+    return Fragment(
+        content=row[1],
+        tags=json.loads(row[2]),
+        source=row[3] or "unknown",
+        scope=row[4] or SCOPE_SHARED,
+        fragment_id=row[0],
+        created=row[5],
+        accessed_count=row[6] or 0,
+        last_accessed=row[7],
+        metadata=json.loads(row[8])
+    )
+
+
+class SQLiteKnowledgeStore:
+    """
+    Knowledge store backed by SQLite FTS5.
+
+    One connection per store, shared by the threads of the prompt
+    dispatcher and serialized with a lock.
+    """
+
+    def __init__(self, scope: str = SCOPE_SHARED):
+        self.scope = scope
+        self.base_dir = get_store_dir(scope)
+        self.db_path = self.base_dir / "knowledge.db"
+
+        self._lock = threading.Lock()
+        # Nesting depth of batch(); writes then join its open transaction
+        self._batch_depth = 0
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            with self.conn:
+                version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+                if 0 < version < SCHEMA_VERSION:
+                    self.conn.executescript(UPGRADE_TRIGGERS)
+                self.conn.executescript(SCHEMA)
+                if 0 < version < 4:
+                    self.conn.executescript(BACKFILL_COUNTS)
+                self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        except sqlite3.OperationalError as e:
+            self.conn.close()
+            raise RuntimeError(f"SQLite knowledge store needs FTS5 support: {e}")
+
+    def refresh(self) -> bool:
+        """Nothing is cached in memory; queries always see the current database."""
+        return False
+
+    def generation(self) -> Tuple[str, int]:
+        """Counter bumped by every fragment insert, update and delete (for caching query results)."""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM store_meta WHERE key = 'generation'").fetchone()
+        return "sqlite", row[0] if row else 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Hold the lock for a write: its own transaction, or the open batch() one."""
+        with self._lock:
+            if self._batch_depth:
+                yield
+            else:
+                with self.conn:
+                    yield
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["SQLiteKnowledgeStore"]:
+        """
+        Group writes into one transaction, committed (one WAL sync) when the
+        block exits and rolled back if an exception escapes. Nested batches
+        join the outermost one.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                with self._lock:
+                    self.conn.rollback()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            with self._lock:
+                self.conn.commit()
+
+    def _remove(self, fragment_id: str) -> bool:
+        """
+        Delete a fragment and its term stats (caller holds the transaction).
+
+        Access counts are kept, so replacing a fragment does not reset them.
+        """
+        row = self.conn.execute(
+            "SELECT content, tags FROM fragments WHERE id = ?", (fragment_id,)
+        ).fetchone()
+        if row is None:
+            return False
+
+        terms = [(term,) for term in _analyze(Fragment(row[0], json.loads(row[1])))]
+        self.conn.executemany("UPDATE term_stats SET df = df - 1 WHERE term = ?", terms)
+        self.conn.executemany("DELETE FROM term_stats WHERE term = ? AND df <= 0", terms)
+        self.conn.execute("DELETE FROM fragments WHERE id = ?", (fragment_id,))
+        return True
+
+    def _insert(self, fragment: Fragment) -> None:
+        """Insert or replace a fragment (caller holds the transaction)."""
+        counts = _analyze(fragment)
+        self._remove(fragment.id)
+        self.conn.execute(
+            f"INSERT INTO fragments ({COLUMNS}, length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                fragment.id, fragment.content, json.dumps(fragment.tags), fragment.source,
+                fragment.scope, fragment.created, fragment.accessed_count,
+                fragment.last_accessed, json.dumps(fragment.metadata), sum(counts.values())
+            )
+        )
+        self.conn.executemany(
+            "INSERT INTO term_stats (term, df) VALUES (?, 1) "
+            "ON CONFLICT (term) DO UPDATE SET df = df + 1",
+            [(term,) for term in counts]
+        )
+
+    def add(self, fragment: Fragment) -> str:
+        """
+        Add a fragment to the store.
+
+        Returns the fragment ID.
+        """
+        fragment.scope = self.scope
+        with self._transaction():
+            self._insert(fragment)
+        return fragment.id
+
+    def add_many(self, fragments: List[Fragment]) -> int:
+        """Add many fragments in one transaction. Returns the count."""
+        with self._transaction():
+            for fragment in fragments:
+                fragment.scope = self.scope
+                self._insert(fragment)
+        return len(fragments)
+
+    def get(self, fragment_id: str) -> Optional[Fragment]:
+        """Get a fragment by ID."""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {COLUMNS} FROM fragments WHERE id = ?", (fragment_id,)
+            ).fetchone()
+        return _row_to_fragment(row) if row else None
+
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Fragment]:
+        """Get several fragments by ID with one query; missing ones are left out."""
+        ids = list(set(fragment_ids))
+        rows = []
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows.extend(self.conn.execute(
+                    f"SELECT {COLUMNS} FROM fragments WHERE id IN ({placeholders})", chunk
+                ))
+        return {row[0]: _row_to_fragment(row) for row in rows}
+
+    def update(self, fragment: Fragment) -> bool:
+        """
+        Update an existing fragment.
+
+        Returns True if successful, False if fragment doesn't exist.
+        """
+        with self._transaction():
+            exists = self.conn.execute(
+                "SELECT 1 FROM fragments WHERE id = ?", (fragment.id,)
+            ).fetchone()
+            if not exists:
+                return False
+            self._insert(fragment)
+        return True
+
+    def delete(self, fragment_id: str) -> bool:
+        """
+        Delete a fragment.
+
+        Returns True if successful, False if fragment doesn't exist.
+        """
+        with self._transaction():
+            if not self._remove(fragment_id):
+                return False
+            self.conn.execute("DELETE FROM access_stats WHERE id = ?", (fragment_id,))
+        return True
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        tags: Optional[List[str]] = None
+    ) -> List[Tuple[Fragment, float]]:
+        """
+        Search for fragments matching the query, optionally only those
+        having any of `tags` (filtered in the FTS5 query).
+
+        Returns list of (fragment, score) tuples, sorted by score descending.
+        """
+        terms = sorted(set(TFIDFIndex.tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+
+        placeholders = ", ".join("?" * len(terms))
+
+        with self._lock:
+            meta = dict(self.conn.execute("SELECT key, value FROM store_meta"))
+            num_docs = meta.get("num_docs", 0)
+            if num_docs <= 0:
+                return []
+
+            doc_frequencies = dict(self.conn.execute(
+                f"SELECT term, df FROM term_stats WHERE term IN ({placeholders})", terms
+            ))
+            if not doc_frequencies:
+                return []
+
+            # Match on the rarest selective terms. When every query term is
+            # common, require all of them instead, then just the rarest one
+            by_rarity = sorted(doc_frequencies, key=doc_frequencies.get)
+            limit = num_docs * COMMON_TERM_RATIO
+            selective = [t for t in by_rarity[:MAX_MATCH_TERMS] if doc_frequencies[t] <= limit]
+            if selective:
+                matches = [" OR ".join(f'"{t}"' for t in selective)]
+            else:
+                matches = [" AND ".join(f'"{t}"' for t in by_rarity[:MAX_MATCH_TERMS])]
+                if len(by_rarity) > 1:
+                    matches.append(f'"{by_rarity[0]}"')
+
+            tag_filter = ""
+            if tags:
+                tag_filter = (
+                    "AND EXISTS (SELECT 1 FROM json_each(f.tags) AS tag "
+                    f"WHERE tag.value IN ({', '.join('?' * len(tags))})) "
+                )
+
+            # Tokens are [a-z0-9]+, so quoting them is enough to escape FTS5 syntax
+            rows: List[Tuple] = []
+            for match in matches:
+                rows = self.conn.execute(
+                    f"SELECT {', '.join('f.' + c.strip() for c in COLUMNS.split(','))}, f.length "
+                    "FROM fragments_fts JOIN fragments f ON f.rowid = fragments_fts.rowid "
+                    f"WHERE fragments_fts MATCH ? {tag_filter}ORDER BY bm25(fragments_fts) LIMIT ?",
+                    (match, *(tags or ()), max(top_k * CANDIDATE_FACTOR, MIN_CANDIDATES))
+                ).fetchall()
+                if rows:
+                    break
+
+        avg_length = meta.get("total_length", 0) / num_docs
+        idf = {term: bm25_idf(df, num_docs) for term, df in doc_frequencies.items()}
+        reference = sum(idf.values())
+        if reference <= 0:
+            return []
+
+        scored = []
+        for row in rows:
+            fragment = _row_to_fragment(row)
+            counts = _analyze(fragment)
+            score = sum(
+                weight * bm25_tf(counts[term], row[9], avg_length)
+                for term, weight in idf.items()
+                if counts.get(term)
+            )
+            if score > 0:
+                scored.append((fragment, score / reference))
+
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:top_k]
+
+    def find_similar(
+        self,
+        content: str,
+        threshold: float = 0.5,
+        tags: Optional[List[str]] = None
+    ) -> Optional[Fragment]:
+        """
+        Find a near-duplicate fragment (for deduplication).
+
+        Same Jaccard similarity as KnowledgeStore.find_similar(), checked on
+        the best FTS5 matches.
+        """
+        probe = Fragment(content=content, tags=tags)
+        terms = set(_analyze(probe))
+        best, best_similarity = None, threshold
+        for fragment, _ in self.search(" ".join(sorted(terms)), SIMILAR_CANDIDATES):
+            similarity = jaccard(terms, set(_analyze(fragment)))
+            if similarity >= best_similarity:
+                best, best_similarity = fragment, similarity
+        return best
+
+    def search_dense(self, query: str, top_k: int = 5) -> List[Tuple[Fragment, float]]:
+        """The hashed-embedding channel is only kept by the json backend."""
+        return []
+
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[Fragment, float]]]:
+        """Search for many queries; returns one result list per query."""
+        return [self.search(query, top_k) for query in queries]
+
+    def record_access(self, fragment_ids: List[str]) -> None:
+        """Count a retrieval of each fragment (one small transaction)."""
+        now = datetime.now().isoformat()
+        rows = [(fragment_id,) for fragment_id in fragment_ids]
+        with self._transaction():
+            self.conn.executemany("INSERT OR IGNORE INTO access_stats (id, count) VALUES (?, 0)", rows)
+            self.conn.executemany(
+                "UPDATE access_stats SET count = count + 1, last_accessed = ? WHERE id = ?",
+                [(now, fragment_id) for fragment_id in fragment_ids]
+            )
+
+    def access_stats(self, fragments: List[Fragment]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """
+        Get each fragment's (accessed_count, last_accessed).
+
+        Combines the values stored in the fragment with the access_stats table.
+        """
+        ids = [f.id for f in fragments]
+        recorded: Dict[str, Tuple[int, Optional[str]]] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                for fragment_id, count, last in self.conn.execute(
+                    f"SELECT id, count, last_accessed FROM access_stats WHERE id IN ({placeholders})", chunk
+                ):
+                    recorded[fragment_id] = (count, last)
+        return merge_access_stats(fragments, recorded)
+
+    def list_all(self) -> List[Fragment]:
+        """List all fragments in the store."""
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {COLUMNS} FROM fragments").fetchall()
+        return [_row_to_fragment(row) for row in rows]
+
+    def rebuild_index(self) -> int:
+        """
+        Rebuild the full-text index and term stats from the fragments table.
+
+        Returns the number of fragments indexed.
+        """
+        with self._transaction():
+            doc_frequencies: Counter = Counter()
+            total_length = 0
+            rows = self.conn.execute("SELECT id, content, tags FROM fragments").fetchall()
+            for fragment_id, content, tags in rows:
+                counts = _analyze(Fragment(content, json.loads(tags)))
+                length = sum(counts.values())
+                doc_frequencies.update(counts.keys())
+                total_length += length
+                self.conn.execute("UPDATE fragments SET length = ? WHERE id = ?", (length, fragment_id))
+
+            self.conn.execute("INSERT INTO fragments_fts (fragments_fts) VALUES ('rebuild')")
+            self.conn.execute("DELETE FROM term_stats")
+            self.conn.executemany("INSERT INTO term_stats (term, df) VALUES (?, ?)", doc_frequencies.items())
+            self.conn.execute("UPDATE store_meta SET value = ? WHERE key = 'num_docs'", (len(rows),))
+            self.conn.execute("UPDATE store_meta SET value = ? WHERE key = 'total_length'", (total_length,))
+            return len(rows)
+
+    def sync(self) -> Dict[str, int]:
+        """Fragments only live in the database, whose triggers keep the index current."""
+        with self._lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM fragments").fetchone()[0]
+        return {"added": 0, "changed": 0, "removed": 0, "unchanged": count}
+
+    def compact(self) -> None:
+        """Merge FTS5 index segments and reclaim free pages."""
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT INTO fragments_fts (fragments_fts) VALUES ('optimize')")
+            self.conn.execute("VACUUM")
+
+    def clear(self) -> None:
+        """Delete every fragment."""
+        with self._transaction():
+            self.conn.execute("DELETE FROM fragments")
+            self.conn.execute("DELETE FROM term_stats")
+            self.conn.execute("DELETE FROM access_stats")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the store (from the trigger-maintained counters)."""
+        with self._lock:
+            meta = dict(self.conn.execute("SELECT key, value FROM store_meta"))
+            tag_counts = dict(self.conn.execute("SELECT tag, count FROM tag_counts"))
+            by_source = self.conn.execute("SELECT source, scope, count FROM source_counts").fetchall()
+
+        source_counts: Counter = Counter()
+        scope_counts: Counter = Counter()
+        for source, scope, count in by_source:
+            source_counts[source] += count
+            scope_counts[scope] += count
+        return {
+            "scope": self.scope,
+            "total_fragments": meta["num_docs"],
+            "total_terms": meta["num_terms"],
+            "tag_counts": tag_counts,
+            "source_counts": dict(source_counts),
+            "scope_counts": dict(scope_counts),
+            "total_accesses": meta["accessed"]
+        }
@@ -12,14 +12,51 @@ memory system. It supports dual-store (shared + personal) with merge logic.
 Zero external dependencies - uses only Python standard library.
 """
 
+import contextlib
 import json
 import math
-import re
+import os
+import time
+import tempfile
+import threading
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .access_stats import AccessStats, merge_access_stats
+from .binary_index import MappedIndex, dump_binary_index
+from .fragment_storage import STORAGE_FILES, create_storage, file_lock, write_json_atomic
+from .knowledge_matrix import HAS_NUMPY, CSRMatrix
+from .knowledge_scoring import SCORER_BM25, SCORER_TFIDF, SCORERS, BM25Scorer, CollectionStats
+from .minhash import LSHIndex, dump_lsh_index, jaccard
+from .vector_index import VectorIndex, dump_vector_index, embed
+from .positions import (
+    PROXIMITY_CANDIDATES, PositionIndex, decode_record, dump_position_index, encode_record,
+    phrase_match, proximity_boost, quoted_phrases,
+)
+from .tag_index import TagIndex, count_facets, dump_tag_index, facets_of, read_header
+from .tokenizer import DEFAULT_ANALYZER, Analyzer
+
+# Fold index.journal into the index file once it grows past this size
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# Parsed fragments kept per store (LRU), keyed by id and storage version
+FRAGMENT_CACHE_SIZE = 512
+
+# Format of sync.manifest (see KnowledgeStore.sync())
+MANIFEST_VERSION = 1
+
+# Parallel rebuild_index(): fragments per worker task, and the store size
+# below which starting worker processes costs more than it saves
+REBUILD_CHUNK_SIZE = 1000
+PARALLEL_REBUILD_MIN = 4000
+
+# rebuild_index() progress callback: (fragments done, total, elapsed seconds)
+RebuildProgress = Callable[[int, int, float], None]
 
 
 def get_toolkit_root() -> Path:
@@ -49,11 +86,72 @@ def get_personal_knowledge_dir() -> Path:
     return d
 
 
+# Store backends
+BACKEND_JSON = "json"
+BACKEND_SQLITE = "sqlite"
+BACKENDS = (BACKEND_JSON, BACKEND_SQLITE)
+
+# On-disk index formats for the json backend
+INDEX_FORMAT_JSON = "json"
+INDEX_FORMAT_BINARY = "binary"
+INDEX_FORMATS = (INDEX_FORMAT_JSON, INDEX_FORMAT_BINARY)
+INDEX_FILES = {INDEX_FORMAT_JSON: "index.json", INDEX_FORMAT_BINARY: "index.bin"}
+
+STORE_CONFIG_DEFAULTS: Dict[str, Any] = {
+    # "json" (TF-IDF index + fragment files) or "sqlite" (FTS5 + BM25)
+    "backend": BACKEND_JSON,
+    # Fragment layout for the json backend: "files" or "packed"
+    "storage": STORAGE_FILES,
+    # Ranking for the json backend: "tfidf" or "bm25" (MaxScore top-k)
+    "scorer": SCORER_TFIDF,
+    # Index file for the json backend: "json" (index.json) or "binary"
+    # (index.bin, memory-mapped and decoded per term)
+    "index_format": INDEX_FORMAT_JSON,
+    # Tokenizer stages for the json backend (see tokenizer.py); changing
+    # either requires rebuild_index()
+    "stemming": False,
+    "ngrams": False,
+    # Keep term positions for quoted phrases and the proximity boost (json
+    # backend, see positions.py); saved as positions.bin at compaction
+    "positions": False,
+    # Index shards for the json backend (see knowledge_shards.py); change
+    # with `knowledge_admin rebalance`
+    "shards": 1,
+    # Shard assignment: "id" (hash of the fragment id) or "tag" (hash of
+    # the first tag's family, e.g. "react" for "react-forms")
+    "shard_by": "id",
+    # Shard search fan-out: "thread" or "process" (a process pool, best with
+    # the binary index format, whose mapped pages the workers share)
+    "shard_executor": "thread",
+}
+
+
+def load_store_config(base_dir: Path) -> Dict[str, Any]:
+    """Load a store's config.json merged over the defaults."""
+    config = dict(STORE_CONFIG_DEFAULTS)
+    try:
+        with open(base_dir / "config.json", 'r') as f:
+            config.update(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        pass
+    return config
+
+
+def save_store_config(base_dir: Path, config: Dict[str, Any]) -> None:
+    """Write a store's config.json."""
+    write_json_atomic(base_dir / "config.json", config)
+
+
 # Fragment scope types
 SCOPE_SHARED = "shared"
 SCOPE_PERSONAL = "personal"
 
 
+def get_store_dir(scope: str) -> Path:
+    """Get the directory of the store for a scope."""
+    return get_shared_knowledge_dir() if scope == SCOPE_SHARED else get_personal_knowledge_dir()
+
+
 class Fragment:
     """
     A knowledge fragment - the atomic unit of semantic memory.
@@ -135,7 +233,9 @@ class TFIDFIndex:
     relevant fragments based on query text.
     """
 
-    def __init__(self):
+    def __init__(self, analyzer: Optional[Analyzer] = None):
+        # Tokenization settings for documents and queries
+        self.analyzer = analyzer or DEFAULT_ANALYZER
         # term -> {fragment_id -> term_frequency}
         self.term_frequencies: Dict[str, Dict[str, float]] = defaultdict(dict)
         # fragment_id -> total terms
@@ -144,149 +244,450 @@ class TFIDFIndex:
         self.num_docs: int = 0
         # term -> number of documents containing term
         self.doc_frequencies: Dict[str, int] = defaultdict(int)
+        # fragment_id -> terms in that document (forward index)
+        self.doc_terms: Dict[str, List[str]] = {}
+        # fragment_id -> Analyzer.content_hash() of the indexed text
+        self.doc_hashes: Dict[str, str] = {}
+        # Near-duplicate candidates (MinHash LSH over each document's terms)
+        self.lsh = LSHIndex()
+        # Hashed embeddings for dense search (used when NumPy is available)
+        self.vectors = VectorIndex()
+        # Tags, source, scope and access count per fragment; None until
+        # loaded (see KnowledgeStore._facets())
+        self.facets: Optional[TagIndex] = TagIndex()
+        # Sum of doc_lengths, for BM25 length normalization
+        self.total_length: int = 0
+        # Bumped on every change so scorers can cache term statistics
+        self.version: int = 0
+        self._bm25: Optional[BM25Scorer] = None
+        self._matrices: Dict[str, CSRMatrix] = {}
+        # Loaded from index.bin: terms not yet touched are still only on disk
+        self._mapped: Optional[MappedIndex] = None
+        # Terms removed since loading, so they are not read back from disk
+        self._dropped: Set[str] = set()
 
     @staticmethod
     def tokenize(text: str) -> List[str]:
         """
-        Tokenize text into terms for indexing.
-
-        Simple tokenization: lowercase, split on non-alphanumeric,
-        filter short tokens and stopwords.
-        """
-        # Lowercase and split on non-alphanumeric
-        tokens = re.findall(r'[a-z0-9]+', text.lower())
-
-        # Simple stopwords list
-        stopwords = {
-            'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been',
-            'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
-            'would', 'could', 'should', 'may', 'might', 'must', 'shall',
-            'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in',
-            'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into',
-            'through', 'during', 'before', 'after', 'above', 'below',
-            'between', 'under', 'again', 'further', 'then', 'once',
-            'here', 'there', 'when', 'where', 'why', 'how', 'all',
-            'each', 'few', 'more', 'most', 'other', 'some', 'such',
-            'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than',
-            'too', 'very', 'just', 'and', 'but', 'if', 'or', 'because',
-            'until', 'while', 'this', 'that', 'these', 'those', 'it'
-        }
+        Tokenize text into terms with the default analyzer.
 
-        # Filter: min length 2, not stopword
-        return [t for t in tokens if len(t) >= 2 and t not in stopwords]
+        Lowercase, split on non-alphanumeric, filter short tokens and
+        stopwords (see tokenizer.py).
+        """
+        return DEFAULT_ANALYZER.tokenize(text)
 
-    def add_document(self, doc_id: str, text: str, tags: Optional[List[str]] = None) -> None:
-        """Add a document to the index."""
+    def analyze(self, text: str, tags: Optional[List[str]] = None) -> Tuple[Dict[str, int], int]:
+        """
+        Tokenize a document for indexing.
+
+        Returns (term -> count, total terms).
+        """
         # Combine content with tags for indexing
         full_text = text
         if tags:
             full_text += " " + " ".join(tags)
 
-        tokens = self.tokenize(full_text)
-        if not tokens:
-            return
+        tokens = self.analyzer.tokenize(full_text)
 
         # Count term frequencies
         term_counts: Dict[str, int] = defaultdict(int)
         for token in tokens:
             term_counts[token] += 1
 
+        return dict(term_counts), len(tokens)
+
+    def postings(self, term: str) -> Optional[Dict[str, float]]:
+        """
+        Get a term's postings ({doc_id: tf}), or None if the term is not indexed.
+
+        For an index loaded from index.bin, the postings are decoded from
+        the mapped file the first time the term is used.
+        """
+        docs = self.term_frequencies.get(term)
+        if docs is None and self._mapped is not None and term not in self._dropped:
+            ordinal = self._mapped.find_term(term)
+            if ordinal is not None:
+                docs = self.term_frequencies[term] = self._mapped.postings(ordinal)
+                self.doc_frequencies[term] = len(docs)
+        return docs
+
+    def materialize(self) -> None:
+        """Decode everything still only in the mapped file (for full scans)."""
+        mapped = self._mapped
+        if mapped is None:
+            return
+        for term, ordinal in mapped.iter_terms():
+            if term not in self.term_frequencies and term not in self._dropped:
+                docs = self.term_frequencies[term] = mapped.postings(ordinal)
+                self.doc_frequencies[term] = len(docs)
+        for doc_id in self.doc_lengths:
+            if doc_id not in self.doc_terms:
+                self.doc_terms[doc_id] = mapped.doc_terms(doc_id)
+        self._mapped = None
+        self._dropped = set()
+
+    @property
+    def num_terms(self) -> int:
+        """Number of distinct terms, without decoding a mapped index."""
+        mapped = self._mapped
+        if mapped is None:
+            return len(self.term_frequencies)
+        # Terms decoded from the file stay counted by the file; only count
+        # new ones (or ones removed and added again)
+        added = sum(
+            1 for term in self.term_frequencies if term in self._dropped or mapped.find_term(term) is None
+        )
+        return mapped.num_terms - len(self._dropped) + added
+
+    def iter_terms(self) -> Iterator[str]:
+        """Yield every distinct term, without decoding postings."""
+        yield from self.term_frequencies
+        if self._mapped is not None:
+            for term, _ in self._mapped.iter_terms():
+                if term not in self.term_frequencies and term not in self._dropped:
+                    yield term
+
+    def add_document(self, doc_id: str, text: str, tags: Optional[List[str]] = None) -> None:
+        """Add a document to the index."""
+        term_counts, doc_length = self.analyze(text, tags)
+        self.add_terms(doc_id, term_counts, doc_length)
+
+    def add_terms(
+        self,
+        doc_id: str,
+        term_counts: Dict[str, int],
+        doc_length: int,
+        content_hash: Optional[str] = None
+    ) -> int:
+        """
+        Add an already analyzed document, replacing any previous version.
+
+        Returns the change in the number of distinct terms.
+        """
+        if not term_counts or doc_length <= 0:
+            return 0
+
+        added = 0
+        if doc_id in self.doc_lengths:
+            added = self.remove_document(doc_id)
+
         # Store normalized term frequencies
-        doc_length = len(tokens)
         self.doc_lengths[doc_id] = doc_length
-
-        # Track which terms we've seen in this doc (for doc frequency)
-        seen_terms: set = set()
+        self.doc_terms[doc_id] = list(term_counts)
+        if content_hash:
+            self.doc_hashes[doc_id] = content_hash
+        self.lsh.add(doc_id)
+        self.vectors.add(doc_id)
 
         for term, count in term_counts.items():
+            docs = self.postings(term)
+            if docs is None:
+                docs = self.term_frequencies[term]
+                added += 1
             # TF = count / doc_length (normalized)
-            self.term_frequencies[term][doc_id] = count / doc_length
-
-            if term not in seen_terms:
-                self.doc_frequencies[term] += 1
-                seen_terms.add(term)
+            docs[doc_id] = count / doc_length
+            self.doc_frequencies[term] += 1
 
         self.num_docs += 1
-
-    def remove_document(self, doc_id: str) -> None:
-        """Remove a document from the index."""
+        self.total_length += doc_length
+        self.version += 1
+        return added
+
+    def terms(self, doc_id: str) -> List[str]:
+        """Get the distinct terms of a document (forward index)."""
+        terms = self.doc_terms.get(doc_id)
+        if terms is None and self._mapped is not None and doc_id in self.doc_lengths:
+            terms = self._mapped.doc_terms(doc_id)
+        return terms or []
+
+    def term_counts(self, doc_id: str) -> Tuple[Dict[str, int], int]:
+        """Recover a document's (term -> count, total terms) from the index."""
+        length = self.doc_lengths.get(doc_id)
+        if length is None:
+            return {}, 0
+        counts = {}
+        for term in self.terms(doc_id):
+            tf = (self.postings(term) or {}).get(doc_id)
+            if tf is not None:
+                counts[term] = round(tf * length)
+        return counts, length
+
+    def remove_document(self, doc_id: str) -> int:
+        """Remove a document from the index; returns the change in the number of distinct terms."""
         if doc_id not in self.doc_lengths:
-            return
+            return 0
 
-        # Find all terms containing this doc
-        terms_to_clean = []
-        for term, docs in self.term_frequencies.items():
-            if doc_id in docs:
-                del docs[doc_id]
-                self.doc_frequencies[term] -= 1
-                if self.doc_frequencies[term] <= 0:
-                    terms_to_clean.append(term)
-
-        # Clean up empty terms
-        for term in terms_to_clean:
-            del self.term_frequencies[term]
-            del self.doc_frequencies[term]
-
-        del self.doc_lengths[doc_id]
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None and self._mapped is not None:
+            terms = self._mapped.doc_terms(doc_id)
+
+        # Only visit this document's own terms
+        dropped = 0
+        for term in terms or ():
+            docs = self.postings(term)
+            if docs is None or doc_id not in docs:
+                continue
+            del docs[doc_id]
+            self.doc_frequencies[term] -= 1
+            if self.doc_frequencies[term] <= 0:
+                del self.term_frequencies[term]
+                del self.doc_frequencies[term]
+                dropped += 1
+                if self._mapped is not None:
+                    self._dropped.add(term)
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.doc_hashes.pop(doc_id, None)
+        self.lsh.remove(doc_id)
+        self.vectors.remove(doc_id)
         self.num_docs -= 1
+        self.version += 1
+        return -dropped
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """
+        Add every document of a partial index (to_dict() output), e.g. one
+        built by a rebuild worker. Postings are merged per term rather than
+        per document; documents already indexed are replaced. Optional
+        "lsh" and "vectors" entries (LSHIndex.entries() and
+        VectorIndex.snapshot() output) spare hashing and embedding here;
+        "facets" maps fragment ids to their TagIndex facets.
+        """
+        doc_lengths: Dict[str, int] = data.get("doc_lengths", {})
+        for doc_id in doc_lengths:
+            if doc_id in self.doc_lengths:
+                self.remove_document(doc_id)
+
+        for term, docs in data.get("term_frequencies", {}).items():
+            existing = self.postings(term)
+            if existing is None:
+                self.term_frequencies[term] = docs
+            else:
+                existing.update(docs)
+            self.doc_frequencies[term] += len(docs)
+
+        self.doc_lengths.update(doc_lengths)
+        self.doc_terms.update(data.get("doc_terms", {}))
+        self.doc_hashes.update(data.get("doc_hashes", {}))
+        if "lsh" in data:
+            self.lsh.add_hashed(data["lsh"])
+        else:
+            for doc_id in doc_lengths:
+                self.lsh.add(doc_id)
+        if "vectors" in data:
+            self.vectors.add_embedded(*data["vectors"])
+        else:
+            for doc_id in doc_lengths:
+                self.vectors.add(doc_id)
+        if self.facets is not None:
+            for doc_id, facets in data.get("facets", {}).items():
+                self.facets.set(doc_id, facets)
+        self.num_docs += len(doc_lengths)
+        self.total_length += sum(doc_lengths.values())
+        self.version += 1
+
+    def collection_stats(self, terms: Iterable[str]) -> CollectionStats:
+        """(num_docs, total_length, {term: doc frequency}) of the given terms that occur."""
+        doc_frequencies = {}
+        for term in set(terms):
+            docs = self.postings(term)
+            if docs:
+                doc_frequencies[term] = len(docs)
+        return self.num_docs, self.total_length, doc_frequencies
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        scorer: str = SCORER_TFIDF,
+        collection: Optional[CollectionStats] = None,
+        allowed: Optional[Set[str]] = None
+    ) -> List[Tuple[str, float]]:
         """
         Search for documents matching the query.
 
+        Args:
+            query: Query text
+            top_k: Number of results
+            scorer: "tfidf" (score every matching document) or "bm25"
+                (BM25 with MaxScore pruning, see knowledge_scoring)
+            collection: Statistics of the whole collection when this index
+                is one shard of it (see merge_collection_stats), so scores
+                of different shards are comparable
+            allowed: If given, only these documents are scored (e.g. the
+                fragments with a tag, see TagIndex.matching())
+
         Returns list of (doc_id, score) tuples, sorted by score descending.
         """
         if self.num_docs == 0:
             return []
 
-        query_tokens = self.tokenize(query)
+        query_tokens = self.analyzer.tokenize(query)
         if not query_tokens:
             return []
 
+        if scorer == SCORER_BM25:
+            if self._bm25 is None:
+                self._bm25 = BM25Scorer(self)
+            return self._bm25.search(query_tokens, top_k, collection, allowed)
+        if scorer != SCORER_TFIDF:
+            raise ValueError(f"Unknown scorer: {scorer} (expected one of {', '.join(SCORERS)})")
+
+        if collection is None:
+            num_docs, doc_frequencies = self.num_docs, self.doc_frequencies
+        else:
+            num_docs, _, doc_frequencies = collection
+
         # Calculate TF-IDF scores for each document
         scores: Dict[str, float] = defaultdict(float)
 
         for token in query_tokens:
-            if token not in self.term_frequencies:
+            postings = self.postings(token)
+            if not postings:
                 continue
 
             # Smoothed IDF = log((N + 1) / (df + 1)) + 1
             # This ensures positive scores even with few documents
-            df = self.doc_frequencies[token]
-            idf = math.log((self.num_docs + 1) / (df + 1)) + 1
-
-            for doc_id, tf in self.term_frequencies[token].items():
-                # TF-IDF score
-                scores[doc_id] += tf * idf
+            df = doc_frequencies.get(token) or len(postings)
+            idf = math.log((num_docs + 1) / (df + 1)) + 1
+
+            if allowed is None:
+                for doc_id, tf in postings.items():
+                    # TF-IDF score
+                    scores[doc_id] += tf * idf
+            else:
+                # Walk the smaller side
+                if len(allowed) < len(postings):
+                    matches = ((doc_id, postings.get(doc_id)) for doc_id in allowed)
+                else:
+                    matches = ((doc_id, tf) for doc_id, tf in postings.items() if doc_id in allowed)
+                for doc_id, tf in matches:
+                    if tf is not None:
+                        scores[doc_id] += tf * idf
 
         # Sort by score descending
         sorted_results = sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
         return sorted_results[:top_k]
 
+    def find_similar(
+        self,
+        text: str,
+        tags: Optional[List[str]] = None,
+        threshold: float = 0.5
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Find the document whose term set is most similar to the text's.
+
+        Only the LSH candidates are compared, so the cost does not grow with
+        the number of documents. Returns (doc_id, Jaccard similarity) of the
+        best match at or above threshold, or None.
+        """
+        terms = set(self.analyze(text, tags)[0])
+        best: Optional[Tuple[str, float]] = None
+        for doc_id in self.lsh.candidates(terms, self.terms):
+            similarity = jaccard(terms, set(self.terms(doc_id)))
+            if similarity >= threshold and (best is None or (similarity, doc_id) > (best[1], best[0])):
+                best = (doc_id, similarity)
+        return best
+
+    def search_dense(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Find the documents whose hashed embeddings are closest to the query's.
+
+        Returns (doc_id, cosine similarity) pairs, best first; empty without
+        NumPy (see vector_index).
+        """
+        if not HAS_NUMPY or self.num_docs == 0:
+            return []
+        query_vector = embed(self.analyze(query)[0])
+        if query_vector is None:
+            return []
+        return self.vectors.search(query_vector, top_k, lambda doc_id: self.term_counts(doc_id)[0])
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        scorer: str = SCORER_TFIDF
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Search for many queries at once (bulk evaluation, dedup sweeps).
+
+        With NumPy, the index is compiled once into a CSR matrix (until it
+        changes) and all queries are scored with one sparse product;
+        otherwise search() runs per query. Returns one result list per query.
+        """
+        if scorer not in SCORERS:
+            raise ValueError(f"Unknown scorer: {scorer} (expected one of {', '.join(SCORERS)})")
+        if not HAS_NUMPY:
+            return [self.search(query, top_k, scorer) for query in queries]
+
+        matrix = self._matrices.get(scorer)
+        if matrix is None or matrix.version != self.version:
+            matrix = self._matrices[scorer] = CSRMatrix(self, scorer)
+        return matrix.search_many([self.analyzer.tokenize(query) for query in queries], top_k)
+
     def to_dict(self) -> Dict[str, Any]:
         """Serialize index to dictionary."""
+        self.materialize()
         return {
             "term_frequencies": {
                 term: dict(docs) for term, docs in self.term_frequencies.items()
             },
-            "doc_lengths": self.doc_lengths,
+            "doc_lengths": dict(self.doc_lengths),
             "num_docs": self.num_docs,
-            "doc_frequencies": dict(self.doc_frequencies)
+            "doc_frequencies": dict(self.doc_frequencies),
+            "doc_terms": dict(self.doc_terms),
+            "doc_hashes": dict(self.doc_hashes)
         }
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "TFIDFIndex":
+    def from_dict(cls, data: Dict[str, Any], analyzer: Optional[Analyzer] = None) -> "TFIDFIndex":
         """Deserialize index from dictionary."""
-        index = cls()
+        index = cls(analyzer)
         index.term_frequencies = defaultdict(dict)
         for term, docs in data.get("term_frequencies", {}).items():
             index.term_frequencies[term] = docs
         index.doc_lengths = data.get("doc_lengths", {})
         index.num_docs = data.get("num_docs", 0)
+        index.total_length = sum(index.doc_lengths.values())
+        index.doc_hashes = data.get("doc_hashes", {})
         index.doc_frequencies = defaultdict(int)
         for term, count in data.get("doc_frequencies", {}).items():
             index.doc_frequencies[term] = count
+
+        if "doc_terms" in data:
+            index.doc_terms = data["doc_terms"]
+        else:
+            # Older index.json without a forward index: derive it once
+            doc_terms: Dict[str, List[str]] = defaultdict(list)
+            for term, docs in index.term_frequencies.items():
+                for doc_id in docs:
+                    doc_terms[doc_id].append(term)
+            index.doc_terms = dict(doc_terms)
+        return index
+
+    def to_binary(self, path: Path) -> None:
+        """Write the index to a binary index file (see binary_index)."""
+        with open(path, 'wb') as f:
+            dump_binary_index(self.to_dict(), f)
+
+    @classmethod
+    def from_binary(cls, path: Path, analyzer: Optional[Analyzer] = None) -> "TFIDFIndex":
+        """
+        Open a binary index file.
+
+        Only the doc table is read up front; term postings stay in the
+        mapped file until a query or an index change needs them.
+        """
+        mapped = MappedIndex(path)
+        index = cls(analyzer)
+        index._mapped = mapped
+        index.doc_lengths = dict(zip(mapped.doc_ids, mapped.doc_lengths))
+        index.doc_hashes = {d: h for d, h in zip(mapped.doc_ids, mapped.doc_hashes) if h}
+        index.num_docs = mapped.num_docs
+        index.total_length = mapped.total_length
         return index
 
 
@@ -294,49 +695,568 @@ class KnowledgeStore:
     """
     Knowledge store with TF-IDF indexing.
 
-    Manages fragments with automatic index maintenance.
+    Manages fragments with automatic index maintenance. Index changes are
+    appended to index.journal (one JSON line per add/remove) and replayed on
+    load; the journal is folded into the index file in the background once it
+    passes JOURNAL_COMPACT_BYTES, so a write costs O(fragment), not O(corpus).
+    Writes grouped with batch() share one journal write.
     """
 
-    def __init__(self, scope: str = SCOPE_SHARED):
+    def __init__(
+        self,
+        scope: str = SCOPE_SHARED,
+        storage: Optional[str] = None,
+        base_dir: Optional[Path] = None,
+        config: Optional[Dict[str, Any]] = None
+    ):
         """
         Initialize knowledge store for a specific scope.
 
         Args:
             scope: 'shared' or 'personal'
+            storage: Fragment layout ('files' or 'packed'); defaults to the
+                store's config.json
+            base_dir: Store directory; defaults to the scope's (a shard of
+                a ShardedKnowledgeStore lives in a subdirectory)
+            config: Settings to use instead of base_dir/config.json; the
+                caller then owns config.json and this store never writes it
         """
         self.scope = scope
-        self.base_dir = (
-            get_shared_knowledge_dir() if scope == SCOPE_SHARED
-            else get_personal_knowledge_dir()
-        )
+        self.base_dir = base_dir or get_store_dir(scope)
+        self._owns_config = config is None
+        self.config = load_store_config(self.base_dir) if config is None else dict(config)
+        self.storage = create_storage(storage or self.config["storage"], self.base_dir)
         self.fragments_dir = self.base_dir / "fragments"
-        self.index_path = self.base_dir / "index.json"
+        self.index_format = self.config["index_format"]
+        if self.index_format not in INDEX_FORMATS:
+            raise ValueError(f"Unknown index format: {self.index_format} (expected one of {', '.join(INDEX_FORMATS)})")
+        self.index_path = self.base_dir / INDEX_FILES[self.index_format]
+        self.analyzer = Analyzer.from_config(self.config)
+        self.journal_path = self.base_dir / "index.journal"
+        self.lsh_path = self.base_dir / "lsh.bin"
+        self.vectors_path = self.base_dir / "vectors.npy"
+        self.vector_ids_path = self.base_dir / "vectors.ids"
+        self.facets_path = self.base_dir / "facets.json"
+        self.positions_path = self.base_dir / "positions.bin"
+        self.lock_path = self.base_dir / ".index.lock"
+        self.manifest_path = self.base_dir / "sync.manifest"
+
+        # (mtime_ns, size) of the index file when last loaded or saved
+        self._index_signature: Optional[Tuple[int, int]] = None
+        # Bytes of index.journal already applied to self.index
+        self._journal_offset = 0
+        # lsh.bin, vectors.npy or facets.json did not match the index file
+        # and was rebuilt in memory
+        self._sidecars_stale = False
+
+        # Guards self.index against the background compaction thread
+        self._lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+
+        # fragment_id -> (storage version, Fragment), least recently used first
+        self._fragment_cache: "OrderedDict[str, Tuple[Any, Fragment]]" = OrderedDict()
+
+        # Nesting depth of batch(), and the writes it holds back: fragment
+        # records by id (None = deleted) and encoded journal entries
+        self._batch_depth = 0
+        self._batch_records: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._batch_journal: List[bytes] = []
+
+        # Term positions (positions.bin), opened on first use
+        self._position_index: Optional[PositionIndex] = None
+
+        # Retrieval counters, kept out of the fragment files
+        self.access = AccessStats(self.base_dir)
+
+        # Loaded on first use (see the index property); get_stats() and
+        # generation() never need it
+        self._index: Optional[TFIDFIndex] = None
+
+    @property
+    def index(self) -> TFIDFIndex:
+        """The index, loaded from disk (and the journal replayed) on first use."""
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load_index()
+                index = self._index
+        return index
+
+    @index.setter
+    def index(self, index: TFIDFIndex) -> None:
+        self._index = index
+
+    def _index_file_signature(self) -> Optional[Tuple[int, int]]:
+        """Get (mtime_ns, size) of the index file, or None if missing."""
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _journal_size(self) -> int:
+        """Get the size of index.journal in bytes (0 if missing)."""
+        try:
+            return os.stat(self.journal_path).st_size
+        except OSError:
+            return 0
+
+    def generation(self) -> Tuple[Any, ...]:
+        """
+        Identify the on-disk state of the index, for caching query results.
+
+        Every index write appends to index.journal or replaces the index
+        file, so (index file signature, journal size) changes with each one;
+        it costs two stat calls. Access counts are not part of it.
+        """
+        signature = self._index_file_signature()
+        return (self.index_format,) + (signature or (0, 0)) + (self._journal_size(),)
+
+    def _read_index_file(self) -> TFIDFIndex:
+        """Read the index file in the store's format (empty index if missing or unreadable)."""
+        try:
+            if self.index_format == INDEX_FORMAT_BINARY:
+                index = TFIDFIndex.from_binary(self.index_path, self.analyzer)
+            else:
+                with open(self.index_path, 'r') as f:
+                    index = TFIDFIndex.from_dict(json.load(f), self.analyzer)
+        except (OSError, ValueError, KeyError):
+            # JSONDecodeError is a ValueError, as are bad binary headers
+            index = TFIDFIndex(self.analyzer)
+            # Fragments may exist without an index file; see _facets()
+            index.facets = None
+            return index
+        # Loaded on first use; most processes never need it
+        index.facets = None
+
+        # The LSH table and embeddings saved with this index file, or every
+        # document queued for rehashing
+        lsh = LSHIndex.load(self.lsh_path, self._index_signature)
+        vectors = VectorIndex.load(self.vectors_path, self.vector_ids_path, self._index_signature)
+        self._sidecars_stale = index.num_docs > 0 and (lsh is None or (HAS_NUMPY and vectors is None))
+        if lsh is None:
+            lsh = LSHIndex()
+            for doc_id in index.doc_lengths:
+                lsh.add(doc_id)
+        if vectors is None:
+            vectors = VectorIndex()
+            for doc_id in index.doc_lengths:
+                vectors.add(doc_id)
+        index.lsh = lsh
+        index.vectors = vectors
+        return index
+
+    def _facets(self) -> TagIndex:
+        """
+        The index's TagIndex (caller holds self._lock).
+
+        Loaded on first use from facets.json plus the journal entries the
+        index has replayed since, or rebuilt from the fragment records if
+        facets.json is missing or stale. Later entries are applied by
+        _replay_journal(), like the index's own.
+        """
+        facets = self.index.facets
+        if facets is not None:
+            return facets
+        loaded = TagIndex.load(self.facets_path, self._index_signature)
+        if loaded is not None:
+            facets, offset = loaded
+            data = b""
+            if offset < self._journal_offset:
+                try:
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(offset)
+                        data = f.read(self._journal_offset - offset)
+                except OSError:
+                    pass
+            # Entries of an open batch() are not journaled yet
+            for line in data.splitlines() + self._batch_journal:
+                with contextlib.suppress(json.JSONDecodeError, KeyError, TypeError):
+                    _apply_facets_entry(facets, json.loads(line))
+        else:
+            facets = TagIndex.from_records(self.storage.iter_all())
+            # Writes of an open batch() are not stored yet
+            for fragment_id, data in self._batch_records.items():
+                if data is None:
+                    facets.remove(fragment_id)
+                else:
+                    facets.set(fragment_id, facets_of(data))
+            self._sidecars_stale = True
+        self.index.facets = facets
+        return facets
+
+    def _load_positions(self) -> PositionIndex:
+        """The position index, opening positions.bin on first use."""
+        if self._position_index is None:
+            self._position_index = PositionIndex.load(self.positions_path)
+        return self._position_index
+
+    def _positions(self, fragment_ids: List[str], terms: Set[str]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Positions of `terms` in each fragment (missing fragments are left out).
+
+        Records not in positions.bin, or written for other content, are
+        computed from the fragments and kept for the next call.
+        """
+        with self._lock:
+            hashes = {fragment_id: self.index.doc_hashes.get(fragment_id) for fragment_id in fragment_ids}
+            index = self._load_positions()
+            records = {fragment_id: index.record(fragment_id, hashes[fragment_id]) for fragment_id in fragment_ids}
+        missing = [fragment_id for fragment_id, record in records.items() if record is None]
+        if missing:
+            for fragment_id, fragment in self.get_many(missing).items():
+                content_hash = hashes[fragment_id] or self.analyzer.content_hash(fragment.content, fragment.tags)
+                records[fragment_id] = _encode_positions(self.analyzer, fragment, content_hash)
+                with self._lock:
+                    index.put(fragment_id, records[fragment_id])
+        return {
+            fragment_id: decode_record(record, terms) for fragment_id, record in records.items() if record is not None
+        }
+
+    def _position_records(self) -> List[Tuple[str, bytes]]:
+        """
+        Position record of every indexed fragment, computing the missing
+        ones from storage (caller holds self._lock).
+        """
+        index = self._load_positions()
+        records: List[Tuple[str, bytes]] = []
+        missing: List[str] = []
+        for fragment_id, content_hash in self.index.doc_hashes.items():
+            record = index.record(fragment_id, content_hash)
+            if record is None:
+                missing.append(fragment_id)
+            else:
+                records.append((fragment_id, bytes(record)))
+        for fragment_id, data in self.storage.get_many(missing).items():
+            try:
+                fragment = Fragment.from_dict(data)
+            except KeyError:
+                continue
+            record = _encode_positions(self.analyzer, fragment, self.index.doc_hashes[fragment_id])
+            index.put(fragment_id, record)
+            records.append((fragment_id, record))
+        return records
+
+    def _sidecar_snapshot(self, journal_offset: int = 0) -> Dict[str, Any]:
+        """
+        Capture the LSH table, embeddings and facets (caller holds self._lock),
+        as of `journal_offset` bytes of the journal the index file is saved with.
+        """
+        index = self.index
+        snapshot: Dict[str, Any] = {"lsh": index.lsh.entries(index.terms)}
+        if HAS_NUMPY:
+            snapshot["vectors"] = index.vectors.snapshot(lambda doc_id: index.term_counts(doc_id)[0])
+        facets = self._facets()
+        snapshot["facets"] = dict(facets.facets)
+        snapshot["stats"] = dict(facets.stats(), num_terms=index.num_terms)
+        snapshot["journal"] = journal_offset
+        if self.config.get("positions"):
+            snapshot["positions"] = self._position_records()
+        return snapshot
+
+    def _dump_sidecars(self, snapshot: Dict[str, Any], index_file: Path) -> List[Tuple[Path, Path]]:
+        """
+        Write lsh.bin, facets.json (and vectors.npy/vectors.ids,
+        positions.bin) for a just-written index file to temp files.
 
-        # Ensure directories exist
-        self.fragments_dir.mkdir(parents=True, exist_ok=True)
+        Returns (temp path, final path) pairs in the order to replace them.
+        """
+        st = os.stat(index_file)
+        stamp = (st.st_mtime_ns, st.st_size)
+        written: List[Tuple[Path, Path]] = []
 
-        # Load or create index
-        self.index = self._load_index()
+        def temp_file(target: Path):
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.base_dir), prefix=f".{target.name}.", suffix=".tmp")
+            written.append((Path(tmp_path), target))
+            return os.fdopen(fd, 'wb')
+
+        try:
+            with temp_file(self.lsh_path) as f:
+                dump_lsh_index(snapshot["lsh"], stamp, f)
+            with temp_file(self.facets_path) as f:
+                dump_tag_index(snapshot["facets"], snapshot["stats"], stamp, snapshot["journal"], f)
+            if "positions" in snapshot:
+                with temp_file(self.positions_path) as f:
+                    dump_position_index(snapshot["positions"], f)
+            if "vectors" in snapshot:
+                doc_ids, matrix = snapshot["vectors"]
+                # vectors.ids carries the stamp, so it is replaced last
+                with temp_file(self.vectors_path) as matrix_file, temp_file(self.vector_ids_path) as ids_file:
+                    dump_vector_index(doc_ids, matrix, stamp, matrix_file, ids_file)
+        except BaseException:
+            self._discard_temp_files(written)
+            raise
+        return written
+
+    @staticmethod
+    def _discard_temp_files(written: List[Tuple[Path, Path]]) -> None:
+        for tmp_path, _ in written:
+            with contextlib.suppress(OSError):
+                tmp_path.unlink()
+
+    def _save_sidecars(self) -> None:
+        """Save the in-memory LSH table, embeddings and facets for the current index file."""
+        if self._batch_depth:
+            return  # The in-memory state includes writes not journaled yet
+        with file_lock(self.lock_path, exclusive=True):
+            if self._index_signature is None or self._index_file_signature() != self._index_signature:
+                return  # Index file replaced meanwhile; its writer saved them
+            with self._lock:
+                snapshot = self._sidecar_snapshot(self._journal_offset)
+            for tmp_path, target in self._dump_sidecars(snapshot, self.index_path):
+                os.replace(tmp_path, target)
+        self._sidecars_stale = False
+
+    def _dump_index(self, data: Dict[str, Any], path: Path) -> None:
+        """Write TFIDFIndex.to_dict() output to `path` in the store's format."""
+        if self.index_format == INDEX_FORMAT_BINARY:
+            with open(path, 'wb') as f:
+                dump_binary_index(data, f)
+        else:
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=2)
 
     def _load_index(self) -> TFIDFIndex:
-        """Load index from disk or create new."""
-        if self.index_path.exists():
+        """Load the index file from disk (or create new) and replay the journal."""
+        with file_lock(self.lock_path):
+            self._index_signature = self._index_file_signature()
+            index = self._read_index_file()
+            self._journal_offset = 0
+            self._replay_journal(index)
+        return index
+
+    def _replay_journal(self, index: TFIDFIndex) -> None:
+        """
+        Apply journal entries written since the last replay.
+
+        Entries are absolute (an add carries the document's full term counts),
+        so replaying an entry twice leaves the index unchanged.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except OSError:
+            return
+
+        # Ignore a trailing partial line; it is picked up once complete
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
             try:
-                with open(self.index_path, 'r') as f:
-                    data = json.load(f)
-                return TFIDFIndex.from_dict(data)
-            except (json.JSONDecodeError, KeyError):
-                pass
-        return TFIDFIndex()
+                entry = json.loads(line)
+                if entry["op"] == "add":
+                    index.remove_document(entry["id"])
+                    index.add_terms(entry["id"], entry["terms"], entry["len"], entry.get("hash"))
+                elif entry["op"] == "remove":
+                    index.remove_document(entry["id"])
+                if index.facets is not None:
+                    _apply_facets_entry(index.facets, entry)
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+        self._journal_offset += end
+
+    def _append_journal(self, entry: Dict[str, Any]) -> None:
+        """Append one entry to index.journal (held back until a batch() commits)."""
+        line = (json.dumps(entry, separators=(',', ':')) + "\n").encode("utf-8")
+        if self._batch_depth:
+            self._batch_journal.append(line)
+        else:
+            self._write_journal_entries([line])
+
+    def _write_journal_entries(self, lines: List[bytes], sync: bool = False) -> None:
+        """Append encoded entries to index.journal with a single O_APPEND write."""
+        with file_lock(self.lock_path):
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"".join(lines))
+                if sync:
+                    os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+
+        if size >= JOURNAL_COMPACT_BYTES:
+            self._start_compaction()
+
+    def _index_fragment(self, fragment: Fragment) -> None:
+        """
+        Index (or re-index) a fragment and journal the change.
+
+        When the fragment's content hash matches the indexed one, e.g. an
+        update that only changed metadata, only changed facets are journaled.
+        Entries carry the previous facets and the change in distinct terms,
+        so get_stats() can apply them to the facets.json counters.
+        """
+        content_hash = self.analyzer.content_hash(fragment.content, fragment.tags)
+        facets = facets_of(fragment.to_dict())
+        # Catch up with other writers first, so the hash compared is current
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._replay_journal(self.index)
+                known = self._facets()
+                previous = known.facets.get(fragment.id)
+                if self.index.doc_hashes.get(fragment.id) == content_hash:
+                    if previous == facets:
+                        return
+                    known.set(fragment.id, facets)
+                    unchanged = True
+                else:
+                    unchanged = False
+        if unchanged:
+            self._append_journal({"op": "facets", "id": fragment.id, "facets": facets, "prev": previous, "dt": 0})
+            return
+        term_counts, doc_length = self.index.analyze(fragment.content, fragment.tags)
+        with self._lock:
+            delta = self.index.remove_document(fragment.id)
+            delta += self.index.add_terms(fragment.id, term_counts, doc_length, content_hash)
+            self._facets().set(fragment.id, facets)
+        self._append_journal({
+            "op": "add", "id": fragment.id, "terms": term_counts, "len": doc_length, "hash": content_hash,
+            "facets": facets, "prev": previous, "dt": delta
+        })
+
+    def _unindex_fragment(self, fragment_id: str) -> None:
+        """Remove a fragment from the index and journal the change."""
+        with self._lock:
+            delta = self.index.remove_document(fragment_id)
+            facets = self._facets()
+            previous = facets.facets.get(fragment_id)
+            facets.remove(fragment_id)
+        self._append_journal({"op": "remove", "id": fragment_id, "prev": previous, "dt": delta})
+
+    def _start_compaction(self) -> None:
+        """Compact the journal on a background thread (one at a time)."""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        # Not a daemon thread: a short-lived hook process finishes the
+        # compaction before exiting instead of abandoning it
+        self._compaction = threading.Thread(target=self._compact_quietly, name="index-compaction")
+        self._compaction.start()
+
+    def _compact_quietly(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            pass  # The journal stays valid; compaction is retried on a later write
+
+    def compact(self) -> None:
+        """
+        Fold index.journal into the index file (index.json or index.bin).
+
+        The snapshot is serialized without holding the file lock; entries
+        appended meanwhile (by any process) are carried over into the new
+        journal, so no write is lost.
+        """
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._replay_journal(self.index)
+                offset = self._journal_offset
+                signature = self._index_signature
+                data = self.index.to_dict()
+                sidecars = self._sidecar_snapshot()
+
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.base_dir), prefix=f".{self.index_path.name}.", suffix=".tmp")
+        os.close(fd)
+        written: List[Tuple[Path, Path]] = []
+        try:
+            self._dump_index(data, Path(tmp_path))
+            written = self._dump_sidecars(sidecars, Path(tmp_path))
+
+            with file_lock(self.lock_path, exclusive=True):
+                if self._index_file_signature() != signature:
+                    return  # Compacted or rebuilt by someone else meanwhile
+
+                try:
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read()
+                except FileNotFoundError:
+                    tail = b""
+
+                os.replace(tmp_path, self.index_path)
+                for sidecar_tmp, target in written:
+                    os.replace(sidecar_tmp, target)
+                self._write_journal(tail)
+                with self._lock:
+                    self._index_signature = self._index_file_signature()
+                    self._journal_offset = 0
+                    self._sidecars_stale = False
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            self._discard_temp_files(written)
+
+    def _write_journal(self, data: bytes) -> None:
+        """Replace index.journal atomically (caller holds the exclusive lock)."""
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.base_dir), prefix=".index.journal.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.journal_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
 
     def _save_index(self) -> None:
-        """Save index to disk."""
-        with open(self.index_path, 'w') as f:
-            json.dump(self.index.to_dict(), f, indent=2)
+        """Write the full index file and clear the journal."""
+        with file_lock(self.lock_path, exclusive=True):
+            with self._lock:
+                data = self.index.to_dict()
+                fd, tmp_path = tempfile.mkstemp(dir=str(self.base_dir), prefix=f".{self.index_path.name}.", suffix=".tmp")
+                os.close(fd)
+                written: List[Tuple[Path, Path]] = []
+                try:
+                    self._dump_index(data, Path(tmp_path))
+                    written = self._dump_sidecars(self._sidecar_snapshot(), Path(tmp_path))
+                    os.replace(tmp_path, self.index_path)
+                    for sidecar_tmp, target in written:
+                        os.replace(sidecar_tmp, target)
+                except BaseException:
+                    with contextlib.suppress(OSError):
+                        os.unlink(tmp_path)
+                    self._discard_temp_files(written)
+                    raise
+                self._write_journal(b"")
+                self._index_signature = self._index_file_signature()
+                self._journal_offset = 0
+                self._sidecars_stale = False
+
+    def refresh(self) -> bool:
+        """
+        Pick up index changes made by other processes.
 
-    def _fragment_path(self, fragment_id: str) -> Path:
-        """Get path for a fragment file."""
-        return self.fragments_dir / f"{fragment_id}.json"
+        Lets long-lived processes (the hook daemon) keep the index in memory:
+        new journal entries are replayed incrementally, and the index is only
+        reloaded in full when index.json itself changed (compaction/rebuild).
+
+        Returns True if the index changed.
+        """
+        self.storage.refresh()
+        if self._index is None:
+            return False  # Not loaded yet; the first use reads the current state
+
+        if self._index_file_signature() != self._index_signature:
+            index = self._load_index()
+            with self._lock:
+                self.index = index
+            return True
+
+        size = self._journal_size()
+        if size == self._journal_offset:
+            return False
+        if size < self._journal_offset:
+            # Journal was replaced without touching index.json; start over
+            index = self._load_index()
+            with self._lock:
+                self.index = index
+            return True
+
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._replay_journal(self.index)
+        return True
 
     def add(self, fragment: Fragment) -> str:
         """
@@ -348,28 +1268,148 @@ class KnowledgeStore:
         fragment.scope = self.scope
 
         # Save fragment
-        path = self._fragment_path(fragment.id)
-        with open(path, 'w') as f:
-            json.dump(fragment.to_dict(), f, indent=2)
+        self._put_record(fragment.to_dict())
 
         # Update index
-        self.index.add_document(fragment.id, fragment.content, fragment.tags)
-        self._save_index()
+        self._index_fragment(fragment)
 
         return fragment.id
 
     def get(self, fragment_id: str) -> Optional[Fragment]:
         """Get a fragment by ID."""
-        path = self._fragment_path(fragment_id)
-        if not path.exists():
-            return None
+        return self.get_many([fragment_id]).get(fragment_id)
 
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Fragment]:
+        """
+        Get several fragments by ID; missing ones are left out.
+
+        Parsed fragments are kept in an LRU cache keyed by id and storage
+        version (file mtime, or packed record offset), so re-reading them in
+        the same process - e.g. the hook daemon - costs a stat, not a parse.
+        Cached Fragment objects are shared: call update() after changing one.
+        """
+        found: Dict[str, Fragment] = {}
+        misses: Dict[str, Any] = {}
+        for fragment_id in fragment_ids:
+            if fragment_id in found or fragment_id in misses:
+                continue
+            if fragment_id in self._batch_records:
+                # Written inside batch(), not stored yet
+                data = self._batch_records[fragment_id]
+                if data is not None:
+                    found[fragment_id] = Fragment.from_dict(data)
+                continue
+            version = self.storage.version(fragment_id)
+            with self._lock:
+                cached = self._fragment_cache.get(fragment_id)
+                if version is None:
+                    self._fragment_cache.pop(fragment_id, None)
+                    continue
+                if cached is not None and cached[0] == version:
+                    self._fragment_cache.move_to_end(fragment_id)
+                    found[fragment_id] = cached[1]
+                    continue
+            misses[fragment_id] = version
+
+        if misses:
+            records = self.storage.get_many(list(misses))
+            with self._lock:
+                for fragment_id, data in records.items():
+                    try:
+                        fragment = Fragment.from_dict(data)
+                    except KeyError:
+                        continue
+                    found[fragment_id] = fragment
+                    self._fragment_cache[fragment_id] = (misses[fragment_id], fragment)
+                    self._fragment_cache.move_to_end(fragment_id)
+                while len(self._fragment_cache) > FRAGMENT_CACHE_SIZE:
+                    self._fragment_cache.popitem(last=False)
+        return found
+
+    def _uncache(self, fragment_id: str) -> None:
+        with self._lock:
+            self._fragment_cache.pop(fragment_id, None)
+
+    def exists(self, fragment_id: str) -> bool:
+        """Whether a fragment is stored (including writes of an open batch())."""
+        if fragment_id in self._batch_records:
+            return self._batch_records[fragment_id] is not None
+        return self.storage.exists(fragment_id)
+
+    def _put_record(self, data: Dict[str, Any]) -> None:
+        """Write a fragment record (held back until a batch() commits)."""
+        if self._batch_depth:
+            self._batch_records[data["id"]] = data
+        else:
+            self.storage.put(data["id"], data)
+        self._uncache(data["id"])
+
+    def _delete_record(self, fragment_id: str) -> None:
+        """Delete a fragment record (held back until a batch() commits)."""
+        if self._batch_depth:
+            self._batch_records[fragment_id] = None
+        else:
+            self.storage.delete(fragment_id)
+        self._uncache(fragment_id)
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["KnowledgeStore"]:
+        """
+        Group add/update/delete calls into one transaction.
+
+        Fragment writes and journal entries are held back until the block
+        exits, then written together: the fragments (one append with the
+        packed layout), then every journal entry with one write and one
+        fsync. The in-memory index changes at once, so duplicate checks,
+        searches and get() inside the block see the earlier writes.
+
+        If an exception escapes, nothing is written and the index is
+        reloaded from disk. Nested batches join the outermost one. The batch
+        belongs to the store, so writes from other threads meanwhile join it.
+        """
+        if self._batch_depth == 0 and self._compaction is not None:
+            # A compaction snapshot must not include uncommitted changes
+            self._compaction.join()
+        self._batch_depth += 1
         try:
-            with open(path, 'r') as f:
-                data = json.load(f)
-            return Fragment.from_dict(data)
-        except (json.JSONDecodeError, KeyError):
-            return None
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._rollback_batch()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._commit_batch()
+
+    def _commit_batch(self) -> None:
+        """Write the fragments and journal entries held back by batch()."""
+        records, self._batch_records = self._batch_records, OrderedDict()
+        lines, self._batch_journal = self._batch_journal, []
+
+        puts = [data for data in records.values() if data is not None]
+        if hasattr(self.storage, "put_many"):
+            self.storage.put_many(puts)
+        else:
+            for data in puts:
+                self.storage.put(data["id"], data)
+        for fragment_id, data in records.items():
+            if data is None:
+                self.storage.delete(fragment_id)
+            self._uncache(fragment_id)
+
+        if lines:
+            self._write_journal_entries(lines, sync=True)
+
+    def _rollback_batch(self) -> None:
+        """Drop the writes held back by batch() and reload the index from disk."""
+        records, self._batch_records = self._batch_records, OrderedDict()
+        self._batch_journal = []
+        for fragment_id in records:
+            self._uncache(fragment_id)
+        index = self._load_index()
+        with self._lock:
+            self.index = index
 
     def update(self, fragment: Fragment) -> bool:
         """
@@ -377,19 +1417,14 @@ class KnowledgeStore:
 
         Returns True if successful, False if fragment doesn't exist.
         """
-        path = self._fragment_path(fragment.id)
-        if not path.exists():
+        if not self.exists(fragment.id):
             return False
 
-        # Update index (remove old, add new)
-        self.index.remove_document(fragment.id)
-        self.index.add_document(fragment.id, fragment.content, fragment.tags)
-
         # Save fragment
-        with open(path, 'w') as f:
-            json.dump(fragment.to_dict(), f, indent=2)
+        self._put_record(fragment.to_dict())
 
-        self._save_index()
+        # Update index (the journal entry replaces the old document)
+        self._index_fragment(fragment)
         return True
 
     def delete(self, fragment_id: str) -> bool:
@@ -398,87 +1433,659 @@ class KnowledgeStore:
 
         Returns True if successful, False if fragment doesn't exist.
         """
-        path = self._fragment_path(fragment_id)
-        if not path.exists():
+        if not self.exists(fragment_id):
             return False
 
         # Remove from index
-        self.index.remove_document(fragment_id)
-        self._save_index()
+        self._unindex_fragment(fragment_id)
 
-        # Delete file
-        path.unlink()
+        # Delete fragment
+        self._delete_record(fragment_id)
         return True
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[Fragment, float]]:
+    def _save_config(self) -> None:
+        """Write config.json, unless the caller supplied the config."""
+        if self._owns_config:
+            save_store_config(self.base_dir, self.config)
+
+    def collection_stats(self, terms: Iterable[str]) -> CollectionStats:
+        """Index statistics for the given terms (see TFIDFIndex.collection_stats)."""
+        with self._lock:
+            return self.index.collection_stats(terms)
+
+    def rank(
+        self,
+        query: str,
+        top_k: int = 5,
+        scorer: Optional[str] = None,
+        collection: Optional[CollectionStats] = None,
+        tags: Optional[List[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Top_k (fragment_id, score) pairs for the query, without loading the
+        fragments. With `tags`, only fragments having any of them are scored.
+
+        With the `positions` option, quoted phrases in the query must occur
+        as phrases, and the best candidates are boosted by how close
+        together the query terms occur (see positions.py).
+        """
+        scorer = scorer or self.config["scorer"]
+        with self._lock:
+            allowed = self._facets().matching(tags) if tags else None
+            if allowed is not None and not allowed:
+                return []
+            if not self.config.get("positions"):
+                return self.index.search(query, top_k, scorer, collection, allowed)
+
+            phrases = [words for words in map(self.analyzer.words, quoted_phrases(query)) if words]
+            terms = list(dict.fromkeys(self.analyzer.words(query)))
+            if not phrases and len(terms) < 2:
+                return self.index.search(query, top_k, scorer, collection, allowed)
+            if not phrases:
+                ranked = self.index.search(query, top_k * PROXIMITY_CANDIDATES, scorer, collection, allowed)
+            else:
+                # Only fragments holding every phrase term can match
+                for term in {term for words in phrases for term in words}:
+                    docs = self.index.postings(term) or {}
+                    if allowed is None:
+                        allowed = set(docs)
+                    else:
+                        allowed = {doc_id for doc_id in allowed if doc_id in docs}
+                    if not allowed:
+                        return []
+                ranked = self.index.search(query, len(allowed), scorer, collection, allowed)
+        # Positions may need fragment reads, so they are fetched unlocked
+        return self._rank_by_position(ranked, phrases, terms, top_k)
+
+    def _rank_by_position(
+        self,
+        ranked: List[Tuple[str, float]],
+        phrases: List[List[str]],
+        terms: List[str],
+        top_k: int
+    ) -> List[Tuple[str, float]]:
+        """
+        Drop candidates not containing the phrases and apply the proximity
+        boost. Candidates are checked best first, top_k * PROXIMITY_CANDIDATES
+        at a time, until that many match; only their positions are read.
+        """
+        pool = top_k * PROXIMITY_CANDIDATES
+        if pool <= 0:
+            return []
+        needed = set(terms).union(*phrases)
+        results: List[Tuple[str, float]] = []
+        for start in range(0, len(ranked), pool):
+            page = ranked[start:start + pool]
+            positions = self._positions([doc_id for doc_id, _ in page], needed)
+            for doc_id, score in page:
+                doc_positions = positions.get(doc_id)
+                if doc_positions is None:
+                    continue  # Deleted meanwhile
+                if all(phrase_match(doc_positions, words) for words in phrases):
+                    results.append((doc_id, score * proximity_boost(doc_positions, terms)))
+            if len(results) >= pool:
+                break
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:top_k]
+
+    def rank_dense(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Top_k (fragment_id, cosine similarity) pairs of the hashed-embedding channel."""
+        with self._lock:
+            return self.index.search_dense(query, top_k)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        tags: Optional[List[str]] = None
+    ) -> List[Tuple[Fragment, float]]:
         """
-        Search for fragments matching the query.
+        Search for fragments matching the query, optionally only those
+        having any of `tags` (filtered in the tag index, before scoring).
 
         Returns list of (fragment, score) tuples.
         """
-        results = self.index.search(query, top_k)
+        results = self.rank(query, top_k, tags=tags)
 
-        fragments = []
-        for doc_id, score in results:
-            fragment = self.get(doc_id)
-            if fragment:
-                fragments.append((fragment, score))
+        found = self.get_many([doc_id for doc_id, _ in results])
+        return [(found[doc_id], score) for doc_id, score in results if doc_id in found]
 
-        return fragments
+    def find_similar_id(
+        self,
+        content: str,
+        threshold: float = 0.5,
+        tags: Optional[List[str]] = None
+    ) -> Optional[Tuple[str, float]]:
+        """(fragment_id, Jaccard similarity) of the closest near-duplicate, or None."""
+        with self._lock:
+            match = self.index.find_similar(content, tags, threshold)
+        if self._sidecars_stale:
+            # Rehashed every fragment; save it so the next process need not
+            self._save_sidecars()
+        return match
+
+    def find_similar(
+        self,
+        content: str,
+        threshold: float = 0.5,
+        tags: Optional[List[str]] = None
+    ) -> Optional[Fragment]:
+        """
+        Find a near-duplicate fragment (for deduplication).
+
+        Compares term sets (content and tags) by Jaccard similarity, checking
+        only the fragments that share an LSH bucket with the text.
+        """
+        match = self.find_similar_id(content, threshold, tags)
+        return self.get(match[0]) if match else None
+
+    def search_dense(self, query: str, top_k: int = 5) -> List[Tuple[Fragment, float]]:
+        """
+        Search the hashed-embedding channel (see vector_index).
+
+        Returns (fragment, cosine similarity) tuples; empty without NumPy.
+        """
+        results = self.rank_dense(query, top_k)
+
+        found = self.get_many([doc_id for doc_id, _ in results])
+        return [(found[doc_id], score) for doc_id, score in results if doc_id in found]
+
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[Fragment, float]]]:
+        """
+        Search for many queries at once (see TFIDFIndex.search_many).
+
+        Returns one list of (fragment, score) tuples per query.
+        """
+        with self._lock:
+            batches = self.index.search_many(queries, top_k, self.config["scorer"])
+
+        found = self.get_many([doc_id for batch in batches for doc_id, _ in batch])
+        return [
+            [(found[doc_id], score) for doc_id, score in batch if doc_id in found]
+            for batch in batches
+        ]
+
+    def record_access(self, fragment_ids: List[str]) -> None:
+        """Count a retrieval of each fragment (appends to the access sidecar)."""
+        self.access.record(fragment_ids)
+
+    def access_stats(self, fragments: List[Fragment]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """
+        Get each fragment's (accessed_count, last_accessed).
+
+        Combines the values stored in the fragment with the access sidecar.
+        """
+        return merge_access_stats(fragments, self.access.get_many([f.id for f in fragments]))
 
     def list_all(self) -> List[Fragment]:
         """List all fragments in the store."""
         fragments = []
-        if self.fragments_dir.exists():
-            for path in self.fragments_dir.glob("*.json"):
-                try:
-                    with open(path, 'r') as f:
-                        data = json.load(f)
-                    fragments.append(Fragment.from_dict(data))
-                except (json.JSONDecodeError, KeyError):
-                    continue
+        for data in self.storage.iter_all():
+            try:
+                fragments.append(Fragment.from_dict(data))
+            except KeyError:
+                continue
         return fragments
 
-    def rebuild_index(self) -> int:
+    def migrate_storage(self, kind: str) -> int:
         """
-        Rebuild the index from all fragments.
+        Move every fragment to another storage layout and make it the default
+        for this store (config.json). The index is unchanged.
+
+        Returns the number of fragments migrated.
+        """
+        if kind == self.storage.kind:
+            return 0
+
+        target = create_storage(kind, self.base_dir)
+        records = list(self.storage.iter_all())
+        if hasattr(target, "put_many"):
+            target.put_many(records)
+        else:
+            for data in records:
+                target.put(data["id"], data)
+
+        self.config["storage"] = kind
+        self._save_config()
+
+        self.storage.clear()
+        self.storage = target
+        with self._lock:
+            self._fragment_cache.clear()
+        return len(records)
+
+    def migrate_index_format(self, kind: str) -> int:
+        """
+        Rewrite the index in another on-disk format and switch config.json to it.
+
+        Returns the number of indexed fragments.
+        """
+        if kind not in INDEX_FORMATS:
+            raise ValueError(f"Unknown index format: {kind} (expected one of {', '.join(INDEX_FORMATS)})")
+        if kind == self.index_format:
+            return self.index.num_docs
+
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._replay_journal(self.index)
+
+        previous_path = self.index_path
+        self.index_format = kind
+        self.index_path = self.base_dir / INDEX_FILES[kind]
+        self._save_index()
+
+        self.config["index_format"] = kind
+        self._save_config()
+        with contextlib.suppress(FileNotFoundError):
+            previous_path.unlink()
+        return self.index.num_docs
+
+    def index_dict(self) -> Dict[str, Any]:
+        """The index (journal included) as TFIDFIndex.to_dict() output."""
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._replay_journal(self.index)
+                return self.index.to_dict()
 
-        Returns the number of fragments indexed.
+    def export_index(self, path: Path) -> None:
+        """Write the index (journal included) as index.json-style JSON to `path`."""
+        write_json_atomic(path, self.index_dict())
+
+    def _analyze_fragment(
+        self,
+        fragment: Fragment,
+        reuse: List[TFIDFIndex]
+    ) -> Tuple[Dict[str, int], int, str]:
+        """
+        Get a fragment's (term counts, length, content hash), taking the term
+        counts from the first of the `reuse` indexes that holds the same hash.
         """
-        self.index = TFIDFIndex()
+        content_hash = self.analyzer.content_hash(fragment.content, fragment.tags)
+        for index in reuse:
+            if index.doc_hashes.get(fragment.id) == content_hash:
+                term_counts, doc_length = index.term_counts(fragment.id)
+                return term_counts, doc_length, content_hash
+        term_counts, doc_length = self.index.analyze(fragment.content, fragment.tags)
+        return term_counts, doc_length, content_hash
+
+    def rebuild_index(self, workers: int = 1, progress: Optional[RebuildProgress] = None) -> int:
+        """
+        Rebuild the index from all fragments.
 
-        count = 0
-        for fragment in self.list_all():
-            self.index.add_document(fragment.id, fragment.content, fragment.tags)
-            count += 1
+        Returns the number of fragments indexed. With one worker, fragments
+        whose content hash matches the current index reuse its term counts
+        instead of being tokenized again.
 
+        With more workers (0: one per CPU), the fragments are split into
+        chunks of REBUILD_CHUNK_SIZE that a process pool tokenizes into
+        partial indexes; their postings are merged here in chunk order, so
+        the result does not depend on the worker count. Stores smaller than
+        PARALLEL_REBUILD_MIN are rebuilt in this process.
+
+        `progress(done, total, elapsed)` is called after each chunk.
+        """
+        start = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        fragment_ids = list(self.storage.scan()) if workers > 1 else []
+        if len(fragment_ids) >= PARALLEL_REBUILD_MIN:
+            index, count = self._build_index_parallel(fragment_ids, workers, start, progress)
+        else:
+            with self._lock:
+                old_index = self.index
+            index = TFIDFIndex(self.analyzer)
+            fragments = self.list_all()
+            count = 0
+            for fragment in fragments:
+                term_counts, doc_length, content_hash = self._analyze_fragment(fragment, [old_index])
+                index.add_terms(fragment.id, term_counts, doc_length, content_hash)
+                index.facets.set(fragment.id, facets_of(fragment.to_dict()))
+                if self.config.get("positions"):
+                    record = _encode_positions(self.analyzer, fragment, content_hash)
+                    self._load_positions().put(fragment.id, record)
+                count += 1
+                if progress is not None and (count % REBUILD_CHUNK_SIZE == 0 or count == len(fragments)):
+                    progress(count, len(fragments), time.perf_counter() - start)
+
+        with self._lock:
+            self.index = index
         self._save_index()
         return count
 
-    def get_stats(self) -> Dict[str, Any]:
-        """Get statistics about the store."""
-        fragments = self.list_all()
+    def _build_index_parallel(
+        self,
+        fragment_ids: List[str],
+        workers: int,
+        start: float,
+        progress: Optional[RebuildProgress]
+    ) -> Tuple[TFIDFIndex, int]:
+        """Map chunks of fragments to partial indexes in worker processes and merge them."""
+        chunks = [
+            fragment_ids[i:i + REBUILD_CHUNK_SIZE] for i in range(0, len(fragment_ids), REBUILD_CHUNK_SIZE)
+        ]
+        index = TFIDFIndex(self.analyzer)
+        count = done = 0
+        # spawn: forking a threaded process (the hook daemon) can deadlock
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_index_chunk, self.storage.kind, str(self.base_dir), self.config, chunk)
+                for chunk in chunks
+            ]
+            for chunk, future in zip(chunks, futures):
+                indexed, partial = future.result()
+                index.merge(partial)
+                for fragment_id, record in partial.get("positions", ()):
+                    self._load_positions().put(fragment_id, record)
+                count += indexed
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, len(fragment_ids), time.perf_counter() - start)
+        return index, count
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Apply fragment changes made outside the store (git pull, manual edits)
+        to the index, without rebuilding it.
+
+        sync.manifest records each fragment's storage version (inode, mtime
+        and size of its file) and the content hash indexed for it. One scan
+        of the storage finds the fragments whose version changed, or whose
+        indexed hash no longer matches; only those are read, and only those
+        whose content hash differs from the index are re-indexed. Indexed
+        fragments missing from storage are removed. Index changes are
+        journaled as one batch().
+
+        Returns counts of added, changed, removed and unchanged fragments.
+        """
+        self.refresh()
+        versions = self.storage.scan()
+        manifest = self._load_manifest()
+        counts = dict.fromkeys(("added", "changed", "removed", "unchanged"), 0)
+
+        # Versions are compared in their manifest form, which is cheaper
+        # than parsing the manifest back into tuples
+        versions = {fragment_id: ",".join(map(str, version)) for fragment_id, version in versions.items()}
+        with self._lock:
+            hashes = self.index.doc_hashes
+            indexed = self.index.doc_lengths
+            suspects = []
+            for fragment_id, version in versions.items():
+                entry = manifest.get(fragment_id)
+                if entry is not None and entry[0] == version and hashes.get(fragment_id, "") == entry[1]:
+                    counts["unchanged"] += 1
+                else:
+                    suspects.append(fragment_id)
+            removed = [fragment_id for fragment_id in indexed if fragment_id not in versions]
+        if not suspects and not removed and len(manifest) == len(versions):
+            return counts
+
+        with self.batch():
+            records = self.storage.get_many(suspects) if suspects else {}
+            for fragment_id in suspects:
+                try:
+                    fragment = Fragment.from_dict(records[fragment_id])
+                except KeyError:
+                    # Unreadable (e.g. being written); retried by the next sync
+                    versions.pop(fragment_id)
+                    continue
+                content_hash = self.analyzer.content_hash(fragment.content, fragment.tags)
+                if hashes.get(fragment_id) == content_hash:
+                    # Only metadata changed (or just the file's mtime)
+                    counts["unchanged"] += 1
+                    facets = facets_of(records[fragment_id])
+                    with self._lock:
+                        known = self._facets()
+                        previous = known.facets.get(fragment_id)
+                        if previous == facets:
+                            continue
+                        known.set(fragment_id, facets)
+                    self._append_journal(
+                        {"op": "facets", "id": fragment_id, "facets": facets, "prev": previous, "dt": 0}
+                    )
+                    continue
+                counts["changed" if fragment_id in indexed else "added"] += 1
+                self._uncache(fragment_id)
+                self._index_fragment(fragment)
+            for fragment_id in removed:
+                self._unindex_fragment(fragment_id)
+                self._uncache(fragment_id)
+            counts["removed"] = len(removed)
+
+        with self._lock:
+            hashes = self.index.doc_hashes
+            self._save_manifest({
+                fragment_id: (version, hashes.get(fragment_id, "")) for fragment_id, version in versions.items()
+            })
+        return counts
+
+    def _load_manifest(self) -> Dict[str, Tuple[str, str]]:
+        """
+        Read sync.manifest: fragment_id -> (storage version, indexed content hash).
+
+        The file is a JSON header line, then one tab-separated line per
+        fragment: id, comma-separated version, hash. Empty if missing or
+        unreadable, which makes sync() read every fragment once.
+        """
+        try:
+            with open(self.manifest_path, 'r', encoding="utf-8") as f:
+                if json.loads(f.readline()).get("version") != MANIFEST_VERSION:
+                    return {}
+                lines = f.read().split("\n")
+            return {fragment_id: (version, content_hash) for fragment_id, version, content_hash in (
+                line.split("\t") for line in lines if line
+            )}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, Tuple[str, str]]) -> None:
+        """Write sync.manifest atomically."""
+        lines = [json.dumps({"version": MANIFEST_VERSION}) + "\n"]
+        lines.extend(
+            f"{fragment_id}\t{version}\t{content_hash}\n"
+            for fragment_id, (version, content_hash) in manifest.items()
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.base_dir), prefix=".sync.manifest.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding="utf-8") as f:
+                f.write("".join(lines))
+            os.replace(tmp_path, self.manifest_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+    def add_many(self, fragments: List[Fragment], reuse: Optional[List[TFIDFIndex]] = None) -> int:
+        """
+        Add many fragments (backend migration, rebalancing). Returns the count.
 
-        # Collect tag counts
-        tag_counts: Dict[str, int] = defaultdict(int)
-        source_counts: Dict[str, int] = defaultdict(int)
-        total_accessed = 0
+        Fragments are written in one batch and the index file is saved once
+        instead of journaling each fragment. Term counts are taken from the
+        `reuse` indexes for fragments whose content hash they hold.
+        """
+        if not fragments:
+            return 0
+        if self._batch_depth:
+            # Saving the index would commit the rest of the batch early
+            for fragment in fragments:
+                self.add(fragment)
+            return len(fragments)
+        records = []
+        for fragment in fragments:
+            fragment.scope = self.scope
+            records.append(fragment.to_dict())
+        if hasattr(self.storage, "put_many"):
+            self.storage.put_many(records)
+        else:
+            for data in records:
+                self.storage.put(data["id"], data)
+
+        analyzed = [self._analyze_fragment(fragment, reuse or []) for fragment in fragments]
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._replay_journal(self.index)
+                # Loaded before the changes: facets.json does not have them
+                facets = self._facets()
+                for fragment, (term_counts, doc_length, content_hash) in zip(fragments, analyzed):
+                    self._fragment_cache.pop(fragment.id, None)
+                    self.index.remove_document(fragment.id)
+                    self.index.add_terms(fragment.id, term_counts, doc_length, content_hash)
+                    facets.set(fragment.id, facets_of(fragment.to_dict()))
+        self._save_index()
+        return len(fragments)
+
+    def clear(self) -> None:
+        """Delete every fragment and reset the index."""
+        self.storage.clear()
+        self.access.clear()
+        with self._lock:
+            self._fragment_cache.clear()
+            self.index = TFIDFIndex(self.analyzer)
+        self._save_index()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics about the store.
 
-        for f in fragments:
-            for tag in f.tags:
-                tag_counts[tag] += 1
-            source_counts[f.source] += 1
-            total_accessed += f.accessed_count
+        Counts are the facets.json header plus the journal entries written
+        since, so neither the index nor the per-fragment facets are loaded.
+        Without a usable header (missing, stale, or journal entries from an
+        older version) they come from the tag index, which is then saved.
+        """
+        stats = self._header_stats()
+        if stats is None:
+            self.refresh()
+            with self._lock:
+                facets = self._facets()
+                stats = dict(facets.stats(), num_terms=self.index.num_terms)
+            if self._sidecars_stale:
+                self._save_sidecars()
 
         return {
             "scope": self.scope,
-            "total_fragments": len(fragments),
-            "total_terms": len(self.index.term_frequencies),
-            "tag_counts": dict(tag_counts),
-            "source_counts": dict(source_counts),
-            "total_accesses": total_accessed
+            "total_fragments": stats["total_fragments"],
+            "total_terms": stats["num_terms"],
+            "tag_counts": stats["tag_counts"],
+            "source_counts": stats["source_counts"],
+            "scope_counts": stats["scope_counts"],
+            "total_accesses": stats["total_accessed"] + self.access.total()
         }
 
+    def _header_stats(self) -> Optional[Dict[str, Any]]:
+        """Counters of the facets.json header brought up to date with the journal, or None."""
+        with file_lock(self.lock_path):
+            header = read_header(self.facets_path, self._index_file_signature())
+            if header is None:
+                return None
+            if self._journal_size() < header["journal"]:
+                return None  # Journal replaced without the index file
+            try:
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(header["journal"])
+                    data = f.read()
+            except FileNotFoundError:
+                data = b""
+            except OSError:
+                return None
+
+        stats = header["stats"]
+        try:
+            stats = dict(stats, tag_counts=dict(stats["tag_counts"]),
+                         source_counts=dict(stats["source_counts"]), scope_counts=dict(stats["scope_counts"]))
+            # Skip a trailing partial line; entries of an open batch() are not journaled yet
+            for line in data[:data.rfind(b"\n") + 1].splitlines() + self._batch_journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry["op"] not in ("add", "facets", "remove"):
+                    continue
+                if entry.get("prev"):
+                    count_facets(stats, entry["prev"], -1)
+                if entry["op"] != "remove":
+                    count_facets(stats, entry["facets"], 1)
+                stats["num_terms"] += entry["dt"]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None  # e.g. entries written without "prev"/"dt"
+        return stats
+
+
+def _encode_positions(analyzer: Analyzer, fragment: Fragment, content_hash: str) -> bytes:
+    """Position record of a fragment (content and tags, as indexed)."""
+    text = fragment.content
+    if fragment.tags:
+        text += " " + " ".join(fragment.tags)
+    return encode_record(content_hash, analyzer.positions(text))
+
+
+def _apply_facets_entry(facets: TagIndex, entry: Dict[str, Any]) -> None:
+    """Apply a journal entry's facet change (add and facets ops carry facets)."""
+    if entry["op"] == "remove":
+        facets.remove(entry["id"])
+    elif "facets" in entry:
+        facets.set(entry["id"], entry["facets"])
+
+
+# Fragment storages opened by rebuild worker processes: (kind, directory) -> storage
+_WORKER_STORAGES: Dict[Tuple[str, str], Any] = {}
+
+
+def _index_chunk(
+    kind: str,
+    base_dir: str,
+    config: Dict[str, Any],
+    fragment_ids: List[str]
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Tokenize a chunk of fragments into a partial index (runs in a rebuild
+    worker process), including its LSH bucket keys, embeddings, facets
+    (and position records) so the parent does not compute them when saving. Returns (fragments read,
+    partial index for TFIDFIndex.merge()).
+    """
+    storage = _WORKER_STORAGES.get((kind, base_dir))
+    if storage is None:
+        storage = _WORKER_STORAGES[(kind, base_dir)] = create_storage(kind, Path(base_dir))
+    index = TFIDFIndex(Analyzer.from_config(config))
+    positions: List[Tuple[str, bytes]] = []
+    count = 0
+    for data in storage.get_many(fragment_ids).values():
+        try:
+            fragment = Fragment.from_dict(data)
+        except KeyError:
+            continue
+        term_counts, doc_length = index.analyze(fragment.content, fragment.tags)
+        content_hash = index.analyzer.content_hash(fragment.content, fragment.tags)
+        index.add_terms(fragment.id, term_counts, doc_length, content_hash)
+        index.facets.set(fragment.id, facets_of(data))
+        if config.get("positions"):
+            positions.append((fragment.id, _encode_positions(index.analyzer, fragment, content_hash)))
+        count += 1
+    partial = index.to_dict()
+    partial["lsh"] = index.lsh.entries(index.terms)
+    partial["facets"] = index.facets.facets
+    if positions:
+        partial["positions"] = positions
+    if HAS_NUMPY:
+        partial["vectors"] = index.vectors.snapshot(lambda doc_id: index.term_counts(doc_id)[0])
+    return count, partial
+
+
+def open_store(scope: str, backend: Optional[str] = None):
+    """
+    Open the store for a scope with the backend set in its config.json
+    (or `backend`, e.g. as a migration target).
+
+    Returns a KnowledgeStore, a ShardedKnowledgeStore (json backend with
+    "shards" above 1) or an SQLiteKnowledgeStore; all expose the same
+    add/get/update/delete/search/list_all/get_stats interface.
+    """
+    config = load_store_config(get_store_dir(scope))
+    if (backend or config["backend"]) == BACKEND_SQLITE:
+        from .knowledge_sqlite import SQLiteKnowledgeStore
+        return SQLiteKnowledgeStore(scope)
+    if config["shards"] > 1:
+        from .knowledge_shards import ShardedKnowledgeStore
+        return ShardedKnowledgeStore(scope, config)
+    return KnowledgeStore(scope)
+
 
 class DualKnowledgeStore:
     """
@@ -490,8 +2097,25 @@ class DualKnowledgeStore:
     """
 
     def __init__(self):
-        self.shared = KnowledgeStore(SCOPE_SHARED)
-        self.personal = KnowledgeStore(SCOPE_PERSONAL)
+        self.shared = open_store(SCOPE_SHARED)
+        self.personal = open_store(SCOPE_PERSONAL)
+
+    def refresh(self) -> None:
+        """Reload either index if it changed on disk."""
+        self.shared.refresh()
+        self.personal.refresh()
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator["DualKnowledgeStore"]:
+        """
+        Group writes to both stores (see KnowledgeStore.batch()).
+
+        Each store commits its own batch when the block exits, shared
+        first, so a promotion is durable in shared before it leaves personal;
+        if an exception escapes (or the shared commit fails), both roll back.
+        """
+        with self.personal.batch(), self.shared.batch():
+            yield self
 
     def add(self, fragment: Fragment) -> str:
         """Add a fragment to the appropriate store based on its scope."""
@@ -507,12 +2131,25 @@ class DualKnowledgeStore:
             return fragment
         return self.personal.get(fragment_id)
 
+    def generation(self) -> Tuple[Any, Any]:
+        """Generations of both stores (see KnowledgeStore.generation())."""
+        return self.shared.generation(), self.personal.generation()
+
+    def get_many(self, fragment_ids: List[str]) -> Dict[str, Fragment]:
+        """Get several fragments by ID from either store; missing ones are left out."""
+        found = self.shared.get_many(fragment_ids)
+        missing = [fragment_id for fragment_id in fragment_ids if fragment_id not in found]
+        if missing:
+            found.update(self.personal.get_many(missing))
+        return found
+
     def search(
         self,
         query: str,
         top_k: int = 5,
         shared_boost: float = 1.2,
-        personal_tags_boost: Optional[List[str]] = None
+        personal_tags_boost: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None
     ) -> List[Tuple[Fragment, float]]:
         """
         Search both stores and merge results.
@@ -522,14 +2159,15 @@ class DualKnowledgeStore:
             top_k: Maximum results to return
             shared_boost: Score multiplier for shared fragments
             personal_tags_boost: Tags that boost personal fragment scores
+            tags: If given, only fragments having any of these tags
 
         Returns list of (fragment, score) tuples, merged and sorted.
         """
         personal_tags_boost = personal_tags_boost or ['workflow', 'preference', 'personal']
 
         # Get results from both stores
-        shared_results = self.shared.search(query, top_k * 2)
-        personal_results = self.personal.search(query, top_k * 2)
+        shared_results = self.shared.search(query, top_k * 2, tags=tags)
+        personal_results = self.personal.search(query, top_k * 2, tags=tags)
 
         # Apply boosts
         merged: List[Tuple[Fragment, float]] = []
@@ -558,6 +2196,31 @@ class DualKnowledgeStore:
 
         return final_results
 
+    def search_dense(self, query: str, top_k: int = 5) -> List[Tuple[Fragment, float]]:
+        """
+        Search both stores' hashed-embedding channels.
+
+        Returns (fragment, cosine similarity) tuples, best first.
+        """
+        merged = self.shared.search_dense(query, top_k) + self.personal.search_dense(query, top_k)
+        merged.sort(key=lambda x: x[1], reverse=True)
+        return merged[:top_k]
+
+    def record_access(self, fragments: List[Fragment]) -> None:
+        """Count a retrieval of each fragment in its own store."""
+        shared_ids = [f.id for f in fragments if f.scope == SCOPE_SHARED]
+        personal_ids = [f.id for f in fragments if f.scope != SCOPE_SHARED]
+        if shared_ids:
+            self.shared.record_access(shared_ids)
+        if personal_ids:
+            self.personal.record_access(personal_ids)
+
+    def access_stats(self, fragments: List[Fragment]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """Get each fragment's (accessed_count, last_accessed) from its own store."""
+        stats = self.shared.access_stats([f for f in fragments if f.scope == SCOPE_SHARED])
+        stats.update(self.personal.access_stats([f for f in fragments if f.scope != SCOPE_SHARED]))
+        return stats
+
     def promote(self, fragment_id: str) -> bool:
         """
         Promote a personal fragment to shared.
@@ -568,12 +2231,14 @@ class DualKnowledgeStore:
         if not fragment:
             return False
 
-        # Delete from personal
-        self.personal.delete(fragment_id)
+        # Carry the personal access counters into the fragment itself
+        fragment.accessed_count, fragment.last_accessed = self.personal.access_stats([fragment])[fragment_id]
 
-        # Add to shared
+        # Add to shared, and only once that is written delete from personal:
+        # a failure in between leaves the fragment in both stores, not neither
         fragment.scope = SCOPE_SHARED
         self.shared.add(fragment)
+        self.personal.delete(fragment_id)
 
         return True
 
@@ -598,16 +2263,19 @@ class DualKnowledgeStore:
         }
 
 
-def find_similar(content: str, store: KnowledgeStore, threshold: float = 0.5) -> Optional[Fragment]:
+def find_similar(
+    content: str,
+    store: KnowledgeStore,
+    threshold: float = 0.5,
+    tags: Optional[List[str]] = None
+) -> Optional[Fragment]:
     """
     Find a similar fragment in the store (for deduplication).
 
-    Uses TF-IDF search and checks if top result exceeds threshold.
+    Similarity is the Jaccard similarity of the analyzed terms of content
+    and tags; see KnowledgeStore.find_similar().
     """
-    results = store.search(content, top_k=1)
-    if results and results[0][1] >= threshold:
-        return results[0][0]
-    return None
+    return store.find_similar(content, threshold, tags)
 
 
 def create_fragment(
@@ -0,0 +1,248 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+MinHash - near-duplicate candidates for knowledge fragments via LSH.
+
+Each fragment's set of index terms is summarized by a MinHash signature of
+NUM_PERM values; two signatures agree at any position with probability equal
+to the Jaccard similarity of the term sets. The signature is cut into
+LSH_BANDS bands of LSH_ROWS values, and each band is hashed to a bucket key.
+Fragments sharing any bucket with a new text are its duplicate candidates:
+with 20 bands of 3 rows, a fragment with Jaccard 0.6 is a candidate with
+probability 0.99, one with Jaccard 0.1 with probability 0.02. The caller
+checks the exact similarity of the candidates only.
+
+The band table is saved as lsh.bin beside the index file:
+
+    header      magic, version, band count, doc count, index file stamp
+    doc ids     newline-separated fragment ids (ordinal = position)
+    doc keys    array('I'), LSH_BANDS bucket keys per doc ordinal
+    buckets     array('Q'), (key << 32 | doc ordinal) sorted, binary-searched
+
+The stamp is the (mtime_ns, size) of the index file the table was written
+with; a table whose stamp does not match is ignored and rebuilt from the
+index's forward index. Changes since then are replayed from index.journal.
+
+Multi-byte values are little-endian. Zero external dependencies - uses only
+Python standard library.
+"""
+
+import hashlib
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+NUM_PERM = 60
+LSH_BANDS = 20
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+MAGIC = b"KLSH"
+FORMAT_VERSION = 1
+
+# magic, version, bands, num_docs, stamp mtime_ns, stamp size, doc id blob length
+_HEADER = struct.Struct("<4sIIIQQQ")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+_MASK64 = (1 << 64) - 1
+
+
+@lru_cache(maxsize=16384)
+def _term_hashes(term: str) -> array:
+    """NUM_PERM independent 32-bit hashes of a term."""
+    hashes = array('I', hashlib.shake_128(term.encode("utf-8")).digest(4 * NUM_PERM))
+    if not _LITTLE_ENDIAN:
+        hashes.byteswap()
+    return hashes
+
+
+def minhash_signature(terms: Iterable[str]) -> List[int]:
+    """MinHash signature of a term set (empty if there are no terms)."""
+    hashes = [_term_hashes(term) for term in set(terms)]
+    if not hashes:
+        return []
+    return list(map(min, *hashes)) if len(hashes) > 1 else list(hashes[0])
+
+
+def band_keys(terms: Iterable[str]) -> List[int]:
+    """32-bit LSH bucket key of each band of the term set's signature."""
+    signature = minhash_signature(terms)
+    keys = []
+    for band in range(len(signature) // LSH_ROWS):
+        # Deterministic across processes and Python versions (unlike hash())
+        key = band + 1
+        for value in signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]:
+            key = ((key ^ value) * 0x9E3779B97F4A7C15) & _MASK64
+        keys.append(key >> 32)
+    return keys
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two term sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class LSHIndex:
+    """
+    LSH band table of a TFIDFIndex: a saved snapshot plus in-memory changes.
+
+    Bucket keys of added documents are computed on the next candidates() or
+    entries() call, from the terms the caller supplies, so indexing (and
+    journal replay) only pays a set insertion.
+    """
+
+    def __init__(self):
+        # Snapshot loaded from lsh.bin
+        self._doc_ids: List[str] = []
+        self._doc_keys = array('I')
+        self._buckets = array('Q')
+        # Snapshot docs that were removed or re-added since
+        self._hidden: Set[str] = set()
+
+        # Docs added since the snapshot: doc_id -> bucket keys
+        self._keys: Dict[str, List[int]] = {}
+        self._members: Dict[int, Set[str]] = defaultdict(set)
+        # Added docs whose keys are not computed yet
+        self._pending: Set[str] = set()
+
+    def add(self, doc_id: str) -> None:
+        """Schedule a (re-)added document for hashing."""
+        self.remove(doc_id)
+        self._pending.add(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document."""
+        self._pending.discard(doc_id)
+        for key in self._keys.pop(doc_id, ()):
+            members = self._members[key]
+            members.discard(doc_id)
+            if not members:
+                del self._members[key]
+        if self._doc_ids:
+            self._hidden.add(doc_id)
+
+    def add_hashed(self, entries: Iterable[Tuple[str, List[int]]]) -> None:
+        """Add (re-)added documents whose bucket keys were computed elsewhere (entries() output)."""
+        for doc_id, keys in entries:
+            self.remove(doc_id)
+            self._keys[doc_id] = keys
+            for key in keys:
+                self._members[key].add(doc_id)
+
+    @property
+    def pending(self) -> int:
+        """Number of documents waiting to be hashed."""
+        return len(self._pending)
+
+    def _update(self, terms_of: Callable[[str], Iterable[str]]) -> None:
+        """Compute bucket keys of pending documents."""
+        for doc_id in self._pending:
+            keys = band_keys(terms_of(doc_id))
+            self._keys[doc_id] = keys
+            for key in keys:
+                self._members[key].add(doc_id)
+        self._pending.clear()
+
+    def candidates(self, terms: Iterable[str], terms_of: Callable[[str], Iterable[str]]) -> Set[str]:
+        """Ids of documents sharing at least one LSH bucket with the term set."""
+        self._update(terms_of)
+        found: Set[str] = set()
+        buckets, doc_ids = self._buckets, self._doc_ids
+        for key in band_keys(terms):
+            i = bisect_left(buckets, key << 32)
+            while i < len(buckets) and buckets[i] >> 32 == key:
+                doc_id = doc_ids[buckets[i] & 0xFFFFFFFF]
+                if doc_id not in self._hidden:
+                    found.add(doc_id)
+                i += 1
+            found.update(self._members.get(key, ()))
+        return found
+
+    def entries(self, terms_of: Callable[[str], Iterable[str]]) -> List[Tuple[str, List[int]]]:
+        """(doc_id, bucket keys) of every document, for dump_lsh_index()."""
+        self._update(terms_of)
+        entries = []
+        for ordinal, doc_id in enumerate(self._doc_ids):
+            if doc_id not in self._hidden:
+                entries.append((doc_id, list(self._doc_keys[ordinal * LSH_BANDS:(ordinal + 1) * LSH_BANDS])))
+        entries.extend(self._keys.items())
+        return entries
+
+    @classmethod
+    def load(cls, path, stamp: Optional[Tuple[int, int]]) -> Optional["LSHIndex"]:
+        """Read lsh.bin; None if missing, unreadable or not written for `stamp`."""
+        if stamp is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, version, bands, num_docs, mtime_ns, size, doc_ids_size = _HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or version != FORMAT_VERSION or bands != LSH_BANDS or (mtime_ns, size) != stamp:
+            return None
+
+        index = cls()
+        offset = _HEADER.size
+        if num_docs:
+            index._doc_ids = data[offset:offset + doc_ids_size].decode("utf-8").split("\n")
+        offset += doc_ids_size + _pad(doc_ids_size)
+        index._doc_keys = _read_array('I', data, offset, num_docs * LSH_BANDS)
+        offset += 4 * num_docs * LSH_BANDS
+        offset += _pad(offset)
+        index._buckets = _read_array('Q', data, offset, num_docs * LSH_BANDS)
+        return index
+
+
+def _pad(size: int) -> int:
+    """Padding that keeps the next section 8-byte aligned."""
+    return -size % 8
+
+
+def _read_array(typecode: str, data: bytes, offset: int, count: int) -> array:
+    values = array(typecode)
+    values.frombytes(data[offset:offset + values.itemsize * count])
+    if not _LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _array_bytes(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def dump_lsh_index(entries: List[Tuple[str, List[int]]], stamp: Tuple[int, int], f: BinaryIO) -> None:
+    """
+    Write an LSH table.
+
+    Args:
+        entries: LSHIndex.entries() output
+        stamp: (mtime_ns, size) of the index file written with it
+        f: File opened for binary writing
+    """
+    # Documents without terms have no keys; keep the table rectangular
+    entries = [(doc_id, keys) for doc_id, keys in entries if len(keys) == LSH_BANDS]
+    doc_id_blob = "\n".join(doc_id for doc_id, _ in entries).encode("utf-8")
+    doc_keys = array('I')
+    for _, keys in entries:
+        doc_keys.extend(keys)
+    buckets = array('Q', sorted(
+        (key << 32) | ordinal for ordinal, (_, keys) in enumerate(entries) for key in keys
+    ))
+
+    f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, LSH_BANDS, len(entries), stamp[0], stamp[1], len(doc_id_blob)))
+    f.write(doc_id_blob)
+    f.write(b"\0" * _pad(len(doc_id_blob)))
+    f.write(_array_bytes(doc_keys))
+    f.write(b"\0" * _pad(len(doc_keys) * 4))
+    f.write(_array_bytes(buckets))
@@ -0,0 +1,309 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Positions - term positions of knowledge fragments for phrase and proximity queries.
+
+The index keeps one normalized frequency per (term, fragment), so a prompt
+about "tanstack query" scores a fragment that says "TanStack Query" the same
+as one that mentions "query" and "tanstack" in unrelated sentences. Stores
+with the `positions` option also keep where each term occurs, as the word
+ordinals of the analyzer's tokens (stopwords dropped, n-grams not counted),
+so:
+
+    "tanstack query"    a quoted phrase only matches fragments holding its
+                        terms at consecutive positions
+    proximity boost     a fragment whose query terms sit close together
+                        scores up to PROXIMITY_WEIGHT higher
+
+A fragment's positions are one record: its content hash, then for each term
+the term, its occurrence count and varint-encoded position deltas. Records
+are saved as positions.bin beside the index:
+
+    header      magic, version, doc count, section sizes
+    doc ids     array('I') offsets + sorted UTF-8 ids, binary-searched
+    records     array('Q') offsets + concatenated records
+
+The file is mmap'ed on first use and only the records of a query's
+candidates are decoded. A record whose content hash differs from the one
+the index holds (the fragment changed since the file was written) is
+ignored, so the file never has to match the index exactly; the caller
+recomputes such records from the fragment text.
+
+Multi-byte values are little-endian. Zero external dependencies - uses only
+Python standard library.
+"""
+
+import heapq
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterable, List, Optional, Set, Tuple
+
+MAGIC = b"KPOS"
+FORMAT_VERSION = 1
+
+# Candidates re-ranked by proximity, per result requested
+PROXIMITY_CANDIDATES = 3
+# Boost of a fragment holding every query term side by side
+PROXIMITY_WEIGHT = 0.3
+
+# magic, version, num_docs, doc id blob length, record blob length
+_HEADER = struct.Struct("<4sIIQQ")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+PHRASE_PATTERN = re.compile(r'"([^"]+)"')
+
+
+def quoted_phrases(query: str) -> List[str]:
+    """Texts of the double-quoted phrases in a query."""
+    return PHRASE_PATTERN.findall(query)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset: int) -> Tuple[int, int]:
+    """Decode a varint at offset; returns (value, next offset)."""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_record(content_hash: str, positions: Dict[str, List[int]]) -> bytes:
+    """Encode a document's positions (term -> ascending word ordinals)."""
+    out = bytearray()
+    key = content_hash.encode("utf-8")
+    _write_varint(out, len(key))
+    out += key
+    for term, ordinals in positions.items():
+        key = term.encode("utf-8")
+        _write_varint(out, len(key))
+        out += key
+        _write_varint(out, len(ordinals))
+        previous = 0
+        for ordinal in ordinals:
+            _write_varint(out, ordinal - previous)
+            previous = ordinal
+    return bytes(out)
+
+
+def record_hash(record) -> str:
+    """Content hash a record was written for."""
+    length, offset = _read_varint(record, 0)
+    return bytes(record[offset:offset + length]).decode("utf-8")
+
+
+def decode_record(record, terms: Optional[Set[str]] = None) -> Dict[str, List[int]]:
+    """Decode a record's positions, only of `terms` if given (others are skipped)."""
+    length, offset = _read_varint(record, 0)
+    offset += length
+    positions: Dict[str, List[int]] = {}
+    end = len(record)
+    while offset < end:
+        length, offset = _read_varint(record, offset)
+        term = bytes(record[offset:offset + length]).decode("utf-8")
+        offset += length
+        count, offset = _read_varint(record, offset)
+        if terms is not None and term not in terms:
+            for _ in range(count):
+                while record[offset] >= 0x80:
+                    offset += 1
+                offset += 1
+            continue
+        ordinals = []
+        previous = 0
+        for _ in range(count):
+            delta, offset = _read_varint(record, offset)
+            previous += delta
+            ordinals.append(previous)
+        positions[term] = ordinals
+    return positions
+
+
+def phrase_match(positions: Dict[str, List[int]], phrase: List[str]) -> bool:
+    """Whether the phrase's terms occur at consecutive positions."""
+    if not phrase:
+        return True
+    if any(term not in positions for term in phrase):
+        return False
+    following = [set(positions[term]) for term in phrase[1:]]
+    return any(
+        all(start + i + 1 in ordinals for i, ordinals in enumerate(following))
+        for start in positions[phrase[0]]
+    )
+
+
+def min_span(ordinal_lists: List[List[int]]) -> int:
+    """Length (last - first position) of the shortest window holding one ordinal of each list."""
+    heap = [(ordinals[0], i, 0) for i, ordinals in enumerate(ordinal_lists)]
+    heapq.heapify(heap)
+    high = max(ordinal for ordinal, _, _ in heap)
+    best = high - heap[0][0]
+    while True:
+        low, i, j = heapq.heappop(heap)
+        best = min(best, high - low)
+        if j + 1 == len(ordinal_lists[i]):
+            return best
+        following = ordinal_lists[i][j + 1]
+        high = max(high, following)
+        heapq.heappush(heap, (following, i, j + 1))
+
+
+def proximity_boost(positions: Dict[str, List[int]], terms: List[str]) -> float:
+    """
+    Score multiplier for how close together the query terms occur.
+
+    1 + PROXIMITY_WEIGHT * coverage * closeness, where coverage is the share
+    of the query's terms present beyond the first and closeness is 1 for
+    adjacent terms, falling with the width of the tightest window holding
+    them all.
+    """
+    present = [positions[term] for term in terms if positions.get(term)]
+    if len(present) < 2:
+        return 1.0
+    gaps = len(present) - 1
+    return 1.0 + PROXIMITY_WEIGHT * (gaps / (len(terms) - 1)) * (gaps / max(min_span(present), gaps))
+
+
+class MappedPositions:
+    """
+    Read-only view of a positions.bin file.
+
+    The file is mmap'ed (read into memory on Windows, where a mapped file
+    cannot be replaced); records are looked up by binary search over the
+    sorted ids.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if os.name == "nt":
+                self._buffer = f.read()
+            else:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError(f"Truncated positions file: {path}")
+        magic, version, self.num_docs, ids_size, records_size = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a version {FORMAT_VERSION} positions file: {path}")
+
+        offset = _HEADER.size
+        self._id_offsets = _typed(view, 'I', offset, self.num_docs + 1)
+        offset += 4 * (self.num_docs + 1)
+        self._id_blob = offset
+        offset += ids_size + _pad(offset + ids_size)
+        self._record_offsets = _typed(view, 'Q', offset, self.num_docs + 1)
+        self._records = offset + 8 * (self.num_docs + 1)
+        self._view = view
+
+    def doc_id(self, ordinal: int) -> str:
+        base, offsets = self._id_blob, self._id_offsets
+        return self._buffer[base + offsets[ordinal]:base + offsets[ordinal + 1]].decode("utf-8")
+
+    def record(self, doc_id: str):
+        """The document's record (a memoryview), or None."""
+        key = doc_id.encode("utf-8")
+        buffer, base, offsets = self._buffer, self._id_blob, self._id_offsets
+        lo, hi = 0, self.num_docs
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = buffer[base + offsets[mid]:base + offsets[mid + 1]]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                start = self._records + self._record_offsets[mid]
+                return self._view[start:self._records + self._record_offsets[mid + 1]]
+        return None
+
+
+class PositionIndex:
+    """Records of positions.bin plus the records computed since it was loaded."""
+
+    def __init__(self, mapped: Optional[MappedPositions] = None):
+        self._mapped = mapped
+        self._records: Dict[str, bytes] = {}
+
+    def record(self, doc_id: str, content_hash: Optional[str]):
+        """The document's record if it was written for `content_hash`, else None."""
+        if not content_hash:
+            return None
+        for record in (self._records.get(doc_id), self._mapped and self._mapped.record(doc_id)):
+            if record is not None and record_hash(record) == content_hash:
+                return record
+        return None
+
+    def put(self, doc_id: str, record: bytes) -> None:
+        self._records[doc_id] = record
+
+    @classmethod
+    def load(cls, path) -> "PositionIndex":
+        """Open positions.bin (an empty index if missing or unreadable)."""
+        try:
+            return cls(MappedPositions(path))
+        except (OSError, ValueError, struct.error):
+            return cls()
+
+
+def _pad(size: int) -> int:
+    """Padding that keeps the next section 8-byte aligned."""
+    return -size % 8
+
+
+def _typed(view: memoryview, typecode: str, offset: int, count: int):
+    """Zero-copy typed view of a section (a byte-swapped copy on big-endian hosts)."""
+    values = array(typecode)
+    section = view[offset:offset + values.itemsize * count]
+    if _LITTLE_ENDIAN:
+        return section.cast(typecode)
+    values.frombytes(section.tobytes())
+    values.byteswap()
+    return values
+
+
+def _array_bytes(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def dump_position_index(records: Iterable[Tuple[str, bytes]], f: BinaryIO) -> None:
+    """
+    Write a positions file.
+
+    Args:
+        records: (doc_id, encode_record() output) pairs
+        f: File opened for binary writing
+    """
+    records = sorted((doc_id.encode("utf-8"), record) for doc_id, record in records)
+    id_offsets = array('I', [0])
+    record_offsets = array('Q', [0])
+    for key, record in records:
+        id_offsets.append(id_offsets[-1] + len(key))
+        record_offsets.append(record_offsets[-1] + len(record))
+    id_blob = b"".join(key for key, _ in records)
+
+    f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(records), len(id_blob), record_offsets[-1]))
+    f.write(_array_bytes(id_offsets))
+    f.write(id_blob)
+    f.write(b"\0" * _pad(_HEADER.size + 4 * len(id_offsets) + len(id_blob)))
+    f.write(_array_bytes(record_offsets))
+    for _, record in records:
+        f.write(record)
@@ -0,0 +1,334 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Prompt Classifier - one keyword scan per prompt, shared by all prompt hooks.
+
+Hooks register their keyword/pattern rules under a group name. All keywords
+from all groups are compiled into a single Aho-Corasick automaton, so the
+prompt is scanned once no matter how many rules exist. classify() returns a
+PromptFeatures object that each hook queries for its own group.
+
+Matching semantics are the same as the `any(kw in prompt.lower())` loops
+they replace: keywords are case-insensitive substrings, and overlapping
+keywords all match ("react-hook-form" also matches "hook" and "form").
+Regex patterns are compiled once and only evaluated for rules whose
+keywords did not already match.
+
+The automaton is cached on disk in .claude/cache/prompt_classifier.json, keyed
+by the content of code-defined rules and the mtime of rule files (e.g.
+skill-rules.json), so a large skill-rules.json is only compiled when it changes.
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern, Set, Tuple
+
+# Disk cache for compiled automatons
+CACHE_PATH = Path('.claude/cache/prompt_classifier.json')
+CACHE_VERSION = 1
+MAX_CACHED_AUTOMATONS = 4
+
+# Shared rule group for the autonomous /ship commands
+SHIP_GROUP = "ship"
+SHIP_COMMANDS = ['/ship', '/adx:ship']
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed keyword set.
+
+    States are list indexes; goto[state] maps a character to the next state,
+    fail[state] is the failure link and out[state] lists every keyword that
+    ends at that state (including those reached through failure links).
+    """
+
+    def __init__(
+        self,
+        goto: List[Dict[str, int]],
+        fail: List[int],
+        out: List[List[str]]
+    ):
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+
+    @classmethod
+    def build(cls, keywords: Iterable[str]) -> "KeywordAutomaton":
+        """Build the automaton for a set of (already lowercased) keywords."""
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[str]] = [[]]
+
+        # Trie of all keywords
+        for keyword in sorted(set(keywords)):
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(keyword)
+
+        # Failure links, breadth first
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+        return cls(goto, fail, out)
+
+    def scan(self, text: str) -> Set[str]:
+        """Return every keyword occurring in text (text must be lowercased)."""
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize automaton to dictionary."""
+        return {"goto": self.goto, "fail": self.fail, "out": self.out}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KeywordAutomaton":
+        """Deserialize automaton from dictionary."""
+        return cls(data["goto"], data["fail"], data["out"])
+
+
+class _Rule:
+    """A registered rule: keywords plus compiled regex patterns."""
+
+    __slots__ = ("name", "keywords", "patterns")
+
+    def __init__(self, name: str, keywords: List[str], patterns: List[str]):
+        self.name = name
+        self.keywords = [kw.lower() for kw in keywords if kw]
+        self.patterns: List[Pattern] = [re.compile(p, re.IGNORECASE) for p in patterns]
+
+
+class PromptFeatures:
+    """
+    Classification result for one prompt.
+
+    Keyword hits are computed eagerly by the automaton scan; pattern hits are
+    evaluated on demand and memoized.
+    """
+
+    def __init__(self, prompt: str, classifier: "PromptClassifier", keywords: FrozenSet[str]):
+        self.prompt = prompt
+        self.lower = prompt.lower()
+        self.keywords = keywords
+        self._classifier = classifier
+        self._pattern_hits: Dict[Tuple[str, str], bool] = {}
+
+    def match_type(self, group: str, name: str) -> Optional[str]:
+        """Return 'keyword', 'pattern' or None for one rule."""
+        rule = self._classifier.get_rule(group, name)
+        if rule is None:
+            return None
+        if any(kw in self.keywords for kw in rule.keywords):
+            return "keyword"
+
+        key = (group, name)
+        hit = self._pattern_hits.get(key)
+        if hit is None:
+            hit = any(p.search(self.prompt) for p in rule.patterns)
+            self._pattern_hits[key] = hit
+        return "pattern" if hit else None
+
+    def has(self, group: str, name: str) -> bool:
+        """True if the rule matched by keyword or pattern."""
+        return self.match_type(group, name) is not None
+
+    def matched(self, group: str) -> List[Tuple[str, str]]:
+        """Return (rule_name, match_type) for every matching rule, in registration order."""
+        results = []
+        for name in self._classifier.rule_names(group):
+            match_type = self.match_type(group, name)
+            if match_type:
+                results.append((name, match_type))
+        return results
+
+
+class PromptClassifier:
+    """Registry of rule groups plus the automaton compiled from them."""
+
+    def __init__(self, cache_path: Optional[Path] = CACHE_PATH):
+        self.cache_path = cache_path
+        self._groups: "OrderedDict[str, OrderedDict[str, _Rule]]" = OrderedDict()
+        # group -> signature (content hash or rule file mtime)
+        self._signatures: Dict[str, str] = {}
+        self._automaton: Optional[KeywordAutomaton] = None
+        self._memo: "OrderedDict[str, PromptFeatures]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        group: str,
+        rules: List[Dict[str, Any]],
+        source: Optional[Path] = None
+    ) -> None:
+        """
+        Register (or replace) a group of rules.
+
+        Each rule is a dict with "name", "keywords" and optional "patterns".
+        Pass the rule file as `source` for file-defined rules so the disk cache
+        is keyed by its mtime instead of hashing the rules.
+        """
+        if source is not None:
+            try:
+                st = os.stat(source)
+                signature = f"{source}:{st.st_mtime_ns}:{st.st_size}"
+            except OSError:
+                signature = f"{source}:missing"
+        else:
+            signature = hashlib.sha1(
+                json.dumps(rules, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+
+        with self._lock:
+            if self._signatures.get(group) == signature:
+                return
+            self._groups[group] = OrderedDict(
+                (rule["name"], _Rule(rule["name"], rule.get("keywords", []), rule.get("patterns", [])))
+                for rule in rules
+            )
+            self._signatures[group] = signature
+            self._automaton = None
+            self._memo.clear()
+
+    def get_rule(self, group: str, name: str) -> Optional[_Rule]:
+        return self._groups.get(group, {}).get(name)
+
+    def rule_names(self, group: str) -> List[str]:
+        return list(self._groups.get(group, {}).keys())
+
+    def _cache_key(self) -> str:
+        parts = [f"{g}={self._signatures[g]}" for g in sorted(self._signatures)]
+        return hashlib.sha1(f"v{CACHE_VERSION}|{'|'.join(parts)}".encode("utf-8")).hexdigest()
+
+    def _load_cached(self, key: str) -> Optional[KeywordAutomaton]:
+        if self.cache_path is None or not self.cache_path.exists():
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                entries = json.load(f).get("entries", {})
+            if key in entries:
+                return KeywordAutomaton.from_dict(entries[key])
+        except (json.JSONDecodeError, IOError, KeyError, AttributeError):
+            pass
+        return None
+
+    def _save_cached(self, key: str, automaton: KeywordAutomaton) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            entries: Dict[str, Any] = {}
+            if self.cache_path.exists():
+                with open(self.cache_path, 'r') as f:
+                    entries = json.load(f).get("entries", {})
+            entries.pop(key, None)
+            entries[key] = automaton.to_dict()
+            # Keep the most recently written automatons only
+            while len(entries) > MAX_CACHED_AUTOMATONS:
+                entries.pop(next(iter(entries)))
+
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f".{self.cache_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({"version": CACHE_VERSION, "entries": entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except (json.JSONDecodeError, IOError, OSError, AttributeError):
+            pass  # Cache is an optimization only
+
+    def _get_automaton(self) -> KeywordAutomaton:
+        if self._automaton is None:
+            key = self._cache_key()
+            automaton = self._load_cached(key)
+            if automaton is None:
+                keywords = [
+                    kw
+                    for rules in self._groups.values()
+                    for rule in rules.values()
+                    for kw in rule.keywords
+                ]
+                automaton = KeywordAutomaton.build(keywords)
+                self._save_cached(key, automaton)
+            self._automaton = automaton
+        return self._automaton
+
+    def classify(self, prompt: str) -> PromptFeatures:
+        """
+        Classify a prompt against every registered group.
+
+        Results are memoized per prompt, so every hook in the same process
+        shares one scan.
+        """
+        with self._lock:
+            features = self._memo.get(prompt)
+            if features is not None:
+                return features
+
+            keywords = frozenset(self._get_automaton().scan(prompt.lower()))
+            features = PromptFeatures(prompt, self, keywords)
+            self._memo[prompt] = features
+            while len(self._memo) > 8:
+                self._memo.popitem(last=False)
+            return features
+
+
+# Process-wide classifier shared by all hooks
+_classifier = PromptClassifier()
+
+
+def register_rules(
+    group: str,
+    rules: List[Dict[str, Any]],
+    source: Optional[Path] = None
+) -> None:
+    """Register a rule group with the shared classifier."""
+    _classifier.register(group, rules, source=source)
+
+
+def classify(prompt: str) -> PromptFeatures:
+    """Classify a prompt with the shared classifier."""
+    return _classifier.classify(prompt)
+
+
+def is_ship_command(prompt: str) -> bool:
+    """True if the prompt invokes /ship (autonomous mode)."""
+    return classify(prompt).has(SHIP_GROUP, "ship")
+
+
+register_rules(SHIP_GROUP, [{"name": "ship", "keywords": SHIP_COMMANDS}])
@@ -0,0 +1,187 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Result Cache - persistent cache of knowledge retrieval results.
+
+Prompts repeat (re-sent messages, the same question rephrased with other
+punctuation or word order), and each one used to run the full retrieval:
+both channels of both stores plus boosting. The cache maps a prompt to the
+(fragment_id, score) candidates each channel produced before boosting, so a
+repeated prompt only loads the fragments by id and boosts them again.
+
+Keys are the sorted token multiset of the prompt, the words of each quoted
+phrase in order, and the retrieval parameters, so "fix the form validation"
+and "Form validation: fix" share an entry while '"form validation"' (a
+phrase query, see positions.py) gets its own. Tokens are unstemmed and
+include identifier n-grams, which makes the key at least as fine as any
+store's analyzer settings; outside phrases word order does not affect
+ranking (the proximity boost is symmetric).
+
+Each entry records the generation of the stores it was computed from (see
+KnowledgeStore.generation()); every index write changes the generation, so
+an entry from an older one counts as a miss and is replaced. Access counts
+do not change the generation (every retrieval records some); the recency
+and access boosts are applied after the lookup, so they never lag.
+
+The cache lives in .claude/cache/knowledge_results.json, holds at most
+MAX_CACHED_RESULTS entries (least recently used are evicted first) and
+counts hits and misses for tuning (`knowledge_admin cache-stats`).
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .positions import quoted_phrases
+from .tokenizer import Analyzer
+
+CACHE_PATH = Path('.claude/cache/knowledge_results.json')
+CACHE_VERSION = 3
+MAX_CACHED_RESULTS = 256
+
+# Finest tokenization any store can use: stemming is a function of the
+# tokens, and identifier n-grams are included
+_KEY_ANALYZER = Analyzer(stemming=False, ngrams=True)
+
+
+def cache_key(prompt: str, params: Any) -> str:
+    """Key of a prompt's results: its token multiset, quoted phrases and the retrieval parameters."""
+    tokens = sorted(_KEY_ANALYZER.tokenize(prompt))
+    phrases = [_KEY_ANALYZER.words(phrase) for phrase in quoted_phrases(prompt)]
+    data = json.dumps([tokens, phrases, params], separators=(',', ':'), default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU of retrieval results, shared by processes through a JSON file."""
+
+    def __init__(self, path: Optional[Path] = CACHE_PATH, max_entries: int = MAX_CACHED_RESULTS):
+        self.path = path
+        self.max_entries = max_entries
+        # key -> {"gen": generation, "results": [[[fragment_id, score], ...] per channel]},
+        # least recently used first
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # (mtime_ns, size) of the file when last read or written
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self) -> None:
+        """Re-read the file if another process changed it (caller holds the lock)."""
+        if self.path is None:
+            return
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        self._signature = signature
+        self._entries = OrderedDict()
+        self.hits = self.misses = 0
+        if signature is None:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self._entries = OrderedDict(data.get("entries", {}))
+                self.hits = int(data.get("hits", 0))
+                self.misses = int(data.get("misses", 0))
+        except (json.JSONDecodeError, IOError, OSError, AttributeError, TypeError, ValueError):
+            pass
+
+    def _save(self) -> None:
+        """Write the cache atomically (caller holds the lock)."""
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    "version": CACHE_VERSION,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "entries": self._entries,
+                }, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._signature = self._file_signature()
+        except (IOError, OSError, TypeError, ValueError):
+            pass  # Cache is an optimization only
+
+    def get(self, key: str, generation: Any) -> Optional[List[List[Tuple[str, float]]]]:
+        """Cached (fragment_id, score) lists for the key at this generation, or None (a miss)."""
+        generation = _jsonable(generation)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None or entry.get("gen") != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._save()
+            return [
+                [(fragment_id, score) for fragment_id, score in ranking]
+                for ranking in entry["results"]
+            ]
+
+    def put(self, key: str, generation: Any, results: List[List[Tuple[str, float]]]) -> None:
+        """Store one (fragment_id, score) list per channel (also persists the miss counted by get())."""
+        with self._lock:
+            self._load()
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                "gen": _jsonable(generation),
+                "results": [
+                    [[fragment_id, score] for fragment_id, score in ranking] for ranking in results
+                ],
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size."""
+        with self._lock:
+            self._load()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries = OrderedDict()
+            self.hits = self.misses = 0
+            if self.path is not None:
+                try:
+                    self.path.unlink()
+                except OSError:
+                    pass
+            self._signature = None
+
+
+def _jsonable(value: Any) -> Any:
+    """Generation as it compares after a JSON round trip (tuples become lists)."""
+    return json.loads(json.dumps(value, default=str))
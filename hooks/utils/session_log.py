@@ -0,0 +1,119 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Append-only session event logs.
+
+Each hook event is written as one compact JSON line to
+logs/<session_id>/<name>.jsonl with a single O_APPEND write, so logging cost
+is O(1) per event no matter how long the session runs. Older sessions may
+still have a legacy <name>.json array; read_events() returns both.
+
+Usage (export a log in the legacy JSON array format):
+    uv run hooks/utils/session_log.py <session_id> <name> [output.json]
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, List, Optional
+
+if __package__:
+    from .constants import get_session_log_dir
+else:
+    from constants import get_session_log_dir
+
+
+def get_event_log_path(session_id: str, name: str) -> Path:
+    """Get the JSONL log path for an event type."""
+    return get_session_log_dir(session_id) / f"{name}.jsonl"
+
+
+def append_event(session_id: str, name: str, record: Any) -> None:
+    """
+    Append one event to logs/<session_id>/<name>.jsonl.
+
+    The record is serialised as a single compact line and written with one
+    O_APPEND write, which is atomic for concurrent appenders.
+    """
+    line = json.dumps(record, separators=(',', ':')) + "\n"
+    path = get_event_log_path(session_id, name)
+
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    try:
+        fd = os.open(path, flags, 0o644)
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, flags, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+def read_events(session_id: str, name: str) -> List[Any]:
+    """
+    Read all events of a type, oldest first.
+
+    Includes entries from a legacy <name>.json array (written before the
+    switch to JSONL), then the JSONL entries. Unparseable lines are skipped.
+    """
+    log_dir = get_session_log_dir(session_id)
+    events: List[Any] = []
+
+    legacy_path = log_dir / f"{name}.json"
+    if legacy_path.exists():
+        try:
+            with open(legacy_path, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                events.extend(data)
+        except (json.JSONDecodeError, ValueError, IOError):
+            pass
+
+    path = log_dir / f"{name}.jsonl"
+    if path.exists():
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Torn or partial line
+
+    return events
+
+
+def export_legacy(session_id: str, name: str, output_path: Optional[Path] = None) -> str:
+    """
+    Produce the legacy JSON array format (indent=2) for existing consumers.
+
+    Returns the JSON text, and also writes it to output_path if given.
+    """
+    text = json.dumps(read_events(session_id, name), indent=2)
+    if output_path is not None:
+        with open(output_path, 'w') as f:
+            f.write(text)
+    return text
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+
+    session_id, name = sys.argv[1], sys.argv[2]
+    output_path = Path(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    text = export_legacy(session_id, name, output_path)
+    if output_path is None:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
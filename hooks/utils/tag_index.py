@@ -0,0 +1,211 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Tag Index - per-fragment facets of a store: tags, source, scope and access count.
+
+Statistics used to parse every fragment file to count tags and sources,
+and filtering by tag meant loading fragments first. The tag index keeps,
+for every fragment:
+
+    facets      fragment_id -> (tags, source, scope, accessed_count)
+    postings    tag -> set of fragment ids
+    counters    fragments per source and scope, summed accessed_count
+
+all maintained per add/remove, so stats() costs O(tags + sources) and
+matching() is a set union over the requested tags.
+
+It is saved as facets.json beside the index file, stamped like lsh.bin
+with the (mtime_ns, size) of the index file it was written with. The file
+has two lines:
+
+    header      version, stamp, the index.journal offset it includes, and
+                the counters (stats() plus the index's num_terms)
+    facets      fragment_id -> facets
+
+Changes since then are replayed from index.journal, whose add, facets and
+remove entries carry the fragment's new and previous facets ("prev") and
+the change in distinct terms ("dt"). Statistics are the header counters
+plus those deltas (see KnowledgeStore.get_stats()), so they never load the
+facets line or the index; only tag filtering needs the postings. Tags are not recoverable
+from the index terms, so a facets.json that is missing or does not match
+the index is rebuilt from the fragment records on first use.
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import json
+from collections import Counter, defaultdict
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Set, Tuple
+
+FORMAT_VERSION = 2
+
+# (tags, source, scope, accessed_count)
+Facets = Tuple[List[str], str, str, int]
+
+
+def facets_of(data: Dict[str, Any]) -> Facets:
+    """Facets of a fragment record (Fragment.to_dict() output)."""
+    return (
+        list(data.get("tags") or []),
+        data.get("source") or "",
+        data.get("scope") or "",
+        int(data.get("accessed_count") or 0),
+    )
+
+
+class TagIndex:
+    """Tag postings and facet counters of a store's fragments."""
+
+    def __init__(self):
+        self.facets: Dict[str, Facets] = {}
+        self.postings: Dict[str, Set[str]] = defaultdict(set)
+        self.source_counts: Counter = Counter()
+        self.scope_counts: Counter = Counter()
+        self.total_accessed = 0
+
+    def __len__(self) -> int:
+        return len(self.facets)
+
+    def set(self, doc_id: str, facets: Facets) -> None:
+        """Record (or replace) a fragment's facets."""
+        facets = (list(facets[0]), facets[1], facets[2], int(facets[3]))
+        if self.facets.get(doc_id) == facets:
+            return
+        self.remove(doc_id)
+        tags, source, scope, accessed = facets
+        self.facets[doc_id] = facets
+        for tag in set(tags):
+            self.postings[tag].add(doc_id)
+        self.source_counts[source] += 1
+        self.scope_counts[scope] += 1
+        self.total_accessed += accessed
+
+    def remove(self, doc_id: str) -> None:
+        """Forget a fragment."""
+        facets = self.facets.pop(doc_id, None)
+        if facets is None:
+            return
+        tags, source, scope, accessed = facets
+        for tag in set(tags):
+            docs = self.postings[tag]
+            docs.discard(doc_id)
+            if not docs:
+                del self.postings[tag]
+        for counter, key in ((self.source_counts, source), (self.scope_counts, scope)):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        self.total_accessed -= accessed
+
+    def matching(self, tags: Iterable[str]) -> Set[str]:
+        """Ids of the fragments having any of the tags."""
+        found: Set[str] = set()
+        for tag in tags:
+            found.update(self.postings.get(tag, ()))
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        """Fragment count, per-tag/source/scope counts and summed accessed_count."""
+        return {
+            "total_fragments": len(self.facets),
+            "tag_counts": {tag: len(docs) for tag, docs in self.postings.items()},
+            "source_counts": dict(self.source_counts),
+            "scope_counts": dict(self.scope_counts),
+            "total_accessed": self.total_accessed,
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "TagIndex":
+        """Build from fragment records."""
+        index = cls()
+        for data in records:
+            if "id" in data:
+                index.set(data["id"], facets_of(data))
+        return index
+
+    @classmethod
+    def load(cls, path, stamp: Optional[Tuple[int, int]]) -> Optional[Tuple["TagIndex", int]]:
+        """
+        Read facets.json; returns (index, journal offset it includes), or
+        None if missing, unreadable or not written for `stamp`.
+        """
+        try:
+            with open(path, 'rb') as f:
+                header = _parse_header(f.readline(), stamp)
+                if header is None:
+                    return None
+                data = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        index = cls()
+        try:
+            for doc_id, facets in data.items():
+                index.set(doc_id, tuple(facets))
+        except (AttributeError, TypeError, ValueError, IndexError):
+            return None
+        return index, header["journal"]
+
+
+def _parse_header(line: bytes, stamp: Optional[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+    if stamp is None:
+        return None
+    try:
+        header = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("version") != FORMAT_VERSION \
+            or tuple(header.get("stamp") or ()) != tuple(stamp) \
+            or not isinstance(header.get("journal"), int) or not isinstance(header.get("stats"), dict):
+        return None
+    return header
+
+
+def read_header(path, stamp: Optional[Tuple[int, int]]) -> Optional[Dict[str, Any]]:
+    """The header line of facets.json; None if missing, unreadable or not written for `stamp`."""
+    try:
+        with open(path, 'rb') as f:
+            return _parse_header(f.readline(), stamp)
+    except OSError:
+        return None
+
+
+def _count(counts: Dict[str, int], key: str, delta: int) -> None:
+    counts[key] = counts.get(key, 0) + delta
+    if counts[key] <= 0:
+        del counts[key]
+
+
+def count_facets(stats: Dict[str, Any], facets: Facets, sign: int = 1) -> None:
+    """Add (sign 1) or take away (sign -1) a fragment's facets from stats() counters."""
+    tags, source, scope, accessed = facets
+    stats["total_fragments"] += sign
+    for tag in set(tags):
+        _count(stats["tag_counts"], tag, sign)
+    _count(stats["source_counts"], source, sign)
+    _count(stats["scope_counts"], scope, sign)
+    stats["total_accessed"] += sign * int(accessed)
+
+
+def dump_tag_index(
+    facets: Dict[str, Facets],
+    stats: Dict[str, Any],
+    stamp: Tuple[int, int],
+    journal_offset: int,
+    f: BinaryIO
+) -> None:
+    """
+    Write facets.json.
+
+    Args:
+        facets: TagIndex.facets
+        stats: TagIndex.stats() of those facets, plus the index's num_terms
+        stamp: (mtime_ns, size) of the index file written with it
+        journal_offset: Bytes of index.journal the facets include
+        f: File opened for binary writing
+    """
+    header = {"version": FORMAT_VERSION, "stamp": list(stamp), "journal": journal_offset, "stats": stats}
+    f.write(json.dumps(header, separators=(',', ':')).encode("utf-8") + b"\n")
+    f.write(json.dumps(facets, separators=(',', ':')).encode("utf-8") + b"\n")
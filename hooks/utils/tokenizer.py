@@ -0,0 +1,125 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Tokenizer - text analysis shared by the knowledge index and its queries.
+
+The pipeline lowercases text, splits it on non-alphanumerics and drops short
+tokens and stopwords. Two optional stages are set per store in config.json:
+
+- stemming: strip common English suffixes so "validate", "validation" and
+  "validating" all index as "valid"
+- ngrams: also emit joined tokens for identifiers such as react-hook-form or
+  file_cache ("react_hook_form", "react_hook", "hook_form"), so a prompt that
+  names the identifier matches it more strongly than its separate words
+
+Documents and queries must be analyzed with the same settings; changing them
+requires rebuilding the index (knowledge_admin set-analyzer does both).
+
+Zero external dependencies - uses only Python standard library.
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Two or more alphanumeric parts joined by -, _ or .
+IDENTIFIER_PATTERN = re.compile(r'[a-z0-9]+(?:[-_.][a-z0-9]+)+')
+
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+    'would', 'could', 'should', 'may', 'might', 'must', 'shall',
+    'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in',
+    'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into',
+    'through', 'during', 'before', 'after', 'above', 'below',
+    'between', 'under', 'again', 'further', 'then', 'once',
+    'here', 'there', 'when', 'where', 'why', 'how', 'all',
+    'each', 'few', 'more', 'most', 'other', 'some', 'such',
+    'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than',
+    'too', 'very', 'just', 'and', 'but', 'if', 'or', 'because',
+    'until', 'while', 'this', 'that', 'these', 'those', 'it'
+})
+
+MIN_TOKEN_LENGTH = 2
+
+# Longest suffixes first; a suffix is only removed if MIN_STEM_LENGTH
+# characters remain
+STEM_SUFFIXES = (
+    'izations', 'ization', 'ational', 'ations', 'ation', 'ating', 'ators',
+    'ments', 'ment', 'ness', 'ings', 'ated', 'ates', 'ator', 'ible', 'able',
+    'ing', 'ies', 'ive', 'ize', 'ate', 'ers', 'ed', 'es', 'er', 'ly', 'e', 's',
+)
+MIN_STEM_LENGTH = 4
+
+
+def stem(token: str) -> str:
+    """Light suffix-stripping stemmer (not Porter; predictable and cheap)."""
+    if len(token) <= MIN_STEM_LENGTH or token.isdigit():
+        return token
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            if token.endswith('ss') and suffix == 's':
+                return token  # "class", "process"
+            return token[:-len(suffix)]
+    return token
+
+
+class Analyzer:
+    """Tokenization settings for one index."""
+
+    def __init__(self, stemming: bool = False, ngrams: bool = False):
+        self.stemming = stemming
+        self.ngrams = ngrams
+        # Part of every content hash, so changing settings invalidates them
+        self.signature = f"v1:stem={int(stemming)}:ngrams={int(ngrams)}"
+
+    def words(self, text: str) -> List[str]:
+        """Index terms of the text in order, without identifier n-grams."""
+        tokens = [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) >= MIN_TOKEN_LENGTH and t not in STOPWORDS]
+        if self.stemming:
+            tokens = [stem(t) for t in tokens]
+        return tokens
+
+    def positions(self, text: str) -> Dict[str, List[int]]:
+        """Word ordinals (see words()) of each term of the text."""
+        positions: Dict[str, List[int]] = {}
+        for ordinal, word in enumerate(self.words(text)):
+            positions.setdefault(word, []).append(ordinal)
+        return positions
+
+    def tokenize(self, text: str) -> List[str]:
+        """Turn text into index terms."""
+        text = text.lower()
+        tokens = self.words(text)
+
+        if self.ngrams:
+            for identifier in IDENTIFIER_PATTERN.findall(text):
+                parts = TOKEN_PATTERN.findall(identifier)
+                if any(len(p) < MIN_TOKEN_LENGTH for p in parts):
+                    continue  # "e.g.", "1.2.3"
+                tokens.append("_".join(parts))
+                if len(parts) > 2:
+                    tokens.extend(f"{a}_{b}" for a, b in zip(parts, parts[1:]))
+        return tokens
+
+    def content_hash(self, text: str, tags: Optional[List[str]] = None) -> str:
+        """Hash of the analyzed input, used to skip re-tokenizing unchanged fragments."""
+        h = hashlib.blake2b(digest_size=8)
+        h.update(self.signature.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        for tag in tags or ():
+            h.update(b"\0")
+            h.update(tag.encode("utf-8"))
+        return h.hexdigest()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Analyzer":
+        return cls(stemming=bool(config.get("stemming")), ngrams=bool(config.get("ngrams")))
+
+
+DEFAULT_ANALYZER = Analyzer()
@@ -0,0 +1,319 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Vector Index - hashed-embedding dense retrieval channel (optional NumPy).
+
+TF-IDF only matches whole terms, so "rerender loop" and "re-render" never
+meet. This channel embeds each fragment without any model: its terms and
+their character trigrams ("<re", "ren", "end", ...) are hashed (the hashing
+trick) and projected into VECTOR_DIM dimensions by a fixed sparse random
+projection - each feature adds its weight to PROJECTION_NNZ dimensions with
+signs taken from its hash. Rows are L2-normalized, so a dot product is the
+cosine similarity.
+
+Vectors are computed from the index's own term counts (forward index plus
+postings), so journal replay and rebuilds need no fragment text. The
+matrix is saved beside the index:
+
+    vectors.npy   float32 (documents x VECTOR_DIM), memory-mapped on load
+    vectors.ids   JSON header line (format, dimension, index file stamp),
+                  then one fragment id per line (row order)
+
+Search is a brute-force matrix-vector product plus np.argpartition, a few
+milliseconds for 50k fragments. Like lsh.bin, a matrix whose stamp does
+not match the index file is ignored; every fragment is then re-embedded,
+and the dense channel stays off until that is saved (next session end or
+`knowledge_admin compact`). Without NumPy the channel is disabled.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import BinaryIO, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Dense retrieval is skipped
+    np = None
+
+HAS_NUMPY = np is not None
+
+VECTOR_DIM = 256
+# Dimensions each hashed feature is added to (sparse random projection)
+PROJECTION_NNZ = 4
+NGRAM_SIZE = 3
+# Weight of a trigram relative to its whole term
+NGRAM_WEIGHT = 0.5
+# Term rows gathered per block when embedding many documents
+EMBED_BLOCK_TERMS = 32768
+
+FORMAT_VERSION = 1
+
+# Above this many documents to embed, searches return nothing rather than
+# stall a prompt; the vectors are computed when the matrix is next saved
+MAX_PENDING_VECTORS = 512
+
+
+def _projection(feature: str) -> List[Tuple[int, float]]:
+    """(dimension, sign) pairs of a feature's column in the projection."""
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=2 * PROJECTION_NNZ).digest()
+    return [
+        (digest[2 * i] % VECTOR_DIM, 1.0 if digest[2 * i + 1] & 1 else -1.0)
+        for i in range(PROJECTION_NNZ)
+    ]
+
+
+@lru_cache(maxsize=16384)
+def _term_features(term: str) -> Tuple[List[int], List[float]]:
+    """Sparse projection of one occurrence of a term and its trigrams: (dims, values)."""
+    # "\0" keeps trigram features apart from three-letter terms
+    features = [(term, 1.0)]
+    padded = f"<{term}>"
+    features.extend(
+        ("\0" + padded[i:i + NGRAM_SIZE], NGRAM_WEIGHT) for i in range(len(padded) - NGRAM_SIZE + 1)
+    )
+    vector: Dict[int, float] = {}
+    for feature, weight in features:
+        for dim, sign in _projection(feature):
+            vector[dim] = vector.get(dim, 0.0) + sign * weight
+    return list(vector), list(vector.values())
+
+
+def embed_many(term_counts_list: List[Dict[str, int]]):
+    """
+    Unit float32 vectors (one row per document) of documents' term counts.
+
+    The projection is linear, so a document is the weighted sum of its
+    terms' sparse vectors; the (document, dimension) entries of up to
+    EMBED_BLOCK_TERMS terms at a time are summed with one np.bincount.
+    Documents without terms get a zero row.
+    """
+    vocabulary: Dict[str, int] = {}
+    term_ids: List[int] = []
+    counts: List[int] = []
+    offsets = [0]
+    for term_counts in term_counts_list:
+        term_ids.extend([vocabulary.setdefault(term, len(vocabulary)) for term in term_counts])
+        counts.extend(term_counts.values())
+        offsets.append(len(term_ids))
+
+    num_docs = len(term_counts_list)
+    result = np.zeros((num_docs, VECTOR_DIM), dtype=np.float32)
+    if not vocabulary:
+        return result
+
+    # Term vectors in CSR form
+    term_ptr = [0]
+    term_dims: List[int] = []
+    term_values: List[float] = []
+    for term in vocabulary:
+        dims, values = _term_features(term)
+        term_dims.extend(dims)
+        term_values.extend(values)
+        term_ptr.append(len(term_dims))
+    ptr = np.array(term_ptr, dtype=np.int64)
+    dims = np.array(term_dims, dtype=np.int64)
+    values = np.array(term_values, dtype=np.float64)
+
+    ids = np.array(term_ids, dtype=np.int64)
+    # Sublinear term frequency
+    weights = 1.0 + np.log(np.maximum(np.array(counts, dtype=np.float64), 1.0))
+    bounds = np.array(offsets, dtype=np.int64)
+
+    doc = 0
+    while doc < num_docs:
+        last = max(doc + 1, int(np.searchsorted(bounds, bounds[doc] + EMBED_BLOCK_TERMS, side="right")) - 1)
+        lo, hi = bounds[doc], bounds[last]
+        block = ids[lo:hi]
+        starts = ptr[block]
+        lengths = ptr[block + 1] - starts
+        # Entry e belongs to term occurrence pair[e] and reads term_dims[position[e]]
+        pair = np.repeat(np.arange(hi - lo), lengths)
+        position = starts[pair] + np.arange(len(pair)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        owner = np.repeat(np.arange(last - doc), np.diff(bounds[doc:last + 1]))[pair]
+        result[doc:last] = np.bincount(
+            owner * VECTOR_DIM + dims[position],
+            weights=values[position] * weights[lo:hi][pair],
+            minlength=(last - doc) * VECTOR_DIM,
+        ).reshape(last - doc, VECTOR_DIM)
+        doc = last
+
+    norms = np.linalg.norm(result, axis=1, keepdims=True)
+    np.divide(result, norms, out=result, where=norms > 0)
+    return result
+
+
+def embed(term_counts: Dict[str, int]):
+    """Unit float32 vector of a document's term counts (None if it has no terms)."""
+    vector = embed_many([term_counts])[0]
+    return vector if vector.any() else None
+
+
+class VectorIndex:
+    """
+    Embeddings of a TFIDFIndex: a saved matrix plus in-memory changes.
+
+    Added documents are embedded on the next search() or snapshot() call
+    from the term counts the caller supplies, so indexing (and journal
+    replay) only pays a set insertion.
+    """
+
+    def __init__(self):
+        # Matrix loaded from vectors.npy (rows match _doc_ids)
+        self._doc_ids: List[str] = []
+        self._matrix = None
+        # Matrix rows whose documents were removed or re-added since
+        self._hidden: Set[str] = set()
+
+        # Docs added since the matrix was saved: doc_id -> vector
+        self._vectors: Dict[str, object] = {}
+        # Added docs not embedded yet
+        self._pending: Set[str] = set()
+        # (ids, stacked matrix) of _vectors, rebuilt when they change
+        self._stacked: Optional[Tuple[List[str], object]] = None
+
+    def add(self, doc_id: str) -> None:
+        """Schedule a (re-)added document for embedding."""
+        self.remove(doc_id)
+        self._pending.add(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        """Remove a document."""
+        self._pending.discard(doc_id)
+        if self._vectors.pop(doc_id, None) is not None:
+            self._stacked = None
+        if self._doc_ids:
+            self._hidden.add(doc_id)
+
+    def add_embedded(self, doc_ids: List[str], matrix) -> None:
+        """Add (re-)added documents embedded elsewhere (snapshot() output)."""
+        for doc_id, vector in zip(doc_ids, matrix):
+            self.remove(doc_id)
+            if vector.any():
+                self._vectors[doc_id] = vector
+        self._stacked = None
+
+    @property
+    def pending(self) -> int:
+        """Number of documents waiting to be embedded."""
+        return len(self._pending)
+
+    def _update(self, counts_of: Callable[[str], Dict[str, int]]) -> None:
+        """Embed pending documents."""
+        if not self._pending:
+            return
+        doc_ids = list(self._pending)
+        for doc_id, vector in zip(doc_ids, embed_many([counts_of(d) for d in doc_ids])):
+            if vector.any():
+                self._vectors[doc_id] = vector
+        self._stacked = None
+        self._pending.clear()
+
+    def search(
+        self,
+        query_vector,
+        top_k: int,
+        counts_of: Callable[[str], Dict[str, int]]
+    ) -> List[Tuple[str, float]]:
+        """Top_k (doc_id, cosine similarity) pairs, best first."""
+        if top_k <= 0 or len(self._pending) > MAX_PENDING_VECTORS:
+            return []
+        self._update(counts_of)
+
+        results: List[Tuple[str, float]] = []
+        if self._matrix is not None:
+            # Over-fetch by the hidden rows, which are filtered out below
+            results.extend(
+                (doc_id, score)
+                for doc_id, score in _top(self._matrix, self._doc_ids, query_vector, top_k + len(self._hidden))
+                if doc_id not in self._hidden
+            )
+        if self._vectors:
+            if self._stacked is None:
+                ids = list(self._vectors)
+                self._stacked = (ids, np.stack([self._vectors[d] for d in ids]))
+            results.extend(_top(self._stacked[1], self._stacked[0], query_vector, top_k))
+
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:top_k]
+
+    def snapshot(self, counts_of: Callable[[str], Dict[str, int]]) -> Tuple[List[str], object]:
+        """(ids, matrix) of every document, for dump_vector_index()."""
+        self._update(counts_of)
+        ids = []
+        blocks = []
+        if self._matrix is not None:
+            keep = [i for i, doc_id in enumerate(self._doc_ids) if doc_id not in self._hidden]
+            ids.extend(self._doc_ids[i] for i in keep)
+            blocks.append(np.asarray(self._matrix)[keep])
+        if self._vectors:
+            ids.extend(self._vectors)
+            blocks.append(np.stack(list(self._vectors.values())))
+        if not blocks:
+            return [], np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        return ids, np.concatenate(blocks).astype(np.float32, copy=False)
+
+    @classmethod
+    def load(cls, matrix_path, ids_path, stamp: Optional[Tuple[int, int]]) -> Optional["VectorIndex"]:
+        """Read vectors.npy/vectors.ids; None if missing, unreadable or not written for `stamp`."""
+        if stamp is None or np is None:
+            return None
+        try:
+            with open(ids_path, 'r', encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                doc_ids = f.read().split("\n")
+        except (OSError, ValueError):
+            return None
+        if (header.get("version") != FORMAT_VERSION or header.get("dim") != VECTOR_DIM
+                or tuple(header.get("stamp") or ()) != tuple(stamp)):
+            return None
+        if doc_ids and doc_ids[-1] == "":
+            doc_ids.pop()
+
+        index = cls()
+        if doc_ids:
+            try:
+                # A mapped file cannot be replaced on Windows; read it instead
+                matrix = np.load(matrix_path, mmap_mode=None if os.name == "nt" else "r")
+            except (OSError, ValueError):
+                return None
+            if matrix.shape != (len(doc_ids), VECTOR_DIM):
+                return None
+            index._doc_ids = doc_ids
+            index._matrix = matrix
+        return index
+
+
+def _top(matrix, doc_ids: List[str], query_vector, top_k: int) -> List[Tuple[str, float]]:
+    """Top_k rows of matrix by dot product with the query."""
+    scores = matrix @ query_vector
+    count = len(doc_ids)
+    if top_k < count:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        top = np.arange(count)
+    return [(doc_ids[i], float(scores[i])) for i in top]
+
+
+def dump_vector_index(
+    doc_ids: List[str],
+    matrix,
+    stamp: Tuple[int, int],
+    matrix_file: BinaryIO,
+    ids_file: BinaryIO
+) -> None:
+    """
+    Write an embedding matrix.
+
+    Args:
+        doc_ids, matrix: VectorIndex.snapshot() output
+        stamp: (mtime_ns, size) of the index file written with it
+        matrix_file, ids_file: Files opened for binary writing
+    """
+    np.save(matrix_file, np.ascontiguousarray(matrix, dtype=np.float32))
+    header = json.dumps({"version": FORMAT_VERSION, "dim": VECTOR_DIM, "stamp": list(stamp)})
+    ids_file.write((header + "\n" + "".join(doc_id + "\n" for doc_id in doc_ids)).encode("utf-8"))